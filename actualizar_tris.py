@@ -1,75 +1,238 @@
 import pandas as pd
 import requests
 from bs4 import BeautifulSoup
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import argparse
+import json
 import os
-
-CSV_LOCAL = "Tris.csv"
-URL = "https://www.resultadostris.com/"
-
-def obtener_ultimos_resultados():
-    response = requests.get(URL, timeout=30)
-    response.raise_for_status()
-
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    resultados = []
+import threading
+
+from agregados import sincronizar_agregados
+from historico import (
+    COLUMNAS_CSV,
+    CSV_LOCAL,
+    DIR_BINARIO,
+    agregar_sorteos,
+    cargar_historico,
+    compactar
+)
+from ingesta import normalizar_sorteos
+from snapshot import RUTA_SNAPSHOT, construir_snapshot
+
+URL = os.environ.get("TRIS_URL", "https://www.resultadostris.com/")
+# Página de un sorteo puntual, usada para rellenar huecos. Se puede apuntar a
+# otro servidor (por ejemplo uno local con páginas grabadas) con variables de
+# entorno o con --url / --url-sorteo.
+URL_SORTEO = os.environ.get("TRIS_URL_SORTEO", URL.rstrip("/") + "/sorteo/{concurso}")
+
+RUTA_CACHE_HTTP = os.path.join(DIR_BINARIO, "http_cache.json")
+MAX_CONEXIONES = 4
+# Un hueco más grande que esto no se rellena sorteo por sorteo
+MAX_HUECO = 500
+
+
+# ---------------- DESCARGA ----------------
+def crear_sesion(conexiones=MAX_CONEXIONES):
+    sesion = requests.Session()
+    reintentos = Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504]
+    )
+    adaptador = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=conexiones,
+        max_retries=reintentos
+    )
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+
+# Sesión con conexiones reutilizables y peticiones condicionales: guarda el
+# ETag / Last-Modified de cada página y, si el servidor responde 304, la
+# página no se vuelve a descargar ni a parsear.
+class Descargador:
+
+    def __init__(self, sesion=None, ruta_cache=RUTA_CACHE_HTTP):
+        self.sesion = sesion or crear_sesion()
+        self.ruta_cache = ruta_cache
+        self._candado = threading.Lock()
+
+        try:
+            with open(ruta_cache) as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def obtener(self, url, condicional=True):
+        encabezados = {}
+        previo = self.cache.get(url, {}) if condicional else {}
+        if "etag" in previo:
+            encabezados["If-None-Match"] = previo["etag"]
+        if "last_modified" in previo:
+            encabezados["If-Modified-Since"] = previo["last_modified"]
+
+        response = self.sesion.get(url, headers=encabezados, timeout=30)
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        if condicional:
+            validadores = {}
+            if "ETag" in response.headers:
+                validadores["etag"] = response.headers["ETag"]
+            if "Last-Modified" in response.headers:
+                validadores["last_modified"] = response.headers["Last-Modified"]
+            with self._candado:
+                self.cache[url] = validadores
+
+        return response.text
+
+    # Se llama solo después de guardar el histórico: si algo falla antes, la
+    # próxima corrida vuelve a descargar la página completa.
+    def guardar_cache(self):
+        os.makedirs(os.path.dirname(self.ruta_cache) or ".", exist_ok=True)
+        temporal = self.ruta_cache + ".tmp"
+        with open(temporal, "w") as f:
+            json.dump(self.cache, f, indent=2, sort_keys=True)
+        os.replace(temporal, self.ruta_cache)
+
+
+def parsear_resultados(html):
+    soup = BeautifulSoup(html, "html.parser")
+
+    filas = []
 
     # Cada sorteo está en una tabla
-    filas = soup.select("table tbody tr")
-
-    for fila in filas:
+    for fila in soup.select("table tbody tr"):
         cols = [c.get_text(strip=True) for c in fila.find_all("td")]
 
         if len(cols) < 5:
             continue
 
-        concurso = int(cols[0])
-        combinacion = cols[1].zfill(5)
-        fecha = datetime.strptime(cols[2], "%d/%m/%Y").strftime("%d/%m/%Y")
-        multiplicador = "SI" if "SI" in cols[3].upper() else "NO"
-
-        resultados.append({
-            "NPRODUCTO": 60,
-            "CONCURSO": concurso,
-            "R1": int(combinacion[0]),
-            "R2": int(combinacion[1]),
-            "R3": int(combinacion[2]),
-            "R4": int(combinacion[3]),
-            "R5": int(combinacion[4]),
-            "FECHA": fecha,
-            "Multiplicador": multiplicador
+        filas.append({
+            "Sorteo": cols[0],
+            "Combinación Ganadora": cols[1],
+            "Fecha": cols[2],
+            "Multiplicador": "SI" if "SI" in cols[3].upper() else "NO"
         })
 
-    return pd.DataFrame(resultados)
-
-def actualizar_tris():
+    # Mismo camino que los CSV subidos a la app, así las filas son idénticas
+    resultados, rechazos = normalizar_sorteos(
+        pd.DataFrame(filas, columns=["Sorteo", "Combinación Ganadora", "Fecha", "Multiplicador"])
+    )
+    for _, rechazo in rechazos.iterrows():
+        print(f"⚠️ Fila {rechazo['FILA']} de la página descartada ({rechazo['CONCURSO']}): {rechazo['MOTIVO']}")
+    return resultados
+
+
+def obtener_ultimos_resultados(descargador=None, url=URL):
+    # None si la página no cambió desde la última consulta
+    descargador = descargador or Descargador()
+    html = descargador.obtener(url)
+    if html is None:
+        return None
+    return parsear_resultados(html)
+
+
+# ---------------- HUECOS ----------------
+def concursos_faltantes(ultimo_local, concursos_web):
+    concursos_web = set(int(c) for c in concursos_web)
+    if not concursos_web or not ultimo_local:
+        return []
+    return [
+        c for c in range(ultimo_local + 1, max(concursos_web))
+        if c not in concursos_web
+    ]
+
+
+def rellenar_huecos(descargador, faltantes, url_sorteo=URL_SORTEO, conexiones=MAX_CONEXIONES):
+    def descargar(concurso):
+        try:
+            html = descargador.obtener(url_sorteo.format(concurso=concurso), condicional=False)
+        except requests.RequestException as e:
+            print(f"⚠️ No se pudo descargar el sorteo {concurso}: {e}")
+            return None
+        df = parsear_resultados(html)
+        return df[df["CONCURSO"] == concurso]
+
+    # Concurrencia acotada: nunca más peticiones simultáneas que conexiones
+    with ThreadPoolExecutor(max_workers=conexiones) as ejecutor:
+        partes = [p for p in ejecutor.map(descargar, faltantes) if p is not None]
+
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_CSV)
+    return pd.concat(partes, ignore_index=True)
+
+
+# ---------------- ACTUALIZACIÓN ----------------
+def actualizar_tris(url=URL, url_sorteo=URL_SORTEO):
     print("🔎 Iniciando actualización TRIS...")
 
     if os.path.exists(CSV_LOCAL):
-        df_local = pd.read_csv(CSV_LOCAL)
-        ultimo_concurso = df_local["CONCURSO"].max()
+        hist = cargar_historico(CSV_LOCAL)
+        ultimo_concurso = int(hist.concurso[-1])
         print(f"📄 Último concurso local: {ultimo_concurso}")
     else:
-        df_local = pd.DataFrame()
+        hist = None
         ultimo_concurso = 0
         print("📄 No existe CSV local, se creará uno nuevo")
 
-    df_web = obtener_ultimos_resultados()
+    descargador = Descargador()
+    df_web = obtener_ultimos_resultados(descargador, url)
+
+    if df_web is None:
+        print("ℹ️ La página no cambió desde la última consulta")
+        return
 
     nuevos = df_web[df_web["CONCURSO"] > ultimo_concurso]
 
+    faltantes = concursos_faltantes(ultimo_concurso, nuevos["CONCURSO"])
+    if len(faltantes) > MAX_HUECO:
+        print(f"⚠️ Faltan {len(faltantes)} sorteos, demasiados para rellenar uno por uno")
+    elif faltantes:
+        print(f"🕳️ Faltan {len(faltantes)} sorteos entre {faltantes[0]} y {faltantes[-1]}, recuperando...")
+        recuperados = rellenar_huecos(descargador, faltantes, url_sorteo)
+        print(f"🧩 Recuperados {len(recuperados)} de {len(faltantes)}")
+        nuevos = pd.concat([nuevos, recuperados], ignore_index=True)
+
     if nuevos.empty:
         print("ℹ️ No hay sorteos nuevos")
+        descargador.guardar_cache()
         return
 
     print(f"🆕 Sorteos nuevos encontrados: {len(nuevos)}")
 
-    df_final = pd.concat([df_local, nuevos], ignore_index=True)
-    df_final = df_final.sort_values("CONCURSO", ascending=False)
-
-    df_final.to_csv(CSV_LOCAL, index=False)
-    print("✅ Tris.csv actualizado correctamente")
+    # Solo se anexa al diario; Tris.csv se reescribe cuando llega a MAX_DIARIO
+    hist, cantidad = agregar_sorteos(nuevos, CSV_LOCAL, hist=hist)
+    descargador.guardar_cache()
+    print(f"✅ {cantidad} sorteos nuevos guardados en el histórico")
 
 if __name__ == "__main__":
-    actualizar_tris()
+    parser = argparse.ArgumentParser(description="Actualiza Tris.csv con los sorteos publicados")
+    parser.add_argument("--url", default=URL, help="Página con los últimos resultados")
+    parser.add_argument("--url-sorteo", default=URL_SORTEO, help="Página de un sorteo; usa {concurso}")
+    parser.add_argument(
+        "--compactar",
+        action="store_true",
+        help="Vuelca el diario sobre Tris.csv aunque no haya sorteos nuevos"
+    )
+    # En el cron no se usan (no van a git): la app y el servidor los arman en
+    # su propia máquina
+    parser.add_argument("--snapshot", action="store_true", help="Reconstruye tris_bin/snapshot.bin")
+    parser.add_argument("--agregados", action="store_true", help="Pone al día tris_bin/agregados.pkl")
+    args = parser.parse_args()
+
+    actualizar_tris(args.url, args.url_sorteo)
+    if args.snapshot:
+        construir_snapshot(CSV_LOCAL)
+        print(f"📦 Snapshot reconstruido en {RUTA_SNAPSHOT}")
+    if args.agregados:
+        sincronizar_agregados(cargar_historico(CSV_LOCAL))
+        print("🧮 Agregados al día")
+    if args.compactar:
+        compactar(CSV_LOCAL)
+        print("🗜️ Diario compactado en Tris.csv y tris_bin/")
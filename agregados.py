@@ -0,0 +1,184 @@
+import os
+import pickle
+
+import numpy as np
+
+from historico import (
+    DIR_BINARIO,
+    HORARIOS,
+    SIN_DIGITO,
+    indice_horario
+)
+from indice import IndiceJugadas
+from jugadas import SIN_JUGADA, codificar, espacio
+from relaciones import Relaciones
+
+RUTA_AGREGADOS = os.path.join(DIR_BINARIO, "agregados.pkl")
+# Subir cuando cambie la estructura guardada: los archivos viejos se ignoran
+VERSION_AGREGADOS = 2
+DIAS_RECIENTES = 30
+
+
+# ---------------- VENTANA DE LOS ÚLTIMOS DÍAS ----------------
+# Conteos de los sorteos con FECHA >= última fecha - dias, por horario y
+# global, más la frecuencia por casillero (horario × posición × dígito).
+# Los sorteos de la ventana se guardan aparte para poder descontarlos cuando
+# la ventana avanza, sin volver a recorrer el histórico.
+class VentanaDias:
+
+    def __init__(self, concursos, fechas, digitos, codigos, dias=DIAS_RECIENTES):
+        self.dias = dias
+        self.filas = {
+            "concurso": np.zeros(0, dtype=np.int32),
+            "fecha": np.zeros(0, dtype=np.int32),
+            "digitos": np.zeros((0, 5), dtype=np.uint8),
+            "codigos": {m: np.zeros(0, dtype=np.int32) for m in codigos}
+        }
+        self.conteo_global = {
+            m: np.zeros(espacio(m), dtype=np.int32) for m in codigos
+        }
+        self.conteo_horario = {
+            m: np.zeros((len(HORARIOS), espacio(m)), dtype=np.int32) for m in codigos
+        }
+        self.casilleros = np.zeros((len(HORARIOS), 5, 10), dtype=np.int32)
+
+        fechas = np.asarray(fechas)
+        if len(fechas):
+            inicio = np.searchsorted(fechas, fechas[-1] - dias)
+            self.agregar(
+                concursos[inicio:],
+                fechas[inicio:],
+                digitos[inicio:],
+                {m: c[inicio:] for m, c in codigos.items()}
+            )
+
+    def _sumar(self, concursos, digitos, codigos, signo):
+        horario = indice_horario(concursos)
+
+        for modalidad, codigo in codigos.items():
+            validos = codigo != SIN_JUGADA
+            np.add.at(self.conteo_global[modalidad], codigo[validos], signo)
+            np.add.at(
+                self.conteo_horario[modalidad],
+                (horario[validos], codigo[validos]),
+                signo
+            )
+
+        filas, posiciones = np.nonzero(digitos != SIN_DIGITO)
+        np.add.at(
+            self.casilleros,
+            (horario[filas], posiciones, digitos[filas, posiciones]),
+            signo
+        )
+
+    def agregar(self, concursos, fechas, digitos, codigos):
+        concursos = np.asarray(concursos, dtype=np.int32)
+        fechas = np.asarray(fechas, dtype=np.int32)
+        digitos = np.asarray(digitos, dtype=np.uint8)
+        codigos = {m: np.asarray(c, dtype=np.int32) for m, c in codigos.items()}
+        if not len(concursos):
+            return
+
+        self._sumar(concursos, digitos, codigos, 1)
+        self.filas = {
+            "concurso": np.concatenate([self.filas["concurso"], concursos]),
+            "fecha": np.concatenate([self.filas["fecha"], fechas]),
+            "digitos": np.concatenate([self.filas["digitos"], digitos]),
+            "codigos": {
+                m: np.concatenate([self.filas["codigos"][m], c])
+                for m, c in codigos.items()
+            }
+        }
+
+        # La ventana avanza: se descuentan solo los sorteos que quedaron fuera
+        corte = np.searchsorted(self.filas["fecha"], fechas[-1] - self.dias)
+        if corte:
+            self._sumar(
+                self.filas["concurso"][:corte],
+                self.filas["digitos"][:corte],
+                {m: c[:corte] for m, c in self.filas["codigos"].items()},
+                -1
+            )
+            self.filas = {
+                "concurso": self.filas["concurso"][corte:],
+                "fecha": self.filas["fecha"][corte:],
+                "digitos": self.filas["digitos"][corte:],
+                "codigos": {m: c[corte:] for m, c in self.filas["codigos"].items()}
+            }
+
+
+# ---------------- AGREGADOS DEL HISTÓRICO ----------------
+class Agregados:
+
+    def __init__(self, hist):
+        codigos = codificar(hist.digitos)
+        self.version = VERSION_AGREGADOS
+        self.filas = len(hist.concurso)
+        self.ultimo_concurso = int(hist.concurso[-1]) if self.filas else 0
+        self.indice = IndiceJugadas(hist.concurso, hist.fecha, codigos)
+        self.recientes = VentanaDias(
+            hist.concurso,
+            hist.fecha,
+            hist.digitos,
+            codigos
+        )
+        self.relaciones = Relaciones(hist.concurso, hist.digitos)
+
+    def pendientes(self, hist):
+        # Posición del primer sorteo que todavía no está en los agregados, o
+        # None si el histórico cambió por debajo (hay que reconstruir).
+        desde = int(np.searchsorted(hist.concurso, self.ultimo_concurso, side="right"))
+        if desde != self.filas:
+            return None
+        return desde
+
+    def agregar(self, hist, desde):
+        concursos = np.asarray(hist.concurso[desde:])
+        fechas = np.asarray(hist.fecha[desde:])
+        digitos = np.asarray(hist.digitos[desde:])
+        if not len(concursos):
+            return
+
+        codigos = codificar(digitos)
+        self.indice.agregar(concursos, fechas, codigos)
+        self.recientes.agregar(concursos, fechas, digitos, codigos)
+        self.relaciones.agregar(concursos, digitos)
+        self.filas += len(concursos)
+        self.ultimo_concurso = int(concursos[-1])
+
+
+def _guardar(agregados, ruta):
+    temporal = ruta + ".tmp"
+    with open(temporal, "wb") as f:
+        pickle.dump(agregados, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporal, ruta)
+
+
+def _leer(ruta):
+    try:
+        with open(ruta, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def sincronizar_agregados(hist, ruta=RUTA_AGREGADOS):
+    agregados = _leer(ruta)
+    if getattr(agregados, "version", None) != VERSION_AGREGADOS:
+        agregados = None
+
+    if agregados is not None:
+        desde = agregados.pendientes(hist)
+        if desde is None:
+            agregados = None
+        elif desde == len(hist.concurso):
+            return agregados
+        else:
+            agregados.agregar(hist, desde)
+
+    if agregados is None:
+        agregados = Agregados(hist)
+
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    _guardar(agregados, ruta)
+    return agregados
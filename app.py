@@ -1,14 +1,68 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-from itertools import permutations
 from datetime import date
 
+from historico import (
+    CSV_LOCAL,
+    HORARIOS,
+    SIN_DIGITO,
+    a_df,
+    a_dias,
+    agregar_sorteos,
+    cargar_historico,
+    dias_a_fechas,
+    indice_horario,
+    version_historico
+)
+from jugadas import (
+    MODALIDADES,
+    SIN_JUGADA,
+    a_codigo,
+    calcular_premio,
+    codificar_df,
+    espacio,
+    formatear,
+    largo
+)
+from agregados import DIAS_RECIENTES, sincronizar_agregados
+from calendario import DIAS_SEMANA, MESES, CalendarioJugadas
+from calientes import GLOBAL, GRUPOS, SORTEOS_RECIENTES, CalientesFrios, filas_ventana
+from casilleros import (
+    POSICIONES,
+    distribucion,
+    mas_caliente,
+    mas_frio,
+    tensor_casilleros
+)
+from ingesta import leer_sorteos, resumen_rechazos
+from intervalos import IntervalosJugadas
+from piramide import piramides, tasa_aciertos
+from rachas import SORTEOS_RACHAS, detectar_rachas, mas_frecuentes
+from relaciones import (
+    PARES,
+    contar_coocurrencia,
+    contar_transiciones,
+    matriz,
+    nombre_par,
+    probabilidades,
+    siguientes
+)
+from perfil import RUTA_PERFIL, Perfil, perfil_activo
+from ranking import TOP_LUCKY, calcular_ranking
+from snapshot import MAX_LUCKY, Snapshot, abrir_snapshot, construir_en_segundo_plano, version_snapshot
+from similares import RANGO_CERCANO, TIPOS, similares_rankeados
+
 # ---------------- CONFIGURACIÓN GENERAL ----------------
 st.set_page_config(
     page_title="Pronósticos Lucky – TRIS",
     layout="wide"
 )
 
+# Con TRIS_PERFIL=1 o ?perfil=1 se mide cada sección (barra lateral y perfil.jsonl)
+perfil = Perfil(perfil_activo(st.query_params))
+perfil.seccion("Encabezado")
+
 st.title("🎲 Pronósticos Lucky – TRIS")
 st.write("Análisis estadístico basado únicamente en el histórico oficial del TRIS.")
 
@@ -18,7 +72,6 @@ _Este análisis es únicamente estadístico e informativo.
 No garantiza premios ni resultados._
 """)
 
-CSV_LOCAL = "Tris.csv"
 # ----------- ESTILOS VISUALES (TEXTO NEGRO FORZADO) -----------
 st.markdown("""
 <style>
@@ -77,10 +130,142 @@ div[data-baseweb="select"] {
 
 
 # ---------------- FUNCIONES AUXILIARES ----------------
-def cargar_local():
-    df = pd.read_csv(CSV_LOCAL)
-    df["CONCURSO"] = df["CONCURSO"].astype(int)
-    return df
+# Caché de proceso compartida por todas las sesiones (solo lectura: nunca se
+# modifica lo que devuelven). La llave es la versión de los archivos del
+# histórico y del snapshot, así que cualquier escritura genera una entrada
+# nueva y la anterior se descarta.
+def version_datos():
+    return version_historico(CSV_LOCAL), version_snapshot()
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def load_data(version):
+    # El binario ya viene ordenado por CONCURSO, con FECHA y HORARIO resueltos.
+    # Los agregados se abren con mmap desde el snapshot; si falta o es de otro
+    # histórico (no está en git) se usan los agregados incrementales y el
+    # snapshot se arma en segundo plano. La versión incluye la del snapshot,
+    # así que la carga siguiente a que termine ya lo abre.
+    hist = cargar_historico(CSV_LOCAL)
+    agregados = abrir_snapshot(hist)
+    if not isinstance(agregados, Snapshot):
+        construir_en_segundo_plano(CSV_LOCAL)
+    return hist, a_df(hist), codificar_df(hist.digitos), agregados
+
+@st.cache_resource(max_entries=len(MODALIDADES), show_spinner=False)
+def datos_modalidad(version, modalidad):
+    # Las siete modalidades ya están codificadas; cambiar de modalidad solo
+    # cambia la columna que se usa.
+    _, df, jugadas, _ = load_data(version)
+    df_modalidad = df.assign(JUGADA=jugadas[modalidad].to_numpy())
+    return df_modalidad[df_modalidad["JUGADA"] != SIN_JUGADA]
+
+@st.cache_resource(max_entries=4 * len(MODALIDADES), show_spinner=False)
+def ranking_lucky(version, modalidad, k, horario):
+    _, df, jugadas, agregados = load_data(version)
+    if isinstance(agregados, Snapshot):
+        return agregados.ranking(modalidad, k, horario)
+    return calcular_ranking(
+        jugadas[modalidad].to_numpy(),
+        df["CONCURSO"].to_numpy(),
+        modalidad,
+        k=k,
+        horario=horario
+    )
+
+@st.cache_resource(max_entries=4 * len(MODALIDADES), show_spinner=False)
+def calientes_frios(version, modalidad, dias, sorteos, fechas=None):
+    hist, _, jugadas, agregados = load_data(version)
+
+    if isinstance(agregados, Snapshot) and fechas is None:
+        precalculado = agregados.calientes_frios(modalidad, dias, sorteos)
+        if precalculado is not None:
+            return precalculado
+
+    # La ventana estándar ya se mantiene al día en los agregados
+    if dias == DIAS_RECIENTES and sorteos is None and fechas is None:
+        filas = agregados.recientes.filas
+        return CalientesFrios(
+            filas["concurso"],
+            filas["fecha"],
+            filas["codigos"][modalidad],
+            modalidad
+        )
+
+    filas = filas_ventana(hist, dias, sorteos, fechas)
+    return CalientesFrios(
+        hist.concurso[filas],
+        hist.fecha[filas],
+        jugadas[modalidad].to_numpy()[filas],
+        modalidad
+    )
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def casilleros_historicos(version):
+    hist, _, _, agregados = load_data(version)
+    if isinstance(agregados, Snapshot):
+        return agregados.casilleros_historicos()
+    return tensor_casilleros(hist.concurso, hist.digitos)
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def casilleros_ventana(version, dias, sorteos, fechas=None):
+    hist, _, _, agregados = load_data(version)
+
+    if isinstance(agregados, Snapshot) and fechas is None:
+        precalculado = agregados.casilleros(dias, sorteos)
+        if precalculado is not None:
+            return precalculado
+
+    if dias == DIAS_RECIENTES and sorteos is None and fechas is None:
+        por_horario = agregados.recientes.casilleros
+        return np.concatenate([por_horario, por_horario.sum(axis=0, keepdims=True)])
+
+    filas = filas_ventana(hist, dias, sorteos, fechas)
+    conteo, _ = tensor_casilleros(hist.concurso[filas], hist.digitos[filas])
+    return conteo
+
+# (coocurrencia, transiciones) de una ventana; sin ventana, todo el histórico
+@st.cache_resource(max_entries=4, show_spinner=False)
+def relaciones_ventana(version, dias=None, sorteos=None, fechas=None):
+    hist, _, _, agregados = load_data(version)
+    historico = dias is None and sorteos is None and fechas is None
+
+    if isinstance(agregados, Snapshot):
+        if historico:
+            return agregados.relaciones_historicas()
+        if fechas is None:
+            precalculado = agregados.relaciones(dias, sorteos)
+            if precalculado is not None:
+                return precalculado
+    elif historico:
+        return agregados.relaciones.coocurrencia, agregados.relaciones.transiciones
+
+    filas = filas_ventana(hist, dias, sorteos, fechas)
+    return (
+        contar_coocurrencia(hist.concurso[filas], hist.digitos[filas]),
+        contar_transiciones(hist.concurso[filas], hist.digitos[filas])
+    )
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def tasa_aciertos_piramide(version, desde, hasta):
+    hist, _, _, _ = load_data(version)
+    return tasa_aciertos(hist, desde, hasta)
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def intervalos_jugadas(version):
+    _, _, _, agregados = load_data(version)
+    return IntervalosJugadas(agregados.indice)
+
+@st.cache_resource(max_entries=1, show_spinner=False)
+def calendario_jugadas(version):
+    hist, _, jugadas, _ = load_data(version)
+    return CalendarioJugadas(hist, {m: jugadas[m].to_numpy() for m in MODALIDADES})
+
+# Sin la columna HORARIO, como Tris.csv; se copia una vez por versión, no en
+# cada rerun
+@st.cache_resource(max_entries=1, show_spinner=False)
+def cargar_local(version):
+    _, df, _, _ = load_data(version)
+    return df.drop(columns="HORARIO")
+
 def fecha_espanol(fecha):
     if pd.isna(fecha):
         return "Nunca"
@@ -96,44 +281,21 @@ def fecha_espanol(fecha):
 
     return f"{dias[fecha.weekday()]} {fecha.day} de {meses[fecha.month - 1]} de {fecha.year}"
 
-def guardar(df):
-    df = df.sort_values("CONCURSO", ascending=False)
-    df.to_csv(CSV_LOCAL, index=False)
-
-def normalizar_csv_externo(df):
-    df.columns = [c.strip() for c in df.columns]
-
-    df = df.rename(columns={
-        "Sorteo": "CONCURSO",
-        "Fecha": "FECHA"
-    })
-
-    if "Combinación Ganadora" in df.columns:
-        df["Combinación Ganadora"] = df["Combinación Ganadora"].astype(str).str.zfill(5)
-        df["R1"] = df["Combinación Ganadora"].str[0].astype(int)
-        df["R2"] = df["Combinación Ganadora"].str[1].astype(int)
-        df["R3"] = df["Combinación Ganadora"].str[2].astype(int)
-        df["R4"] = df["Combinación Ganadora"].str[3].astype(int)
-        df["R5"] = df["Combinación Ganadora"].str[4].astype(int)
-
-    df["NPRODUCTO"] = 60
-    if "Multiplicador" in df.columns:
-        df["Multiplicador"] = df["Multiplicador"].str.upper().replace({"SÍ": "SI"})
-    else:
-        df["Multiplicador"] = "NO"
-
-    return df[[
-        "NPRODUCTO",
-        "CONCURSO",
-        "R1", "R2", "R3", "R4", "R5",
-        "FECHA",
-        "Multiplicador"
-    ]]
+def guardar(nuevos):
+    # Los sorteos nuevos se anexan al diario; el CSV no se reescribe
+    hist, cantidad = agregar_sorteos(nuevos, CSV_LOCAL)
+    # Solo se suman los sorteos nuevos a los agregados ya calculados
+    sincronizar_agregados(hist)
+    load_data.clear()
+    datos_modalidad.clear()
+    ranking_lucky.clear()
+    return cantidad
 
 # ---------------- ACTUALIZACIÓN DEL HISTÓRICO ----------------
+perfil.seccion("Actualización del histórico")
 with st.expander("🔄 Actualización del histórico", expanded=False):
 
-    df_local = cargar_local()
+    df_local = cargar_local(version_datos())
     ultimo_concurso = df_local["CONCURSO"].max()
     st.info(f"📄 Último concurso registrado: {ultimo_concurso}")
 
@@ -143,20 +305,24 @@ with st.expander("🔄 Actualización del histórico", expanded=False):
 
     if archivo is not None:
         try:
-            df_nuevo = pd.read_csv(archivo)
-            df_nuevo = normalizar_csv_externo(df_nuevo)
-            nuevos = df_nuevo[df_nuevo["CONCURSO"] > ultimo_concurso]
+            nuevos, rechazos = leer_sorteos(archivo, df_local["CONCURSO"].to_numpy())
+        except ValueError as e:
+            st.error(f"No se pudo leer el archivo: {e}")
+        else:
+            if not rechazos.empty:
+                st.caption("Filas descartadas por motivo")
+                st.dataframe(resumen_rechazos(rechazos), hide_index=True)
+                invalidas = rechazos[rechazos["MOTIVO"] != "ya está en el histórico"]
+                if not invalidas.empty:
+                    st.warning(f"⚠️ {len(invalidas)} filas con errores (FILA es la línea del archivo):")
+                    st.dataframe(invalidas, hide_index=True)
 
             if nuevos.empty:
                 st.warning("No hay sorteos nuevos en el archivo.")
             else:
-                df_final = pd.concat([df_local, nuevos], ignore_index=True)
-                guardar(df_final)
-                st.success(f"✅ Se agregaron {len(nuevos)} sorteos nuevos.")
-                st.experimental_rerun()
-
-        except Exception as e:
-            st.error(f"Error al procesar el archivo: {e}")
+                cantidad = guardar(nuevos)
+                st.success(f"✅ Se agregaron {cantidad} sorteos nuevos.")
+                st.rerun()
 
     # ---- CAPTURA MANUAL ----
     st.markdown("### ✍️ Captura manual de sorteo")
@@ -180,142 +346,223 @@ with st.expander("🔄 Actualización del histórico", expanded=False):
                     "R3": int(numero[2]),
                     "R4": int(numero[3]),
                     "R5": int(numero[4]),
-                    "FECHA": fecha.strftime("%d/%m/%Y"),
+                    "FECHA": pd.Timestamp(fecha),
                     "Multiplicador": multiplicador
                 }
 
-                df_final = pd.concat([df_local, pd.DataFrame([nuevo])], ignore_index=True)
-                guardar(df_final)
+                guardar(pd.DataFrame([nuevo]))
                 st.success(f"✅ Sorteo {concurso_manual} agregado.")
-                st.experimental_rerun()
+                st.rerun()
 
 # ---------------- CARGA DE DATOS ORIGINAL ----------------
-def asignar_horario(concurso):
-    resto = concurso % 5
-
-    if resto == 3:
-        return "MEDIODIA"
-    elif resto == 4:
-        return "3PM"
-    elif resto == 0:
-        return "EXTRA"
-    elif resto == 1:
-        return "7PM"
-    elif resto == 2:
-        return "CLASICO"
-def load_data():
-    df = pd.read_csv(CSV_LOCAL)
-    df["FECHA"] = pd.to_datetime(df["FECHA"], format="%d/%m/%Y", errors="coerce")
-    df["HORARIO"] = df["CONCURSO"].apply(asignar_horario)
-    return df.sort_values("CONCURSO")
-
-df = load_data()
-total_sorteos = df["CONCURSO"].nunique()
+perfil.seccion("Carga de datos")
+version = version_datos()
+_, df, _, _ = load_data(version)
+perfil.filas(len(df))
 
 # ---------------- SELECCIÓN DE MODALIDAD ----------------
 st.subheader("🎯 Modalidad a analizar")
 
 modalidad = st.selectbox(
     "Selecciona la modalidad:",
-    [
-        "Directa 5",
-        "Directa 4",
-        "Directa 3",
-        "Par inicial",
-        "Par final",
-        "Número inicial",
-        "Número final"
-    ]
+    list(MODALIDADES)
 )
 
-# ---------------- EXTRACCIÓN DE JUGADA ----------------
-def extraer_valor(row):
-    try:
-        if modalidad == "Directa 5":
-            return f"{int(row.R1)}{int(row.R2)}{int(row.R3)}{int(row.R4)}{int(row.R5)}"
-        if modalidad == "Directa 4":
-            return f"{int(row.R2)}{int(row.R3)}{int(row.R4)}{int(row.R5)}"
-        if modalidad == "Directa 3":
-            return f"{int(row.R3)}{int(row.R4)}{int(row.R5)}"
-        if modalidad == "Par inicial":
-            return f"{int(row.R1)}{int(row.R2)}"
-        if modalidad == "Par final":
-            return f"{int(row.R4)}{int(row.R5)}"
-        if modalidad == "Número inicial":
-            return f"{int(row.R1)}"
-        if modalidad == "Número final":
-            return f"{int(row.R5)}"
-    except:
-        return None
-
-df["JUGADA"] = df.apply(extraer_valor, axis=1)
-df_modalidad = df.dropna(subset=["JUGADA"])
+# ---------------- SECCIONES ----------------
+# Cada pestaña es un fragmento: sus propios controles solo vuelven a correr
+# esa sección, y con on_change="rerun" solo se calcula la pestaña abierta.
+# La pestaña queda en la URL (?pestana=...), así que se puede compartir.
+PESTANAS = [
+    "📊 Análisis",
+    "🍀 Lucky",
+    "🔥❄️ Calientes y fríos",
+    "📈 Rachas",
+    "🔗 Relaciones",
+    "🔺 Pirámide"
+]
+
+TIPOS_SIMILARES = {
+    "permutacion": "Permutación",
+    "cercano": "± k",
+    "hamming1": "1 dígito distinto",
+    "hamming2": "2 dígitos distintos"
+}
+METRICAS_SIMILARES = {
+    "cercania": "Cercanía",
+    "apariciones": "Apariciones",
+    "recientes": "Apariciones recientes",
+    "sin_salir": "Sorteos sin salir",
+    "promedio": "Promedio"
+}
+TOP_VECINOS = 25
+DESGLOSES_CALENDARIO = {
+    "dia_semana": "Día de la semana",
+    "mes": "Mes",
+    "anio": "Año"
+}
+
+# Selector de un rango [desde, hasta] dentro del histórico; mientras se elige
+# la segunda fecha el rango queda de un solo día
+def rango_de_fechas(hist, etiqueta, dias=365):
+    primera, ultima = (pd.Timestamp(f).date() for f in dias_a_fechas(hist.fecha[[0, -1]]))
+    valor = (max(primera, ultima - pd.Timedelta(days=dias)), ultima)
+    elegido = st.date_input(
+        etiqueta,
+        value=valor,
+        min_value=primera,
+        max_value=ultima,
+        format="DD/MM/YYYY"
+    ) or valor
+    return (elegido[0], elegido[-1])
+
+# Tope de una ventana por días o por sorteos: todo el histórico
+def maximo_ventana(hist, tipo_ventana):
+    if tipo_ventana == "Días":
+        return int(hist.fecha[-1]) - int(hist.fecha[0]) + 1
+    return len(hist.concurso)
 
 # ---------------- ANÁLISIS PRINCIPAL ----------------
-st.subheader("📊 Análisis estadístico")
+@st.fragment
+@perfil.medir("Análisis principal")
+def seccion_analisis(version, modalidad):
+    _, _, _, agregados = load_data(version)
+    indice = agregados.indice
+    df_modalidad = datos_modalidad(version, modalidad)
+    perfil.filas(len(df_modalidad))
 
-seleccion = st.text_input("Ingresa el número a analizar:")
+    st.subheader("📊 Análisis estadístico")
 
-if seleccion and seleccion.isdigit():
-    data = df_modalidad[df_modalidad["JUGADA"] == seleccion]
+    seleccion = st.text_input("Ingresa el número a analizar:")
+    codigo = a_codigo(seleccion, modalidad)
 
-    apariciones = len(data)
+    if not (seleccion and seleccion.isdigit()):
+        st.info("Escribe un número para ver sus estadísticas.")
+        return
 
-    if apariciones > 0:
-        ultima_fecha = data["FECHA"].max()
-        ultimo_concurso = data["CONCURSO"].max()
-        sorteos_sin_salir = df_modalidad["CONCURSO"].max() - ultimo_concurso
-        promedio = total_sorteos / apariciones
+    consulta = indice.consultar(modalidad, [codigo]).iloc[0]
+    apariciones = int(consulta["APARICIONES"])
 
+    if apariciones > 0:
+        ultima_fecha = consulta["ULTIMA_FECHA"]
+        sorteos_sin_salir = consulta["SIN_SALIR"]
+        promedio = consulta["PROMEDIO"]
     else:
         ultima_fecha = None
         sorteos_sin_salir = None
         promedio = None
-        estado = "Sin datos"
-
-# --- Apariciones por rangos ---
-ult_100 = df_modalidad.tail(100)
-ult_1000 = df_modalidad.tail(1000)
-ult_10000 = df_modalidad.tail(10000)
-
-a_100 = len(ult_100[ult_100["JUGADA"] == seleccion])
-a_1000 = len(ult_1000[ult_1000["JUGADA"] == seleccion])
-a_10000 = len(ult_10000[ult_10000["JUGADA"] == seleccion])
-
-st.markdown("### 📅 Comportamiento reciente")
-st.write(f"• Última vez: **{fecha_espanol(ultima_fecha)}**")
-st.write(f"• Sorteos sin salir: **{sorteos_sin_salir if sorteos_sin_salir is not None else 'N/A'}**")
-st.write(f"• Promedio histórico: **{round(promedio, 2) if promedio else 'N/A'}**")
-
-st.markdown("### 📌 Apariciones históricas")
-st.write(f"• Histórico completo: **{apariciones}** veces")
-st.write(f"• Últimos 10,000 sorteos: **{a_10000}** veces")
-st.write(f"• Últimos 1,000 sorteos: **{a_1000}** veces")
-st.write(f"• Últimos 100 sorteos: **{a_100}** veces")
-
 
+    # --- Apariciones por rangos ---
+    a_100 = consulta["ULT_100"]
+    a_1000 = consulta["ULT_1000"]
+    a_10000 = consulta["ULT_10000"]
+
+    st.markdown("### 📅 Comportamiento reciente")
+    st.write(f"• Última vez: **{fecha_espanol(ultima_fecha)}**")
+    st.write(f"• Sorteos sin salir: **{sorteos_sin_salir if sorteos_sin_salir is not None else 'N/A'}**")
+    st.write(f"• Promedio histórico: **{round(promedio, 2) if promedio else 'N/A'}**")
+
+    # --- Distribución de los huecos entre apariciones ---
+    intervalos = intervalos_jugadas(version)
+    huecos = {k: v[0] for k, v in intervalos.consultar(modalidad, [codigo if codigo is not None else -1]).items()}
+
+    st.markdown("### ⏱️ Sorteos entre apariciones")
+    if huecos["HUECOS"]:
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Mínimo", f"{huecos['MINIMO']:,.0f}")
+        col2.metric("Mediana", f"{huecos['MEDIANA']:,.0f}")
+        col3.metric("Máximo", f"{huecos['MAXIMO']:,.0f}")
+        col4.metric("Percentil del hueco actual", f"{huecos['PERCENTIL_ACTUAL']:.0f}")
+        st.caption(
+            f"P10 {huecos['P10']:,.0f} · P25 {huecos['P25']:,.0f} · "
+            f"P75 {huecos['P75']:,.0f} · P90 {huecos['P90']:,.0f} "
+            f"({huecos['HUECOS']:,} huecos). Lleva {huecos['ACTUAL']:,} sorteos sin salir."
+        )
+        histograma = intervalos.histograma(modalidad, codigo)
+        st.bar_chart(
+            pd.DataFrame({
+                "Huecos": histograma["CONTEO"].to_numpy()
+            }, index=[
+                f"{d:,}+" if h < 0 else f"{d:,}–{h:,}"
+                for d, h in zip(histograma["DESDE"], histograma["HASTA"])
+            ]),
+            sort=False
+        )
+    else:
+        st.write("• Necesita al menos dos apariciones para tener huecos.")
+
+    st.markdown("### 📌 Apariciones históricas")
+    st.write(f"• Histórico completo: **{apariciones}** veces")
+    st.write(f"• Últimos 10,000 sorteos: **{a_10000}** veces")
+    st.write(f"• Últimos 1,000 sorteos: **{a_1000}** veces")
+    st.write(f"• Últimos 100 sorteos: **{a_100}** veces")
+
+    # --- Ventanas a elección (sin copiar el histórico) ---
+    sorteos_modalidad = len(df_modalidad)
+    n_ventana = st.slider(
+        "Ventana personalizada (últimos N sorteos)",
+        min_value=1,
+        max_value=sorteos_modalidad,
+        value=min(500, sorteos_modalidad)
+    )
+    a_n = indice.apariciones_ultimos(modalidad, [codigo], n_ventana)[0]
+    st.write(f"• Últimos {n_ventana:,} sorteos: **{a_n}** veces")
+
+    concurso_min = int(df_modalidad["CONCURSO"].iloc[0])
+    concurso_max = int(df_modalidad["CONCURSO"].iloc[-1])
+    rango_concursos = st.slider(
+        "Rango de concursos",
+        min_value=concurso_min,
+        max_value=concurso_max,
+        value=(max(concurso_min, concurso_max - 1000), concurso_max)
+    )
+    a_rango = indice.apariciones_entre(modalidad, [codigo], *rango_concursos)[0]
+    st.write(
+        f"• Entre los concursos {rango_concursos[0]} y {rango_concursos[1]}: "
+        f"**{a_rango}** veces"
+    )
 
+    # --- Por calendario (rango de fechas + días de la semana / meses) ---
+    if codigo is not None:
+        st.markdown("### 📆 Por calendario")
+        calendario = calendario_jugadas(version)
+
+        por = st.radio("Desglose", list(DESGLOSES_CALENDARIO), horizontal=True, format_func=DESGLOSES_CALENDARIO.get)
+        desglose = calendario.desglose(modalidad, codigo, por)
+        st.bar_chart(
+            pd.DataFrame(
+                {"Apariciones cada 1,000 sorteos": 1000 * desglose["FRECUENCIA"].to_numpy()},
+                index=desglose["CASILLA"]
+            ),
+            sort=False
+        )
 
-# ---------------- CÁLCULO DE PREMIOS ----------------
-st.subheader("💰 Cálculo de premio máximo posible")
+        hist, _, _, _ = load_data(version)
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            fechas = rango_de_fechas(hist, "Entre las fechas")
+        with col2:
+            dias_semana = st.multiselect("Días de la semana", range(7), format_func=DIAS_SEMANA.__getitem__)
+        with col3:
+            meses = st.multiselect("Meses", range(1, 13), format_func=lambda m: MESES[m - 1])
+
+        filtros = {"dias_semana": dias_semana or None, "meses": meses or None}
+        a_calendario = calendario.apariciones(modalidad, [codigo], *fechas, **filtros)[0]
+        sorteos_calendario = calendario.sorteos(modalidad, *fechas, **filtros)
+        st.write(
+            f"• Del {fechas[0]:%d/%m/%Y} al {fechas[1]:%d/%m/%Y}"
+            + (f", en {', '.join(DIAS_SEMANA[d] for d in dias_semana)}" if dias_semana else "")
+            + (f", en {', '.join(MESES[m - 1] for m in meses)}" if meses else "")
+            + f": **{a_calendario}** veces en {sorteos_calendario:,} sorteos "
+            f"(al azar se esperarían {sorteos_calendario / espacio(modalidad):,.1f})"
+        )
 
-apuesta = st.number_input("Monto de la apuesta ($)", min_value=1, step=1)
-multiplicador = st.number_input("Monto del multiplicador ($)", min_value=0, step=1)
+    # ---------------- CÁLCULO DE PREMIOS ----------------
+    st.subheader("💰 Cálculo de premio máximo posible")
 
-tabla_pagos = {
-    "Directa 5": {"base": 50000, "multi": 200000},
-    "Directa 4": {"base": 5000, "multi": 20000},
-    "Directa 3": {"base": 500, "multi": 2000},
-    "Par inicial": {"base": 50, "multi": 200},
-    "Par final": {"base": 50, "multi": 200},
-    "Número inicial": {"base": 5, "multi": 20},
-    "Número final": {"base": 5, "multi": 20}
-}
+    apuesta = st.number_input("Monto de la apuesta ($)", min_value=1, step=1)
+    multiplicador = st.number_input("Monto del multiplicador ($)", min_value=0, step=1)
 
-if seleccion and seleccion.isdigit():
-    pago_base = tabla_pagos[modalidad]["base"] * apuesta
-    pago_multi = tabla_pagos[modalidad]["multi"] * multiplicador
-    total = pago_base + pago_multi
+    pago_base, pago_multi, total = calcular_premio(modalidad, apuesta, multiplicador)
 
     st.success("🎯 **Desglose de premios**")
     st.write(f"**Modalidad:** {modalidad}")
@@ -324,290 +571,403 @@ if seleccion and seleccion.isdigit():
     st.write(f"**Premio por multiplicador:** ${pago_multi:,}")
     st.write(f"### 🏆 **Premio total máximo posible:** ${total:,}")
 
-# ---------------- NÚMEROS SIMILARES ----------------
-st.subheader("🔄 Números similares")
-
-def generar_similares_inteligentes(num):
-    similares = []
-    largo = len(num)
-    digitos = list(num)
-
-    perms = set("".join(p) for p in permutations(digitos, largo))
-    perms.discard(num)
-
-    for p in perms:
-        if len(similares) < 5:
-            similares.append(p)
-
-    n = int(num)
-    if len(similares) < 5:
-        similares.append(str(n - 1).zfill(largo))
-    if len(similares) < 5:
-        similares.append(str(n + 1).zfill(largo))
-
-    if len(similares) < 5:
-        similares.append("0" + num)
-    if len(similares) < 5:
-        similares.append(num + "0")
-
-    return list(dict.fromkeys(similares))[:5]
-
-if seleccion and seleccion.isdigit():
-    similares = generar_similares_inteligentes(seleccion)
-    tabla = []
-
-    for s in similares:
-        d = df_modalidad[df_modalidad["JUGADA"] == s]
-        if len(d) > 0:
-            tabla.append({
-                "Número": s,
-                "Apariciones": len(d),
-                "Última fecha": d["FECHA"].max().date(),
-                "Sorteos sin salir": df_modalidad["CONCURSO"].max() - d["CONCURSO"].max(),
-                "Promedio": round(total_sorteos / len(d), 2)
-            })
-        else:
-            tabla.append({
-                "Número": s,
-                "Apariciones": 0,
-                "Última fecha": "Nunca",
-                "Sorteos sin salir": "N/A",
-                "Promedio": "N/A"
-            })
-
-    st.dataframe(pd.DataFrame(tabla))
-
-# ---------------- RECOMENDACIONES LUCKY ----------------
-st.subheader("🍀 Recomendaciones Lucky")
-
-ranking = []
+    # ---------------- NÚMEROS SIMILARES ----------------
+    st.subheader("🔄 Números similares")
 
-for j, g in df_modalidad.groupby("JUGADA"):
-    apar = len(g)
-    ult = g["CONCURSO"].max()
-    sin = df_modalidad["CONCURSO"].max() - ult
-    prom = total_sorteos / apar
-    score = sin / prom
-    ranking.append((j, score, sin, prom))
+    if codigo is None:
+        st.warning(f"El número debe tener {largo(modalidad)} dígitos para buscar similares.")
+        return
 
-ranking = sorted(ranking, key=lambda x: x[1], reverse=True)[:3]
-
-for r in ranking:
-    st.write(
-        f"🔹 **{r[0]}** — Históricamente aparece cada {int(r[3])} sorteos "
-        f"y actualmente lleva {r[2]} sin salir."
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        tipos = st.multiselect(
+            "Vecinos",
+            TIPOS,
+            default=list(TIPOS),
+            format_func=TIPOS_SIMILARES.get
+        )
+    with col2:
+        metrica = st.selectbox("Ordenar por", list(METRICAS_SIMILARES), format_func=METRICAS_SIMILARES.get)
+    with col3:
+        rango = st.number_input("Distancia ±k", min_value=1, max_value=100, value=RANGO_CERCANO)
+
+    vecinos = similares_rankeados(
+        indice,
+        modalidad,
+        codigo,
+        tipos=tipos,
+        rango=rango,
+        metrica=metrica,
+        ventana=n_ventana
+    )
+    st.caption(f"{len(vecinos):,} candidatos; «Recientes» cuenta los últimos {n_ventana:,} sorteos.")
+
+    st.dataframe(
+        pd.DataFrame({
+            "Número": vecinos["NUMERO"],
+            "Tipo": vecinos["TIPO"].map(TIPOS_SIMILARES),
+            "Apariciones": vecinos["APARICIONES"],
+            "Recientes": vecinos["RECIENTES"],
+            "Última fecha": vecinos["ULTIMA_FECHA"].dt.date,
+            "Sorteos sin salir": vecinos["SIN_SALIR"].where(vecinos["APARICIONES"] > 0),
+            "Promedio": vecinos["PROMEDIO"].round(2)
+        }).head(TOP_VECINOS),
+        hide_index=True
     )
-    # ---------------- CALIENTES Y FRÍOS GLOBAL (30 DÍAS) ----------------
-st.subheader("🔥❄️ Números calientes y fríos (últimos 30 días - global)")
-
-ultima_fecha = df["FECHA"].max()
-fecha_inicio = ultima_fecha - pd.Timedelta(days=30)
-
-df_30_global = df[df["FECHA"] >= fecha_inicio].copy()
-
-# Aplicar modalidad seleccionada
-df_30_global["JUGADA_MODALIDAD"] = df_30_global.apply(extraer_valor, axis=1)
-
-df_30_global = df_30_global.dropna(subset=["JUGADA_MODALIDAD"])
-
-if not df_30_global.empty:
 
-    conteo = df_30_global["JUGADA_MODALIDAD"].value_counts()
+# ---------------- RECOMENDACIONES LUCKY ----------------
+@st.fragment
+@perfil.medir("Ranking Lucky")
+def seccion_lucky(version, modalidad):
+    st.subheader("🍀 Recomendaciones Lucky")
 
-    # 🔥 CALIENTES
-    calientes = conteo.head(5)
+    col1, col2 = st.columns(2)
 
-    # ❄️ FRÍOS (basado en atraso)
-    ultimo_concurso_global = df_30_global["CONCURSO"].max()
+    with col1:
+        top_k = st.number_input(
+            "Cantidad de recomendaciones",
+            min_value=1,
+            max_value=MAX_LUCKY,
+            value=TOP_LUCKY,
+            step=1
+        )
 
-    ranking_frios = []
+    with col2:
+        horario_lucky = st.selectbox(
+            "Horario de las recomendaciones",
+            ["TODOS"] + HORARIOS
+        )
 
-    for jugada, grupo in df_30_global.groupby("JUGADA_MODALIDAD"):
-        ultimo = grupo["CONCURSO"].max()
-        sin_salir = ultimo_concurso_global - ultimo
-        ranking_frios.append((jugada, sin_salir))
+    ranking = ranking_lucky(
+        version,
+        modalidad,
+        int(top_k),
+        None if horario_lucky == "TODOS" else horario_lucky
+    )
 
-    ranking_frios = sorted(ranking_frios, key=lambda x: x[1], reverse=True)[:5]
+    for r in ranking.itertuples():
+        if r.APARICIONES == 0:
+            st.write(
+                f"🔹 **{formatear(r.CODIGO, modalidad)}** — Nunca ha salido "
+                f"en {r.SIN_SALIR} sorteos."
+            )
+        else:
+            st.write(
+                f"🔹 **{formatear(r.CODIGO, modalidad)}** — Históricamente aparece cada {int(r.PROMEDIO)} sorteos "
+                f"y actualmente lleva {r.SIN_SALIR} sin salir."
+            )
 
+# ---------------- VENTANA DE CALIENTES Y FRÍOS ----------------
+def mostrar_calientes_frios(datos, grupo, modalidad):
     col1, col2 = st.columns(2)
 
     # 🔥 CALIENTES
     with col1:
         st.markdown(f"### 🔥 5 Más Calientes ({modalidad})")
 
-        for num, freq in calientes.items():
-            datos_num = df_30_global[df_30_global["JUGADA_MODALIDAD"] == num]
-            fechas = datos_num["FECHA"].dt.strftime("%d/%m").tolist()
+        for c in datos.calientes(grupo).itertuples():
+            fechas = pd.DatetimeIndex(dias_a_fechas(c.FECHAS)).strftime("%d/%m")
 
-            ultimo = datos_num["CONCURSO"].max()
-            sin_salir = ultimo_concurso_global - ultimo
-
-            st.write(f"{num} — {freq} veces")
+            st.write(f"{formatear(c.CODIGO, modalidad)} — {c.CONTEO} veces")
             st.caption("Fechas: " + ", ".join(fechas))
-            st.caption(f"Sorteos sin salir: {sin_salir}")
+            st.caption(f"Sorteos sin salir: {c.SIN_SALIR}")
 
-    # ❄️ FRÍOS
+    # ❄️ FRÍOS (basado en atraso)
     with col2:
         st.markdown(f"### ❄️ 5 Más Fríos ({modalidad})")
 
-        for num, sin in ranking_frios:
-            st.write(f"{num} — {sin} sorteos sin salir")
-
-else:
-    st.warning("No hay datos suficientes en los últimos 30 días.")
-# ---------------- CALIENTES Y FRÍOS (ÚLTIMOS 30 DÍAS) ----------------
-st.subheader("🔥❄️ Números calientes y fríos (últimos 30 días) por horario")
-
-ultima_fecha = df["FECHA"].max()
-fecha_inicio = ultima_fecha - pd.Timedelta(days=30)
-
-df_30 = df[df["FECHA"] >= fecha_inicio]
-
-horario_seleccionado = st.selectbox(
-    "Selecciona el horario:",
-    ["MEDIODIA", "3PM", "EXTRA", "7PM", "CLASICO"]
-)
-
-df_horario = df_30[df_30["HORARIO"] == horario_seleccionado]
-
-if not df_horario.empty:
-
-    df_horario = df_horario.copy()
-    df_horario["JUGADA_MODALIDAD"] = df_horario.apply(extraer_valor, axis=1)
-
-    conteo = df_horario["JUGADA_MODALIDAD"].value_counts()
-    calientes = conteo.head(5)
-
-    ultimo_concurso_horario = df_horario["CONCURSO"].max()
-
-    ranking_frios = []
-
-    for jugada, grupo in df_horario.groupby("JUGADA_MODALIDAD"):
-        ultimo = grupo["CONCURSO"].max()
-        sin_salir = ultimo_concurso_horario - ultimo
-        ranking_frios.append((jugada, sin_salir))
-
-    ranking_frios = sorted(ranking_frios, key=lambda x: x[1], reverse=True)[:5]
+        for f in datos.frios(grupo).itertuples():
+            st.write(f"{formatear(f.CODIGO, modalidad)} — {f.SIN_SALIR} sorteos sin salir")
 
+@st.fragment
+@perfil.medir("Calientes y fríos")
+def seccion_calientes(version, modalidad):
+    hist, _, _, _ = load_data(version)
     col1, col2 = st.columns(2)
 
     with col1:
+        tipo_ventana = st.radio(
+            "Ventana de calientes y fríos",
+            ["Días", "Sorteos", "Fechas"],
+            horizontal=True
+        )
 
-        st.markdown(f"### 🔥 5 Más Calientes ({modalidad})")
-
-        for num, freq in calientes.items():
-
-            datos_num = df_horario[df_horario["JUGADA_MODALIDAD"] == num]
+    with col2:
+        if tipo_ventana == "Fechas":
+            fechas = rango_de_fechas(hist, "Fechas a considerar")
+        else:
+            largo_ventana = int(st.number_input(
+                f"{tipo_ventana} a considerar",
+                min_value=1,
+                max_value=maximo_ventana(hist, tipo_ventana),
+                value=DIAS_RECIENTES if tipo_ventana == "Días" else SORTEOS_RECIENTES,
+                step=1
+            ))
+
+    if tipo_ventana == "Días":
+        etiqueta_ventana = f"últimos {largo_ventana} días"
+        ventana = (largo_ventana, None, None)
+    elif tipo_ventana == "Sorteos":
+        etiqueta_ventana = f"últimos {largo_ventana} sorteos"
+        ventana = (None, largo_ventana, None)
+    else:
+        etiqueta_ventana = f"del {fechas[0]:%d/%m/%Y} al {fechas[1]:%d/%m/%Y}"
+        ventana = (None, None, fechas)
+    datos_calientes = calientes_frios(version, modalidad, *ventana)
 
-            fechas = datos_num["FECHA"].dt.strftime("%d/%m").tolist()
+    # ---------------- CALIENTES Y FRÍOS GLOBAL ----------------
+    st.subheader(f"🔥❄️ Números calientes y fríos ({etiqueta_ventana} - global)")
 
-            ultimo = datos_num["CONCURSO"].max()
+    if not datos_calientes.vacio(GLOBAL):
+        mostrar_calientes_frios(datos_calientes, GLOBAL, modalidad)
+    else:
+        st.warning(f"No hay datos suficientes ({etiqueta_ventana}).")
 
-            sin_salir = ultimo_concurso_horario - ultimo
+    # ---------------- CALIENTES Y FRÍOS POR HORARIO ----------------
+    st.subheader(f"🔥❄️ Números calientes y fríos ({etiqueta_ventana}) por horario")
 
-            st.write(f"{num} — {freq} veces")
-            st.caption("Fechas: " + ", ".join(fechas))
-            st.caption(f"Sorteos sin salir: {sin_salir}")
+    horario_seleccionado = st.selectbox(
+        "Selecciona el horario:",
+        HORARIOS
+    )
 
-    with col2:
+    if not datos_calientes.vacio(horario_seleccionado):
+        mostrar_calientes_frios(datos_calientes, horario_seleccionado, modalidad)
+    else:
+        st.warning(f"No hay datos para ese horario ({etiqueta_ventana}).")
 
-        st.markdown(f"### ❄️ 5 Más Fríos ({modalidad})")
+    # ---------------- CALIENTES POR CASILLERO ----------------
+    st.subheader(f"🔥 Frecuencia por casillero ({etiqueta_ventana})")
 
-        for num, sin in ranking_frios:
-            st.write(f"{num} — {sin} sorteos sin salir")
+    conteo_casilleros = casilleros_ventana(version, *ventana)
+    _, ultimo_casilleros = casilleros_historicos(version)
 
-else:
-    st.warning("No hay datos para ese horario en los últimos 30 días.")
+    horario_pos = st.selectbox(
+        "Selecciona horario para analizar casilleros",
+        GRUPOS
+    )
 
-# ---------------- CALIENTES POR CASILLERO ----------------
-st.subheader("🔥 Frecuencia por casillero (últimos 30 días)")
+    g = GRUPOS.index(horario_pos)
 
-ultima_fecha = df["FECHA"].max()
-fecha_inicio = ultima_fecha - pd.Timedelta(days=30)
+    if conteo_casilleros[g].sum() > 0:
 
-df_30 = df[df["FECHA"] >= fecha_inicio]
+        for p, nombre in enumerate(POSICIONES):
 
-horario_pos = st.selectbox(
-    "Selecciona horario para analizar casilleros",
-    ["MEDIODIA", "3PM", "EXTRA", "7PM", "CLASICO"]
-)
+            conteo = conteo_casilleros[g, p]
+            ultimo = ultimo_casilleros[g, p]
 
-df_pos = df_30[df_30["HORARIO"] == horario_pos]
+            caliente = mas_caliente(conteo, ultimo)
+            frio = mas_frio(conteo, ultimo)
 
-if not df_pos.empty:
+            st.write(
+                f"**{nombre}** → 🔥 Más frecuente: **{caliente}** ({conteo[caliente]} veces) | "
+                f"❄️ Más frío: **{frio}** ({conteo[frio]} veces, último concurso: {ultimo[frio] or 'nunca'})"
+            )
 
-    posiciones = {
-        "Decena de millar": "R1",
-        "Unidad de millar": "R2",
-        "Centenas": "R3",
-        "Decenas": "R4",
-        "Unidades": "R5"
-    }
+        with st.expander("Distribución completa 0–9"):
+            st.write("Apariciones por dígito")
+            st.dataframe(distribucion(conteo_casilleros, horario_pos))
+            st.write("Último concurso por dígito (todo el histórico)")
+            st.dataframe(distribucion(ultimo_casilleros, horario_pos))
 
-    for nombre, col in posiciones.items():
+    else:
+        st.warning("No hay datos suficientes para ese horario.")
 
-        conteo = df_pos[col].value_counts()
+# ---------------- DETECTOR DE RACHAS ----------------
+@st.fragment
+@perfil.medir("Detector de rachas")
+def seccion_rachas(version):
+    hist, _, _, _ = load_data(version)
+
+    sorteos_rachas = st.slider(
+        "Sorteos a revisar para rachas",
+        min_value=2,
+        max_value=len(hist.concurso),
+        value=SORTEOS_RACHAS
+    )
 
-        caliente = conteo.idxmax()
-        freq = conteo.max()
+    st.subheader(f"📈 Detector de rachas (últimos {sorteos_rachas:,} sorteos)")
 
-        frio = conteo.idxmin()
+    por_digito, por_posicion = detectar_rachas(hist.digitos, sorteos_rachas)
+    perfil.filas(sorteos_rachas)
 
+    for r in mas_frecuentes(por_digito).itertuples():
         st.write(
-            f"**{nombre}** → 🔥 Más frecuente: **{caliente}** ({freq} veces) | ❄️ Más frío: **{frio}**"
+            f"🔹 Dígito **{r.DIGITO}** apareció **{r.APARICIONES} veces** "
+            f"en los últimos {sorteos_rachas:,} sorteos"
         )
 
-else:
-    st.warning("No hay datos suficientes para ese horario.")
-    
-# ---------------- DETECTOR DE RACHAS ----------------
-st.subheader("📈 Detector de rachas (últimos 20 sorteos)")
-
-ultimos = df.sort_values("CONCURSO", ascending=False).head(20)
-
-conteo = {}
-
-for _, fila in ultimos.iterrows():
-
-    digitos = [
-        str(fila["R1"]),
-        str(fila["R2"]),
-        str(fila["R3"]),
-        str(fila["R4"]),
-        str(fila["R5"])
-    ]
-
-    for d in digitos:
-        conteo[d] = conteo.get(d, 0) + 1
+    with st.expander("Rachas por dígito y por posición"):
+        st.write("Sorteos seguidos en que salió cada dígito (en cualquier posición)")
+        st.dataframe(por_digito.rename(columns={
+            "DIGITO": "Dígito",
+            "APARICIONES": "Apariciones",
+            "SORTEOS_CON_DIGITO": "Sorteos con el dígito",
+            "RACHA_MAXIMA": "Racha más larga",
+            "RACHA_ACTUAL": "Racha actual"
+        }), hide_index=True)
+
+        st.write("Mismo dígito repetido en la misma posición en sorteos seguidos")
+        st.dataframe(por_posicion.rename(columns={
+            "POSICION": "Posición",
+            "REPETICIONES": "Repeticiones",
+            "RACHA_MAXIMA": "Racha más larga",
+            "RACHA_ACTUAL": "Racha actual",
+            "DIGITO_ACTUAL": "Dígito actual"
+        }), hide_index=True)
+
+
+# ---------------- RELACIONES ENTRE DÍGITOS ----------------
+@st.fragment
+@perfil.medir("Relaciones entre dígitos")
+def seccion_relaciones(version):
+    hist, _, _, _ = load_data(version)
+    col1, col2 = st.columns(2)
 
-ranking = sorted(conteo.items(), key=lambda x: x[1], reverse=True)
+    with col1:
+        tipo_ventana = st.radio(
+            "Sorteos a considerar",
+            ["Todo el histórico", "Días", "Sorteos", "Fechas"],
+            horizontal=True
+        )
 
-for num, veces in ranking[:5]:
-    st.write(f"🔹 Dígito **{num}** apareció **{veces} veces** en los últimos 20 sorteos")
+    with col2:
+        if tipo_ventana == "Fechas":
+            fechas = rango_de_fechas(hist, "Fechas de las relaciones")
+        elif tipo_ventana != "Todo el histórico":
+            largo_ventana = int(st.number_input(
+                f"{tipo_ventana} de las relaciones",
+                min_value=2,
+                max_value=maximo_ventana(hist, tipo_ventana),
+                value=DIAS_RECIENTES if tipo_ventana == "Días" else SORTEOS_RECIENTES,
+                step=1
+            ))
+
+    if tipo_ventana == "Días":
+        etiqueta_ventana = f"últimos {largo_ventana} días"
+        ventana = (largo_ventana, None, None)
+    elif tipo_ventana == "Sorteos":
+        etiqueta_ventana = f"últimos {largo_ventana} sorteos"
+        ventana = (None, largo_ventana, None)
+    elif tipo_ventana == "Fechas":
+        etiqueta_ventana = f"del {fechas[0]:%d/%m/%Y} al {fechas[1]:%d/%m/%Y}"
+        ventana = (None, None, fechas)
+    else:
+        etiqueta_ventana = "todo el histórico"
+        ventana = (None, None, None)
+    coocurrencia, transiciones = relaciones_ventana(version, *ventana)
 
-# ---------------- PIRÁMIDE DEL DÍA ----------------
-st.subheader("🔺 Pirámide del día")
+    # ---------------- COOCURRENCIA ----------------
+    st.subheader(f"🔗 Dígitos que salen juntos ({etiqueta_ventana})")
 
-hoy = pd.Timestamp.today()
+    col1, col2 = st.columns(2)
+    with col1:
+        par = st.selectbox("Par de posiciones", range(len(PARES)), format_func=nombre_par)
+    with col2:
+        grupo = st.selectbox("Horario de la coocurrencia", GRUPOS, index=len(GRUPOS) - 1)
 
-fecha_str = hoy.strftime("%d%m%Y")
+    i, j = PARES[par]
+    conteo = coocurrencia[GRUPOS.index(grupo), par]
+    if conteo.sum() > 0:
+        st.write(f"Filas: dígito en **{POSICIONES[i]}** · columnas: dígito en **{POSICIONES[j]}**")
+        st.dataframe(matriz(conteo, filas=POSICIONES[i]))
+    else:
+        st.warning(f"No hay sorteos para ese horario ({etiqueta_ventana}).")
 
-st.write(f"Fecha usada: **{fecha_str}**")
+    # ---------------- TRANSICIONES ----------------
+    st.subheader(f"➡️ Del sorteo anterior al siguiente ({etiqueta_ventana})")
 
-fila = [int(x) for x in fecha_str]
+    col1, col2 = st.columns(2)
+    with col1:
+        origen = st.selectbox("Horario del sorteo anterior", GRUPOS, index=len(GRUPOS) - 1)
+    with col2:
+        posicion = st.selectbox("Posición", range(len(POSICIONES)), format_func=lambda p: POSICIONES[p])
+
+    conteo = transiciones[GRUPOS.index(origen), posicion]
+    if conteo.sum() > 0:
+        st.write("Filas: dígito en el sorteo anterior · columnas: dígito en el siguiente")
+        ver_probabilidad = st.toggle("Ver como probabilidad")
+        st.dataframe(matriz(
+            probabilidades(conteo).round(3) if ver_probabilidad else conteo,
+            filas="Anterior"
+        ))
+    else:
+        st.warning(f"No hay sorteos seguidos para ese horario ({etiqueta_ventana}).")
 
-piramide = [fila]
+    # ---------------- DESPUÉS DEL ÚLTIMO SORTEO ----------------
+    ultimo = int(hist.concurso[-1])
+    horario = HORARIOS[indice_horario(ultimo)]
+    digitos = hist.digitos[-1]
+    st.subheader(f"🔮 Después del último sorteo ({ultimo}, {horario})")
+    st.write(
+        f"Qué salió en cada posición cuando el sorteo anterior fue {horario} "
+        f"con los mismos dígitos ({etiqueta_ventana})"
+    )
+    tabla = siguientes(transiciones, horario, digitos)
+    st.dataframe(pd.DataFrame(
+        tabla,
+        index=pd.Index(
+            [f"{nombre} (venía {d})" if d != SIN_DIGITO else nombre for nombre, d in zip(POSICIONES, digitos)],
+            name="Posición"
+        ),
+        columns=[str(d) for d in range(10)]
+    ))
 
-while len(fila) > 1:
+# ---------------- PIRÁMIDE DEL DÍA ----------------
+@st.fragment
+@perfil.medir("Pirámide del día")
+def seccion_piramide(version):
+    hist, _, _, _ = load_data(version)
+    st.subheader("🔺 Pirámide del día")
 
-    nueva = []
+    hoy = pd.Timestamp.today()
 
-    for i in range(len(fila) - 1):
-        suma = (fila[i] + fila[i+1]) % 10
-        nueva.append(suma)
+    st.write(f"Fecha usada: **{hoy:%d%m%Y}**")
 
-    piramide.append(nueva)
-    fila = nueva
+    for nivel in piramides([a_dias(hoy)]):
+        st.write(" ".join(str(n) for n in nivel[0]))
 
-for nivel in piramide:
-    st.write(" ".join(str(n) for n in nivel))
+    # ---------------- ACIERTOS EN EL HISTÓRICO ----------------
+    st.subheader("🎯 ¿Cuántas veces acertó la pirámide?")
+    st.write(
+        "Se arma la pirámide de la fecha de cada sorteo y se cuenta un acierto "
+        "cuando la jugada aparece seguida, de izquierda a derecha, en algún "
+        "nivel. La tasa esperada es la de elegir al azar tantas jugadas "
+        "distintas como da la pirámide."
+    )
+    desde, hasta = rango_de_fechas(hist, "Fechas a revisar", dias=int(hist.fecha[-1] - hist.fecha[0]))
+    tabla = tasa_aciertos_piramide(version, desde, hasta)
+    perfil.filas(int(tabla["SORTEOS"].max()))
+    st.dataframe(tabla.rename(columns={
+        "MODALIDAD": "Modalidad",
+        "SORTEOS": "Sorteos",
+        "ACIERTOS": "Aciertos",
+        "TASA": "Tasa de acierto",
+        "ESPERADA": "Tasa esperada al azar",
+        "RAZON": "Tasa / esperada"
+    }), hide_index=True)
+
+pestanas = st.tabs(PESTANAS, key="pestana", on_change="rerun", bind="query-params")
+secciones = [
+    lambda: seccion_analisis(version, modalidad),
+    lambda: seccion_lucky(version, modalidad),
+    lambda: seccion_calientes(version, modalidad),
+    lambda: seccion_rachas(version),
+    lambda: seccion_relaciones(version),
+    lambda: seccion_piramide(version)
+]
+
+for pestana, seccion in zip(pestanas, secciones):
+    if pestana.open:
+        with pestana:
+            seccion()
+
+# ---------------- PERFIL ----------------
+registros = perfil.terminar()
+if registros:
+    tabla_perfil = pd.DataFrame(registros).set_index("seccion")
+    st.sidebar.markdown("### ⏱️ Perfil de la ejecución")
+    st.sidebar.dataframe(tabla_perfil)
+    st.sidebar.caption(
+        f"Total: {tabla_perfil['ms'].sum():,.0f} ms · registrado en {RUTA_PERFIL}"
+    )
@@ -0,0 +1,271 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from calientes import GLOBAL, GRUPOS, TOP_CALIENTES
+from historico import CSV_LOCAL, HORARIOS, cargar_historico, indice_horario
+from jugadas import MODALIDADES, SIN_JUGADA, TABLA_PAGOS, codificar, espacio
+from ranking import TOP_LUCKY
+
+ESTRATEGIAS = ("lucky", "calientes", "frios")
+# Sorteos del grupo que se usan para arrancar antes de empezar a apostar
+CALENTAMIENTO = 100
+DIAS_VENTANA = 30
+# Candidatos que se siguen de cerca entre reconstrucciones del ranking Lucky
+# (nunca menos que k, o el top-k no podría quedar cubierto)
+CANDIDATOS = 64
+# Reconstrucciones seguidas en una misma recomendación antes de darse por vencido
+MAX_RECONSTRUCCIONES = 3
+
+
+# ---------------- LUCKY INCREMENTAL ----------------
+# Mismo orden que calcular_ranking: score = sin_salir / (total / conteo), que
+# entre jugadas del mismo momento ordena igual que el entero
+# max(conteo, 1) * sin_salir (el total es común). Entre dos apariciones ese
+# entero crece en línea recta con pendiente max(conteo, 1), así que no hace
+# falta recalcular las 10^k jugadas en cada sorteo:
+#   - se siguen de cerca los CANDIDATOS mejores de la última reconstrucción
+#     (y cualquier otra jugada que salga después, porque cambió su recta),
+#   - del resto, las jugadas con la misma pendiente nunca se cruzan, así que
+#     basta con la mejor de cada pendiente ("líder").
+# Si un líder entra al top-k se reconstruye; el resultado es exacto.
+class LuckyIncremental:
+
+    def __init__(self, tamano, k=TOP_LUCKY):
+        self.k = k
+        self.candidatos_max = max(CANDIDATOS, k)
+        self.conteo = np.zeros(tamano, dtype=np.int64)
+        self.ultima = np.full(tamano, -1, dtype=np.int64)
+        self.validos = 0
+        self.reconstrucciones = 0
+        self._reconstruir()
+
+    def _scores(self, codigos):
+        return np.maximum(self.conteo[codigos], 1) * (self.validos - 1 - self.ultima[codigos])
+
+    def _reconstruir(self):
+        self.reconstrucciones += 1
+        todos = np.arange(len(self.conteo))
+        orden = np.lexsort((todos, -self._scores(todos)))
+        self.candidatos = orden[:self.candidatos_max]
+        self._seguidos = np.zeros(len(self.conteo), dtype=bool)
+        self._seguidos[self.candidatos] = True
+
+        # Líder de cada pendiente entre los que no se siguen: el que lleva más
+        # sin salir y, a igual atraso, el menor
+        resto = orden[self.candidatos_max:]
+        pendiente = np.maximum(self.conteo[resto], 1)
+        resto = resto[np.lexsort((resto, self.ultima[resto], pendiente))]
+        _, primero = np.unique(np.maximum(self.conteo[resto], 1), return_index=True)
+        self.lideres = resto[primero]
+
+    def recomendar(self):
+        # Tras reconstruir los mejores siempre son candidatos; si no, algo se
+        # rompió y es mejor fallar que quedarse girando
+        for _ in range(MAX_RECONSTRUCCIONES):
+            codigos = np.concatenate([self.candidatos, self.lideres])
+            mejores = codigos[np.lexsort((codigos, -self._scores(codigos)))][:self.k]
+            if self._seguidos[mejores].all():
+                return mejores
+            self._reconstruir()
+        raise RuntimeError(f"El ranking Lucky no converge tras {MAX_RECONSTRUCCIONES} reconstrucciones")
+
+    def agregar(self, codigo):
+        if codigo == SIN_JUGADA:
+            return
+        reconstruir = False
+        if not self._seguidos[codigo]:
+            # Cambió su recta: pasa a seguirse. Si era líder su pendiente
+            # necesita otro, y si ya hay demasiados seguidos se poda.
+            self._seguidos[codigo] = True
+            self.candidatos = np.append(self.candidatos, codigo)
+            reconstruir = codigo in self.lideres or len(self.candidatos) > 4 * self.candidatos_max
+        self.conteo[codigo] += 1
+        self.ultima[codigo] = self.validos
+        self.validos += 1
+        if reconstruir:
+            self._reconstruir()
+
+
+# ---------------- CALIENTES Y FRÍOS EN VENTANA ----------------
+# La ventana son los sorteos del grupo con FECHA >= última fecha - dias; el
+# inicio solo avanza, así que cada paso ordena únicamente lo que está dentro.
+# Mismos criterios que CalientesFrios: calientes por conteo y, a igual conteo,
+# el que salió primero; fríos por el que lleva más sin salir y después el menor.
+class VentanaIncremental:
+
+    def __init__(self, codigo, fechas, estrategia, k=TOP_CALIENTES, dias=DIAS_VENTANA):
+        self.codigo = codigo
+        self.fechas = fechas
+        self.estrategia = estrategia
+        self.k = k
+        self.dias = dias
+        self.inicio = 0
+        self.fin = 0
+
+    def recomendar(self):
+        if not self.fin:
+            return np.zeros(0, dtype=np.int64)
+        limite = self.fechas[self.fin - 1] - self.dias
+        while self.fechas[self.inicio] < limite:
+            self.inicio += 1
+
+        ventana = self.codigo[self.inicio:self.fin]
+        posicion = np.flatnonzero(ventana != SIN_JUGADA)
+        ventana = ventana[posicion]
+        if self.estrategia == "calientes":
+            codigos, primera, conteo = np.unique(ventana, return_index=True, return_counts=True)
+            orden = np.lexsort((primera, -conteo))
+        else:
+            codigos, desde_final = np.unique(ventana[::-1], return_index=True)
+            orden = np.lexsort((codigos, -desde_final))
+        return codigos[orden][:self.k]
+
+    def agregar(self, codigo):
+        self.fin += 1
+
+
+# ---------------- SIMULACIÓN ----------------
+# Se recorre la serie del grupo sorteo por sorteo: la recomendación sale del
+# estado con los sorteos anteriores y se cobra contra el sorteo siguiente.
+# Cada jugada recomendada lleva `apuesta` y, desde que existe el
+# multiplicador, `multiplicador` pesos más; este paga solo si el sorteo salió
+# con multiplicador.
+def simular(concursos, fechas, codigo, con_multiplicador, inicio_multiplicador, modalidad,
+            estrategia, k=None, apuesta=1, multiplicador=0, calentamiento=CALENTAMIENTO):
+    if estrategia == "lucky":
+        estado = LuckyIncremental(espacio(modalidad), k or TOP_LUCKY)
+    else:
+        estado = VentanaIncremental(codigo, fechas, estrategia, k or TOP_CALIENTES)
+
+    pagos = TABLA_PAGOS[modalidad]
+    apuestas = aciertos = costo = premios = 0
+    aciertos_por_sorteo = np.zeros(len(codigo), dtype=bool)
+    neto = np.zeros(len(codigo), dtype=np.int64)
+
+    for t, real in enumerate(codigo):
+        if t >= calentamiento and real != SIN_JUGADA:
+            jugadas = estado.recomendar()
+            monto_multi = multiplicador if concursos[t] >= inicio_multiplicador else 0
+            apuestas += len(jugadas)
+            costo += len(jugadas) * (apuesta + monto_multi)
+            if (jugadas == real).any():
+                aciertos += 1
+                aciertos_por_sorteo[t] = True
+                premios += pagos["base"] * apuesta
+                if con_multiplicador[t]:
+                    premios += pagos["multi"] * monto_multi
+            neto[t] = premios - costo
+        elif t:
+            neto[t] = neto[t - 1]
+        estado.agregar(real)
+
+    sorteos = int(((np.arange(len(codigo)) >= calentamiento) & (codigo != SIN_JUGADA)).sum())
+    resumen = {
+        "SORTEOS": sorteos,
+        "APUESTAS": apuestas,
+        "ACIERTOS": aciertos,
+        "TASA_ACIERTO": aciertos / sorteos if sorteos else np.nan,
+        "TASA_AZAR": apuestas / sorteos / espacio(modalidad) if sorteos else np.nan,
+        "COSTO": costo,
+        "PREMIOS": premios,
+        "NETO": premios - costo,
+        "RETORNO": premios / costo if costo else np.nan,
+        "PEOR_NETO": int(neto.min()) if len(neto) else 0
+    }
+    if estrategia == "lucky":
+        resumen["RECONSTRUCCIONES"] = estado.reconstrucciones
+    return resumen, pd.DataFrame({"CONCURSO": concursos, "ACIERTO": aciertos_por_sorteo, "NETO": neto})
+
+
+def serie_grupo(hist, codigos, modalidad, grupo):
+    if grupo == GLOBAL:
+        filas = slice(None)
+    else:
+        filas = indice_horario(hist.concurso) == HORARIOS.index(grupo)
+    return (
+        np.asarray(hist.concurso[filas]),
+        np.asarray(hist.fecha[filas]),
+        np.asarray(codigos[modalidad][filas]),
+        np.asarray(hist.multiplicador[filas])
+    )
+
+
+# ---------------- BARRIDO EN PARALELO ----------------
+# Cada proceso carga el histórico una vez (el binario se abre con mmap) y
+# después corre las combinaciones que le tocan.
+_HISTORICO = {}
+
+
+def _iniciar(csv):
+    hist = cargar_historico(csv)
+    _HISTORICO.update(hist=hist, codigos=codificar(hist.digitos))
+
+
+def _correr(combinacion, opciones):
+    modalidad, grupo, estrategia = combinacion
+    hist = _HISTORICO["hist"]
+    concursos, fechas, codigo, con_multiplicador = serie_grupo(hist, _HISTORICO["codigos"], modalidad, grupo)
+
+    inicio = time.perf_counter()
+    resumen, _ = simular(
+        concursos, fechas, codigo, con_multiplicador, hist.inicio_multiplicador,
+        modalidad, estrategia, **opciones
+    )
+    return {
+        "MODALIDAD": modalidad,
+        "GRUPO": grupo,
+        "ESTRATEGIA": estrategia,
+        **resumen,
+        "SEGUNDOS": round(time.perf_counter() - inicio, 2)
+    }
+
+
+def barrer(csv=CSV_LOCAL, modalidades=MODALIDADES, grupos=GRUPOS, estrategias=ESTRATEGIAS,
+           procesos=None, **opciones):
+    combinaciones = [(m, g, e) for m in modalidades for g in grupos for e in estrategias]
+    # Las más largas primero, para que no queden solas al final
+    combinaciones.sort(key=lambda c: (c[1] != GLOBAL, c[2] != "lucky", -espacio(c[0])))
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(csv,)) as pool:
+        resultados = list(pool.map(_correr, combinaciones, [opciones] * len(combinaciones)))
+    return pd.DataFrame(resultados).sort_values(["MODALIDAD", "GRUPO", "ESTRATEGIA"], ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backtest de las recomendaciones sobre el histórico")
+    parser.add_argument("--csv", default=CSV_LOCAL)
+    parser.add_argument("--modalidades", nargs="+", default=list(MODALIDADES), choices=list(MODALIDADES))
+    parser.add_argument("--grupos", nargs="+", default=GRUPOS, choices=GRUPOS)
+    parser.add_argument("--estrategias", nargs="+", default=list(ESTRATEGIAS), choices=ESTRATEGIAS)
+    parser.add_argument("--k", type=int, help="Jugadas por sorteo (por omisión las de la app)")
+    parser.add_argument("--apuesta", type=int, default=1)
+    parser.add_argument("--multiplicador", type=int, default=0)
+    parser.add_argument("--calentamiento", type=int, default=CALENTAMIENTO)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    parser.add_argument("--salida", help="Guarda la tabla en CSV")
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    tabla = barrer(
+        args.csv,
+        args.modalidades,
+        args.grupos,
+        args.estrategias,
+        procesos=args.procesos,
+        k=args.k,
+        apuesta=args.apuesta,
+        multiplicador=args.multiplicador,
+        calentamiento=args.calentamiento
+    )
+    if args.salida:
+        tabla.to_csv(args.salida, index=False)
+
+    with pd.option_context("display.width", 200, "display.max_columns", None, "display.max_rows", None):
+        print(tabla.drop(columns=["RECONSTRUCCIONES"], errors="ignore").to_string(index=False))
+    print(f"\n⏱️ {len(tabla)} combinaciones en {time.perf_counter() - inicio:.1f} s", file=sys.stderr)
@@ -0,0 +1,409 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from agregados import Agregados
+from calientes import GRUPOS, CalientesFrios, inicio_ventana
+from calendario import CalendarioJugadas
+from casilleros import tensor_casilleros
+from consultas import responder
+from historico import (
+    DIR_BINARIO,
+    SIN_DIGITO,
+    Historico,
+    a_df,
+    cargar_historico,
+    dias_a_fechas,
+    exportar_csv
+)
+from ingesta import leer_sorteos
+from intervalos import IntervalosJugadas
+from jugadas import MODALIDADES, codificar, espacio, largo
+from piramide import tasa_aciertos
+from rachas import detectar_rachas
+from ranking import calcular_ranking
+from relaciones import Relaciones, contar_coocurrencia, contar_transiciones
+from similares import generar_similares_inteligentes, similares_rankeados
+
+RUTA_BASE = "benchmark_base.json"
+TAMANOS = (10_000, 100_000, 1_000_000)
+SEMILLA = 2024
+# Un tiempo se marca como más lento si pasa de base * (1 + TOLERANCIA)
+TOLERANCIA = 0.5
+# Por debajo de esto las diferencias son ruido
+MINIMO_MS = 5
+# Tamaño del ciclo de referencia y cuántas veces se mide (se toma la mejor)
+REFERENCIA_N = 2_000_000
+REFERENCIA_REPETICIONES = 3
+CONSULTAS = 10_000
+# Sorteos por bloque al armar las relaciones de forma incremental
+BLOQUE_RELACIONES = 1_000
+
+# Proporciones del histórico real: los primeros sorteos no tienen R5 y el
+# multiplicador aparece ya avanzado el histórico.
+FRACCION_SIN_R5 = 0.25
+FRACCION_SIN_MULTIPLICADOR = 0.83
+
+
+# ---------------- GENERADOR DE HISTÓRICOS ----------------
+# Concursos consecutivos, así que el horario sale del mismo concurso % 5 que
+# usa asignar_horario; la fecha avanza un día cada cinco sorteos, con el
+# MEDIODIA como primer sorteo del día. Se escribe con exportar_csv, que deja
+# exactamente el formato de Tris.csv.
+def generar_historico(n, ruta, semilla=SEMILLA):
+    rng = np.random.default_rng(semilla)
+
+    primero = 3
+    concursos = np.arange(primero, primero + n, dtype=np.int32)
+    digitos = rng.integers(0, 10, size=(n, 5), dtype=np.uint8)
+    digitos[:int(n * FRACCION_SIN_R5), 4] = SIN_DIGITO
+
+    # La fecha más vieja que cabe en datetime64[ns] limita 1M de sorteos
+    dias = (concursos - primero) // 5
+    ultimo_dia = int(np.datetime64("2025-12-31", "D").astype(np.int32))
+    inicio = max(ultimo_dia - int(dias[-1]), int(np.datetime64("1700-01-01", "D").astype(np.int32)))
+
+    hist = Historico(
+        concurso=concursos,
+        digitos=digitos,
+        fecha=(inicio + dias).astype(np.int32),
+        multiplicador=rng.random(n) < 0.2,
+        inicio_multiplicador=int(concursos[int(n * FRACCION_SIN_MULTIPLICADOR)])
+    )
+    exportar_csv(hist, ruta)
+    return hist
+
+
+def _firma(*objetos):
+    h = hashlib.sha1()
+    for obj in objetos:
+        if isinstance(obj, pd.DataFrame):
+            h.update(pd.util.hash_pandas_object(obj, index=False).to_numpy().tobytes())
+        elif isinstance(obj, np.ndarray):
+            h.update(np.ascontiguousarray(obj).tobytes())
+        else:
+            h.update(repr(obj).encode())
+    return h.hexdigest()[:16]
+
+
+# El tiempo y la memoria se miden en corridas separadas: tracemalloc hace
+# mucho más lentas las etapas con muchas asignaciones chicas (pandas).
+def medir(funcion):
+    inicio = time.perf_counter()
+    resultado = funcion()
+    ms = (time.perf_counter() - inicio) * 1000
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, ms, pico / 2 ** 20
+
+
+# Los milisegundos dependen de la máquina: cada etapa se guarda también en
+# unidades de este ciclo (ordenar, contar y agrupar con numpy y pandas, como
+# las etapas), medido en la misma corrida. Así la base sirve en otra máquina.
+def referencia():
+    rng = np.random.default_rng(SEMILLA)
+    datos = rng.integers(0, 100_000, REFERENCIA_N)
+    mejor = np.inf
+    for _ in range(REFERENCIA_REPETICIONES):
+        inicio = time.perf_counter()
+        np.sort(datos)
+        np.bincount(datos)
+        pd.Series(datos).groupby(datos % 1000).max()
+        mejor = min(mejor, (time.perf_counter() - inicio) * 1000)
+    return mejor
+
+
+# ---------------- ETAPAS ----------------
+# Cada etapa recibe el contexto (lo que dejaron las anteriores) y devuelve
+# (valor para el contexto, firma del resultado).
+def _cargar_csv(ctx):
+    # Sin binario: se parsea el CSV y se escribe tris_bin/
+    shutil.rmtree(ctx["directorio"], ignore_errors=True)
+    hist = cargar_historico(ctx["csv"], ctx["directorio"])
+    return hist, _firma(hist.concurso, hist.digitos, hist.fecha, hist.multiplicador)
+
+
+def _cargar_binario(ctx):
+    hist = cargar_historico(ctx["csv"], ctx["directorio"])
+    return hist, _firma(hist.concurso, hist.digitos, hist.fecha, hist.multiplicador)
+
+
+def _ingesta(ctx):
+    # Lectura por bloques del CSV como si fuera un archivo subido a la app
+    validos, rechazos = leer_sorteos(ctx["csv"])
+    return validos, _firma(validos[["CONCURSO", "R1", "R5"]].fillna(-1), len(rechazos))
+
+
+def _a_df(ctx):
+    df = a_df(ctx["hist"])
+    return df, _firma(len(df), df["HORARIO"].value_counts().sort_index().tolist())
+
+
+def _codificar(ctx):
+    codigos = codificar(ctx["hist"].digitos)
+    return codigos, _firma(*codigos.values())
+
+
+def _agregados(ctx):
+    agregados = Agregados(ctx["hist"])
+    conteos = [agregados.indice.modalidades[m]["conteo"] for m in MODALIDADES]
+    return agregados, _firma(*conteos)
+
+
+def _consultas(ctx):
+    rng = np.random.default_rng(SEMILLA)
+    modalidades = rng.choice(list(MODALIDADES), CONSULTAS)
+    numeros = [str(rng.integers(10 ** largo(m))).zfill(largo(m)) for m in modalidades]
+    consultas = pd.DataFrame({"MODALIDAD": modalidades, "NUMERO": numeros})
+    respuesta = responder(ctx["agregados"], consultas, ventanas=[500])
+    return respuesta, _firma(respuesta[["APARICIONES", "SIN_SALIR", "ULT_500"]].fillna(-1))
+
+
+def _intervalos(ctx):
+    intervalos = IntervalosJugadas(ctx["agregados"].indice)
+    resumen = [
+        intervalos.consultar(m, np.arange(espacio(m)))
+        for m in MODALIDADES
+    ]
+    return intervalos, _firma(
+        *[np.nan_to_num(r["MEDIANA"]) for r in resumen],
+        *[r["PERCENTIL_ACTUAL"] for r in resumen]
+    )
+
+
+def _calendario(ctx):
+    hist = ctx["hist"]
+    calendario = CalendarioJugadas(hist, ctx["codificar"])
+    rng = np.random.default_rng(SEMILLA)
+    ultimo = int(hist.fecha[-1])
+    conteos = [
+        calendario.apariciones(
+            m,
+            rng.integers(espacio(m), size=20).tolist(),
+            dias_a_fechas([ultimo - 730])[0],
+            dias_a_fechas([ultimo])[0],
+            dias_semana=[0, 5]
+        )
+        for m in MODALIDADES
+    ]
+    conteos += [calendario.conteo(m, dias_a_fechas([ultimo - 365])[0], meses=[1, 2, 3]) for m in MODALIDADES]
+    return calendario, _firma(*conteos, *[calendario.modalidades[m]["mes"] for m in MODALIDADES])
+
+
+def _ranking(ctx):
+    rankings = [
+        calcular_ranking(ctx["codificar"][m], ctx["hist"].concurso, m)
+        for m in MODALIDADES
+    ]
+    return rankings, _firma(*rankings)
+
+
+def _calientes(ctx):
+    hist = ctx["hist"]
+    inicio = inicio_ventana(hist.fecha, dias=30)
+    tablas = []
+    for m in MODALIDADES:
+        datos = CalientesFrios(
+            hist.concurso[inicio:],
+            hist.fecha[inicio:],
+            ctx["codificar"][m][inicio:],
+            m
+        )
+        for grupo in GRUPOS:
+            tablas.append(datos.calientes(grupo)[["CODIGO", "CONTEO", "SIN_SALIR"]])
+            tablas.append(datos.frios(grupo))
+    return tablas, _firma(*tablas)
+
+
+def _casilleros(ctx):
+    conteo, ultimo = tensor_casilleros(ctx["hist"].concurso, ctx["hist"].digitos)
+    return conteo, _firma(conteo, ultimo)
+
+
+def _relaciones(ctx):
+    hist = ctx["hist"]
+    inicio = inicio_ventana(hist.fecha, dias=30)
+    ventana = (
+        contar_coocurrencia(hist.concurso[inicio:], hist.digitos[inicio:]),
+        contar_transiciones(hist.concurso[inicio:], hist.digitos[inicio:])
+    )
+    # Por bloques como llegan los sorteos: debe dar lo mismo que de una vez
+    relaciones = Relaciones()
+    for desde in range(0, len(hist.concurso), BLOQUE_RELACIONES):
+        hasta = desde + BLOQUE_RELACIONES
+        relaciones.agregar(hist.concurso[desde:hasta], hist.digitos[desde:hasta])
+    completo = ctx["agregados"].relaciones
+    if not (np.array_equal(relaciones.coocurrencia, completo.coocurrencia)
+            and np.array_equal(relaciones.transiciones, completo.transiciones)):
+        raise AssertionError("Las relaciones por bloques no coinciden con las de una vez")
+    return relaciones, _firma(relaciones.coocurrencia, relaciones.transiciones, *ventana)
+
+
+def _piramide(ctx):
+    tabla = tasa_aciertos(ctx["hist"])
+    return tabla, _firma(tabla[["SORTEOS", "ACIERTOS"]])
+
+
+def _rachas(ctx):
+    por_digito, por_posicion = detectar_rachas(ctx["hist"].digitos, len(ctx["hist"].concurso))
+    return por_digito, _firma(por_digito, por_posicion)
+
+
+def _similares(ctx):
+    rng = np.random.default_rng(SEMILLA)
+    numeros = [str(n).zfill(5) for n in rng.integers(100000, size=1000)]
+    similares = [generar_similares_inteligentes(n) for n in numeros]
+    return similares, _firma(similares)
+
+
+def _vecindarios(ctx):
+    rng = np.random.default_rng(SEMILLA)
+    tablas = [
+        similares_rankeados(ctx["agregados"].indice, "Directa 5", c, metrica="apariciones", ventana=1000, n=25)
+        for c in rng.integers(100000, size=100)
+    ]
+    return tablas, _firma(*[t[["CODIGO", "APARICIONES", "RECIENTES"]] for t in tablas])
+
+
+ETAPAS = [
+    ("cargar_csv", _cargar_csv, "hist"),
+    ("cargar_binario", _cargar_binario, "hist"),
+    ("ingesta", _ingesta, None),
+    ("a_df", _a_df, "df"),
+    ("codificar", _codificar, "codificar"),
+    ("agregados", _agregados, "agregados"),
+    ("consultas", _consultas, None),
+    ("intervalos", _intervalos, None),
+    ("calendario", _calendario, None),
+    ("ranking", _ranking, None),
+    ("calientes", _calientes, None),
+    ("casilleros", _casilleros, None),
+    ("relaciones", _relaciones, None),
+    ("piramide", _piramide, None),
+    ("rachas", _rachas, None),
+    ("similares", _similares, None),
+    ("vecindarios", _vecindarios, None)
+]
+
+
+def correr(n, directorio):
+    csv = os.path.join(directorio, f"tris_{n}.csv")
+    ctx = {"csv": csv, "directorio": os.path.join(directorio, f"{DIR_BINARIO}_{n}")}
+
+    ref = referencia()
+    resultados = {"referencia": {"ms": round(ref, 1)}}
+
+    _, ms, mb = medir(lambda: generar_historico(n, csv))
+    resultados["generar"] = {"ms": round(ms, 1), "rel": round(ms / ref, 3), "mb": round(mb, 1)}
+
+    for nombre, etapa, llave in ETAPAS:
+        (valor, firma), ms, mb = medir(lambda: etapa(ctx))
+        if llave:
+            ctx[llave] = valor
+        resultados[nombre] = {"ms": round(ms, 1), "rel": round(ms / ref, 3), "mb": round(mb, 1), "firma": firma}
+    return resultados
+
+
+# ---------------- COMPARACIÓN CON LA BASE ----------------
+# Solo un resultado distinto (la firma) es una falla. Los tiempos se comparan
+# en unidades del ciclo de referencia y se avisan, sin fallar: aun así varían
+# con la máquina y la carga del momento.
+def comparar(actual, base, tolerancia=TOLERANCIA):
+    cambios, lentas = [], []
+    for tamano, etapas in actual.items():
+        ref = etapas["referencia"]["ms"]
+        for nombre, medida in etapas.items():
+            previa = base.get(tamano, {}).get(nombre)
+            if previa is None or nombre == "referencia":
+                continue
+            if previa.get("firma") != medida.get("firma"):
+                cambios.append(f"{tamano} {nombre}: el resultado cambió")
+            if "rel" not in previa:
+                continue
+            limite = max(previa["rel"] * (1 + tolerancia), previa["rel"] + MINIMO_MS / ref)
+            if medida["rel"] > limite:
+                lentas.append(
+                    f"{tamano} {nombre}: {medida['rel']:.3f} referencias (base {previa['rel']:.3f})"
+                )
+    return cambios, lentas
+
+
+def imprimir(actual, base):
+    for tamano, etapas in actual.items():
+        print(f"\n== {int(tamano):,} sorteos (referencia {etapas['referencia']['ms']:.1f} ms) ==")
+        print(f"{'etapa':<16}{'ms':>10}{'ref':>10}{'base ref':>10}{'MB pico':>10}")
+        for nombre, medida in etapas.items():
+            if nombre == "referencia":
+                continue
+            previa = base.get(tamano, {}).get(nombre, {}).get("rel")
+            previa = f"{previa:.3f}" if previa is not None else "-"
+            print(f"{nombre:<16}{medida['ms']:>10.1f}{medida['rel']:>10.3f}{previa:>10}{medida['mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Mide cada etapa del análisis con históricos sintéticos",
+        epilog="Sale con 1 si algún resultado cambió (y con --estricto, si alguna etapa es más lenta). "
+               "Los tiempos se comparan en unidades de un ciclo de referencia medido en la misma corrida, "
+               "así que la base sirve en otra máquina; para comparar milisegundos, regenerar la base en "
+               "esta con --guardar-base."
+    )
+    parser.add_argument("--tamanos", type=int, nargs="+", default=list(TAMANOS))
+    parser.add_argument("--base", default=RUTA_BASE, help="Archivo con la medición de referencia")
+    parser.add_argument("--guardar-base", action="store_true", help="Reemplaza la base con esta medición")
+    parser.add_argument(
+        "--tolerancia",
+        type=float,
+        default=TOLERANCIA,
+        help="Margen antes de avisar que una etapa es más lenta"
+    )
+    parser.add_argument(
+        "--estricto",
+        action="store_true",
+        help="Sale con 1 también si una etapa es más lenta que la base"
+    )
+    args = parser.parse_args()
+
+    try:
+        with open(args.base) as f:
+            base = json.load(f)
+    except (OSError, ValueError):
+        base = {}
+
+    with tempfile.TemporaryDirectory() as directorio:
+        actual = {str(n): correr(n, directorio) for n in args.tamanos}
+
+    imprimir(actual, base)
+
+    if args.guardar_base:
+        base.update(actual)
+        with open(args.base, "w") as f:
+            json.dump(base, f, indent=2, sort_keys=True)
+        print(f"\n💾 Base guardada en {args.base}")
+        sys.exit(0)
+
+    cambios, lentas = comparar(actual, base, args.tolerancia)
+    if lentas:
+        print("\n🐢 Más lentas que la base (en unidades de la referencia):")
+        for p in lentas:
+            print(f"  {p}")
+    if cambios:
+        print("\n❌ Resultados distintos a la base:")
+        for p in cambios:
+            print(f"  {p}")
+        sys.exit(1)
+    if lentas and args.estricto:
+        sys.exit(1)
+    print("\n✅ Mismos resultados que la base")
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+
+from historico import filas_fechas
+from jugadas import SIN_JUGADA, espacio
+
+DIAS_SEMANA = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+MESES = (
+    "Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio",
+    "Julio", "Agosto", "Septiembre", "Octubre", "Noviembre", "Diciembre"
+)
+DESGLOSES = ("dia_semana", "mes", "anio")
+# Desgloses con tabla completa (jugadas x casillas); el de años depende de
+# cuántos años tenga el histórico y sale de las filas de la jugada
+PRECALCULADOS = ("dia_semana", "mes")
+
+
+# Días desde 1970-01-01 (un jueves) -> lunes=0 ... domingo=6, mes 1-12, año
+def partes_fecha(dias):
+    dias = np.asarray(dias, dtype=np.int64)
+    fechas = dias.astype("datetime64[D]")
+    meses = fechas.astype("datetime64[M]").astype(np.int64)
+    return (dias + 3) % 7, meses % 12 + 1, meses // 12 + 1970
+
+
+# ---------------- CALENDARIO POR JUGADA ----------------
+# Por cada sorteo se guarda su día de la semana, mes y año (un byte o dos),
+# así que cualquier filtro de calendario es una máscara sobre un rango ya
+# recortado del histórico. Por modalidad se guardan:
+#   - las filas de cada jugada en formato CSR (filas[inicio[c]:inicio[c + 1]],
+#     en orden), para contar una jugada en cualquier rango y filtro leyendo
+#     solo sus apariciones,
+#   - los desgloses completos por día de la semana y por mes de todas las
+#     jugadas, y los sorteos de la modalidad en cada día, mes y año.
+class CalendarioJugadas:
+
+    def __init__(self, hist, codigos):
+        self.hist = hist
+        self.codigos = codigos
+        dia, mes, anio = partes_fecha(hist.fecha)
+        self.primer_anio = int(anio.min()) if len(anio) else 1970
+        self.partes = {
+            "dia_semana": dia.astype(np.uint8),
+            "mes": (mes - 1).astype(np.uint8),
+            "anio": (anio - self.primer_anio).astype(np.uint16)
+        }
+        self.casillas = {
+            "dia_semana": len(DIAS_SEMANA),
+            "mes": len(MESES),
+            "anio": int(anio.max()) - self.primer_anio + 1 if len(anio) else 1
+        }
+        self.modalidades = {
+            modalidad: self._construir(np.asarray(codigo), modalidad)
+            for modalidad, codigo in codigos.items()
+        }
+
+    def _construir(self, codigo, modalidad):
+        tamano = espacio(modalidad)
+        filas = np.flatnonzero(codigo != SIN_JUGADA)
+        validos = codigo[filas].astype(np.int64)
+
+        # Llave código * n + fila: una sola ordenación deja cada jugada con
+        # sus filas en orden
+        n = len(codigo)
+        duenos, filas_ordenadas = np.divmod(np.sort(validos * n + filas), n)
+        inicio = np.zeros(tamano + 1, dtype=np.int64)
+        np.cumsum(np.bincount(validos, minlength=tamano), out=inicio[1:])
+
+        datos = {"inicio": inicio.astype(np.int32), "filas": filas_ordenadas.astype(np.int32)}
+        for por in DESGLOSES:
+            casillas = self.casillas[por]
+            parte = self.partes[por][filas_ordenadas].astype(np.int64)
+            datos[f"sorteos_{por}"] = np.bincount(parte, minlength=casillas)
+            if por in PRECALCULADOS:
+                conteo = np.bincount(duenos * casillas + parte, minlength=tamano * casillas)
+                datos[por] = conteo.reshape(tamano, casillas).astype(np.min_scalar_type(conteo.max(initial=0)))
+        return datos
+
+    def etiquetas(self, por):
+        if por == "dia_semana":
+            return list(DIAS_SEMANA)
+        if por == "mes":
+            return list(MESES)
+        return [str(self.primer_anio + i) for i in range(self.casillas["anio"])]
+
+    # Frecuencia de una jugada en cada día de la semana, mes o año, junto con
+    # los sorteos de la modalidad en esa casilla
+    def desglose(self, modalidad, codigo, por):
+        datos = self.modalidades[modalidad]
+        if por in PRECALCULADOS:
+            apariciones = datos[por][codigo].astype(np.int64)
+        else:
+            filas = datos["filas"][datos["inicio"][codigo]:datos["inicio"][codigo + 1]]
+            apariciones = np.bincount(self.partes[por][filas], minlength=self.casillas[por])
+        sorteos = datos[f"sorteos_{por}"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            frecuencia = np.where(sorteos > 0, apariciones / sorteos, np.nan)
+        return pd.DataFrame({
+            "CASILLA": self.etiquetas(por),
+            "APARICIONES": apariciones,
+            "SORTEOS": sorteos,
+            "FRECUENCIA": frecuencia
+        })
+
+    # ---- Rangos con filtros de calendario ----
+    # `dias_semana` (0=lunes), `meses` (1-12) y `anios` son listas; None no filtra
+    def _filtro(self, filas, dias_semana=None, meses=None, anios=None):
+        mascara = None
+        for por, valores, base in (
+            ("dia_semana", dias_semana, 0),
+            ("mes", meses, 1),
+            ("anio", anios, self.primer_anio)
+        ):
+            if valores is None:
+                continue
+            permitidos = np.zeros(self.casillas[por], dtype=bool)
+            valores = np.asarray(list(valores), dtype=np.int64) - base
+            permitidos[valores[(valores >= 0) & (valores < len(permitidos))]] = True
+            parte = permitidos[self.partes[por][filas]]
+            mascara = parte if mascara is None else mascara & parte
+        return mascara
+
+    def sorteos(self, modalidad, desde=None, hasta=None, **filtros):
+        filas = filas_fechas(self.hist, desde, hasta)
+        validos = np.asarray(self.codigos[modalidad][filas]) != SIN_JUGADA
+        mascara = self._filtro(filas, **filtros)
+        return int((validos if mascara is None else validos & mascara).sum())
+
+    # Apariciones de unas pocas jugadas: solo se leen sus propias filas
+    def apariciones(self, modalidad, codigos, desde=None, hasta=None, **filtros):
+        datos = self.modalidades[modalidad]
+        rango = filas_fechas(self.hist, desde, hasta)
+        conteo = np.zeros(len(codigos), dtype=np.int64)
+        for i, codigo in enumerate(codigos):
+            if codigo is None or not 0 <= codigo < len(datos["inicio"]) - 1:
+                continue
+            filas = datos["filas"][datos["inicio"][codigo]:datos["inicio"][codigo + 1]]
+            filas = filas[np.searchsorted(filas, rango.start):np.searchsorted(filas, rango.stop)]
+            mascara = self._filtro(filas, **filtros)
+            conteo[i] = len(filas) if mascara is None else int(mascara.sum())
+        return conteo
+
+    # Apariciones de todas las jugadas en el rango: se recorre solo el recorte
+    def conteo(self, modalidad, desde=None, hasta=None, **filtros):
+        filas = filas_fechas(self.hist, desde, hasta)
+        codigo = np.asarray(self.codigos[modalidad][filas])
+        validos = codigo != SIN_JUGADA
+        mascara = self._filtro(filas, **filtros)
+        if mascara is not None:
+            validos &= mascara
+        return np.bincount(codigo[validos], minlength=espacio(modalidad))
+
+    def memoria(self):
+        return sum(arreglo.nbytes for arreglo in self.partes.values()) + sum(
+            arreglo.nbytes
+            for datos in self.modalidades.values()
+            for arreglo in datos.values()
+        )
@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from historico import HORARIOS, filas_fechas, indice_horario
+from jugadas import SIN_JUGADA, espacio
+
+GLOBAL = "GLOBAL"
+GRUPOS = HORARIOS + [GLOBAL]
+TOP_CALIENTES = 5
+# Ventana por sorteos que la app propone por omisión
+SORTEOS_RECIENTES = 150
+
+
+# Primer sorteo de la ventana: los últimos `dias` días (contando desde la
+# última fecha del histórico) o los últimos `sorteos` sorteos.
+def inicio_ventana(fechas, dias=None, sorteos=None):
+    if sorteos is not None:
+        return max(len(fechas) - int(sorteos), 0)
+    if not len(fechas):
+        return 0
+    # Más días que los del histórico es todo el histórico; el tope evita
+    # desbordar el int32 de las fechas
+    dias = min(max(int(dias), 0), int(fechas[-1]) - int(fechas[0]) + 1)
+    return int(np.searchsorted(fechas, int(fechas[-1]) - dias))
+
+
+# Filas del histórico en la ventana: un rango de fechas (desde, hasta) o, si
+# no hay, los últimos días o sorteos. Siempre es una rebanada, sin copias.
+def filas_ventana(hist, dias=None, sorteos=None, fechas=None):
+    if fechas is not None:
+        return filas_fechas(hist, *fechas)
+    return slice(inicio_ventana(hist.fecha, dias=dias, sorteos=sorteos), None)
+
+
+# ---------------- CALIENTES Y FRÍOS ----------------
+# Agrupa en una sola pasada los sorteos de la ventana por (grupo, jugada),
+# donde grupo es cada horario y además la vista global. Cada sorteo entra dos
+# veces: en su horario y en GLOBAL. Un solo argsort estable deja juntas las
+# apariciones de cada par, en orden de sorteo.
+class CalientesFrios:
+
+    def __init__(self, concursos, fechas, codigo, modalidad):
+        concursos = np.asarray(concursos, dtype=np.int64)
+        fechas = np.asarray(fechas)
+        codigo = np.asarray(codigo, dtype=np.int64)
+
+        validos = np.flatnonzero(codigo != SIN_JUGADA)
+        tamano = espacio(modalidad)
+        horario = indice_horario(concursos[validos])
+
+        filas = np.concatenate([validos, validos])
+        grupos = np.concatenate([horario, np.full(len(validos), len(HORARIOS))])
+        llaves = grupos * tamano + codigo[filas]
+
+        orden = np.argsort(llaves, kind="stable")
+        self.filas = filas[orden]
+        llaves = llaves[orden]
+
+        unicas, inicio, conteo = np.unique(llaves, return_index=True, return_counts=True)
+        fin = inicio + conteo
+
+        self.tamano = tamano
+        self.concursos = concursos
+        self.fechas = fechas
+        self.pares = pd.DataFrame({
+            "GRUPO": unicas // tamano,
+            "CODIGO": unicas % tamano,
+            "CONTEO": conteo,
+            "INICIO": inicio,
+            "FIN": fin,
+            "PRIMERA": self.filas[inicio],
+            "ULTIMO_CONCURSO": concursos[self.filas[fin - 1]]
+        })
+
+        self.ultimo_concurso = np.zeros(len(GRUPOS), dtype=np.int64)
+        np.maximum.at(self.ultimo_concurso, self.pares["GRUPO"], self.pares["ULTIMO_CONCURSO"])
+
+    def _grupo(self, grupo):
+        g = GRUPOS.index(grupo)
+        pares = self.pares[self.pares["GRUPO"] == g]
+        return pares.assign(SIN_SALIR=self.ultimo_concurso[g] - pares["ULTIMO_CONCURSO"])
+
+    def vacio(self, grupo):
+        return self._grupo(grupo).empty
+
+    # Más veces en la ventana; a igual conteo, el que salió primero
+    def calientes(self, grupo, n=TOP_CALIENTES):
+        pares = self._grupo(grupo).sort_values(
+            ["CONTEO", "PRIMERA"],
+            ascending=[False, True]
+        ).head(n)
+
+        fechas = [
+            self.fechas[self.filas[i:f]]
+            for i, f in zip(pares["INICIO"], pares["FIN"])
+        ]
+        return pares.assign(FECHAS=fechas)[["CODIGO", "CONTEO", "FECHAS", "SIN_SALIR"]]
+
+    # Más sorteos sin salir dentro de la ventana; a igual atraso, el menor
+    def frios(self, grupo, n=TOP_CALIENTES):
+        pares = self._grupo(grupo).sort_values(
+            ["SIN_SALIR", "CODIGO"],
+            ascending=[False, True]
+        ).head(n)
+        return pares[["CODIGO", "SIN_SALIR"]]
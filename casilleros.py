@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from calientes import GRUPOS
+from historico import HORARIOS, SIN_DIGITO, indice_horario
+
+POSICIONES = [
+    "Decena de millar",
+    "Unidad de millar",
+    "Centenas",
+    "Decenas",
+    "Unidades"
+]
+
+
+# ---------------- FRECUENCIA POR CASILLERO ----------------
+# Tensor grupo × posición × dígito (6 × 5 × 10): los cinco horarios y al final
+# la vista GLOBAL. Los conteos salen de un solo bincount sobre la llave
+# (horario, posición, dígito); también se guarda el último concurso en que
+# cada dígito salió en cada posición.
+def tensor_casilleros(concursos, digitos):
+    concursos = np.asarray(concursos, dtype=np.int64)
+    digitos = np.asarray(digitos)
+
+    filas, posiciones = np.nonzero(digitos != SIN_DIGITO)
+    horario = indice_horario(concursos[filas])
+    llaves = (horario * 5 + posiciones) * 10 + digitos[filas, posiciones]
+
+    tamano = len(HORARIOS) * 5 * 10
+    conteo = np.zeros((len(GRUPOS), 5, 10), dtype=np.int64)
+    conteo[:len(HORARIOS)] = np.bincount(llaves, minlength=tamano).reshape(-1, 5, 10)
+    conteo[-1] = conteo[:len(HORARIOS)].sum(axis=0)
+
+    ultimo = np.zeros((len(GRUPOS), 5, 10), dtype=np.int64)
+    por_horario = np.zeros(tamano, dtype=np.int64)
+    np.maximum.at(por_horario, llaves, concursos[filas])
+    ultimo[:len(HORARIOS)] = por_horario.reshape(-1, 5, 10)
+    ultimo[-1] = ultimo[:len(HORARIOS)].max(axis=0)
+
+    return conteo, ultimo
+
+
+# Empates: el más caliente es el que salió más recientemente y el más frío
+# el que lleva más tiempo sin salir (un dígito con 0 apariciones sí cuenta).
+def mas_caliente(conteo, ultimo):
+    return int(np.lexsort((-ultimo, -conteo))[0])
+
+
+def mas_frio(conteo, ultimo):
+    return int(np.lexsort((ultimo, conteo))[0])
+
+
+def distribucion(conteo, grupo):
+    return pd.DataFrame(
+        conteo[GRUPOS.index(grupo)],
+        index=POSICIONES,
+        columns=[str(d) for d in range(10)]
+    )
@@ -0,0 +1,179 @@
+import argparse
+import sys
+
+import numpy as np
+import pandas as pd
+
+from agregados import sincronizar_agregados
+from historico import CSV_LOCAL, cargar_historico
+from jugadas import (
+    MODALIDADES,
+    SIN_JUGADA,
+    TABLA_PAGOS,
+    a_codigo,
+    largo
+)
+from similares import generar_similares_inteligentes
+
+COLUMNAS_SALIDA = [
+    "MODALIDAD",
+    "NUMERO",
+    "VALIDO",
+    "APARICIONES",
+    "ULTIMO_CONCURSO",
+    "ULTIMA_FECHA",
+    "SIN_SALIR",
+    "PROMEDIO"
+]
+
+
+# ---------------- LECTURA DE CONSULTAS ----------------
+# CSV con columnas MODALIDAD,NUMERO o JSON Lines con {"modalidad", "numero"}.
+# Los números se leen como texto para no perder los ceros a la izquierda.
+def leer_consultas(archivo, formato="csv"):
+    if formato == "jsonl":
+        consultas = pd.read_json(archivo, lines=True, dtype=False)
+    else:
+        consultas = pd.read_csv(archivo, dtype=str, keep_default_na=False)
+
+    consultas.columns = [str(c).strip().upper() for c in consultas.columns]
+    faltantes = {"MODALIDAD", "NUMERO"} - set(consultas.columns)
+    if faltantes:
+        raise ValueError(f"Faltan columnas en las consultas: {sorted(faltantes)}")
+
+    return pd.DataFrame({
+        "MODALIDAD": consultas["MODALIDAD"].astype(str).str.strip(),
+        "NUMERO": consultas["NUMERO"].fillna("").astype(str).str.strip()
+    })
+
+
+def _codigos(numeros, modalidad):
+    validos = numeros.str.fullmatch(r"\d+") & (numeros.str.len() == largo(modalidad))
+    codigos = np.full(len(numeros), SIN_JUGADA, dtype=np.int64)
+    codigos[validos.to_numpy()] = numeros[validos].astype(np.int64)
+    return codigos, validos.to_numpy()
+
+
+def _similares(indice, modalidad, numeros, validos):
+    listas = [
+        generar_similares_inteligentes(num) if valido else []
+        for num, valido in zip(numeros, validos)
+    ]
+    planos = [s for lista in listas for s in lista]
+    if not planos:
+        return [[] for _ in listas]
+
+    stats = indice.consultar(modalidad, [a_codigo(s, modalidad) for s in planos])
+    apariciones = stats["APARICIONES"].tolist()
+    # Igual que en la fila principal: sin apariciones, SIN_SALIR va vacío
+    sin_salir = [s if a > 0 else None for a, s in zip(apariciones, stats["SIN_SALIR"].tolist())]
+
+    resultado, i = [], 0
+    for lista in listas:
+        resultado.append([
+            {"NUMERO": s, "APARICIONES": apariciones[i + j], "SIN_SALIR": sin_salir[i + j]}
+            for j, s in enumerate(lista)
+        ])
+        i += len(lista)
+    return resultado
+
+
+# ---------------- RESPUESTA EN LOTE ----------------
+# Las consultas se agrupan por modalidad y cada grupo se resuelve con una sola
+# llamada vectorizada al índice; la salida conserva el orden de entrada.
+def responder(agregados, consultas, ventanas=(), apuesta=1, multiplicador=0, similares=False):
+    indice = agregados.indice
+    partes = []
+
+    for modalidad, grupo in consultas.groupby("MODALIDAD", sort=False):
+        if modalidad not in MODALIDADES:
+            partes.append(grupo.assign(VALIDO=False))
+            continue
+
+        codigos, validos = _codigos(grupo["NUMERO"], modalidad)
+        tabla = indice.consultar(modalidad, codigos)
+        tabla.index = grupo.index
+
+        tabla = tabla.assign(
+            MODALIDAD=modalidad,
+            NUMERO=grupo["NUMERO"],
+            VALIDO=validos,
+            ULTIMA_FECHA=tabla["ULTIMA_FECHA"].dt.strftime("%Y-%m-%d"),
+            ULTIMO_CONCURSO=tabla["ULTIMO_CONCURSO"].where(tabla["APARICIONES"] > 0),
+            SIN_SALIR=tabla["SIN_SALIR"].where(tabla["APARICIONES"] > 0)
+        )
+        for n in ventanas:
+            tabla[f"ULT_{n}"] = indice.apariciones_ultimos(modalidad, codigos, n)
+
+        pagos = TABLA_PAGOS[modalidad]
+        tabla["PREMIO_BASE"] = np.where(validos, pagos["base"] * apuesta, 0)
+        tabla["PREMIO_MULTI"] = np.where(validos, pagos["multi"] * multiplicador, 0)
+        tabla["PREMIO_TOTAL"] = tabla["PREMIO_BASE"] + tabla["PREMIO_MULTI"]
+
+        if similares:
+            tabla["SIMILARES"] = _similares(indice, modalidad, grupo["NUMERO"], validos)
+
+        partes.append(tabla.drop(columns="CODIGO"))
+
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_SALIDA)
+
+    respuesta = pd.concat(partes).sort_index()
+    ventanas_fijas = [f"ULT_{n}" for n in indice.ventanas]
+    extra = [c for c in respuesta.columns if c not in COLUMNAS_SALIDA + ventanas_fijas]
+    respuesta = respuesta[COLUMNAS_SALIDA + ventanas_fijas + extra]
+
+    # Las modalidades desconocidas dejan huecos: los conteos quedan enteros
+    enteros = [
+        c for c in respuesta.columns
+        if c in ("APARICIONES", "ULTIMO_CONCURSO", "SIN_SALIR")
+        or c.startswith(("ULT_", "PREMIO_"))
+    ]
+    return respuesta.astype({c: "Int64" for c in enteros})
+
+
+def escribir_respuesta(respuesta, salida, formato="jsonl"):
+    if formato == "csv":
+        if "SIMILARES" in respuesta.columns:
+            respuesta = respuesta.assign(SIMILARES=[
+                "|".join(f"{s['NUMERO']}:{s['APARICIONES']}" for s in lista)
+                if isinstance(lista, list) else ""
+                for lista in respuesta["SIMILARES"]
+            ])
+        respuesta.to_csv(salida, index=False)
+    else:
+        respuesta.to_json(salida, orient="records", lines=True, force_ascii=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Responde en lote consultas (modalidad, número) sobre el histórico del TRIS"
+    )
+    parser.add_argument("entrada", nargs="?", default="-", help="Archivo de consultas (- para stdin)")
+    parser.add_argument("--entrada-formato", choices=["csv", "jsonl"], default="csv")
+    parser.add_argument("--formato", choices=["jsonl", "csv"], default="jsonl", help="Formato de salida")
+    parser.add_argument(
+        "--ventana",
+        type=int,
+        action="append",
+        default=[],
+        help="Apariciones en los últimos N sorteos (se puede repetir)"
+    )
+    parser.add_argument("--apuesta", type=int, default=1, help="Monto de la apuesta ($)")
+    parser.add_argument("--multiplicador", type=int, default=0, help="Monto del multiplicador ($)")
+    parser.add_argument("--similares", action="store_true", help="Incluye los números similares")
+    args = parser.parse_args()
+
+    entrada = sys.stdin if args.entrada == "-" else args.entrada
+    consultas = leer_consultas(entrada, args.entrada_formato)
+
+    agregados = sincronizar_agregados(cargar_historico(CSV_LOCAL))
+    respuesta = responder(
+        agregados,
+        consultas,
+        ventanas=args.ventana,
+        apuesta=args.apuesta,
+        multiplicador=args.multiplicador,
+        similares=args.similares
+    )
+    escribir_respuesta(respuesta, sys.stdout, args.formato)
@@ -0,0 +1,406 @@
+import hashlib
+import json
+import os
+from contextlib import contextmanager
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+CSV_LOCAL = "Tris.csv"
+DIR_BINARIO = "tris_bin"
+VERSION_BINARIO = 2
+# Sorteos acumulados en el diario antes de compactarlo sobre el CSV (unos 50
+# días de sorteos). Compactar reescribe Tris.csv y tris_bin/ completos; unir
+# el diario en la carga solo copia los arreglos, que es mucho más barato.
+MAX_DIARIO = 250
+
+# Los sorteos antiguos (hasta el 11032) solo tenían 4 números: R5 queda vacío
+SIN_DIGITO = 255
+
+COLUMNAS_CSV = [
+    "NPRODUCTO",
+    "CONCURSO",
+    "R1", "R2", "R3", "R4", "R5",
+    "FECHA",
+    "Multiplicador"
+]
+COLUMNAS_DIGITOS = ["R1", "R2", "R3", "R4", "R5"]
+
+HORARIO_POR_RESTO = {
+    3: "MEDIODIA",
+    4: "3PM",
+    0: "EXTRA",
+    1: "7PM",
+    2: "CLASICO"
+}
+HORARIOS = ["MEDIODIA", "3PM", "EXTRA", "7PM", "CLASICO"]
+_TABLA_HORARIOS = np.array([HORARIO_POR_RESTO[r] for r in range(5)], dtype=object)
+
+
+def asignar_horario(concurso):
+    return HORARIO_POR_RESTO[concurso % 5]
+
+
+def horarios_de(concursos):
+    return _TABLA_HORARIOS[np.asarray(concursos) % 5]
+
+
+# Posición del horario dentro de HORARIOS (MEDIODIA=0 ... CLASICO=4)
+def indice_horario(concursos):
+    return (np.asarray(concursos) + 2) % 5
+
+
+# ---------------- FORMATO BINARIO ----------------
+# tris_bin/ guarda una columna por archivo .npy (memory-mappable), ordenado
+# por CONCURSO ascendente:
+#   concurso.npy       int32
+#   digitos.npy        uint8 (n, 5)  R1–R5, SIN_DIGITO si no existe
+#   fecha.npy          int32         días desde 1970-01-01
+#   multiplicador.npy  bool
+# meta.json indica la versión, el tamaño, la fecha de modificación y el sha1
+# del CSV con el que está sincronizado y el primer concurso con multiplicador
+# (antes de ese el CSV lo deja vacío).
+class Historico(NamedTuple):
+    concurso: np.ndarray
+    digitos: np.ndarray
+    fecha: np.ndarray
+    multiplicador: np.ndarray
+    inicio_multiplicador: int
+
+
+def _fechas_a_dias(fechas):
+    if not pd.api.types.is_datetime64_any_dtype(fechas):
+        fechas = pd.to_datetime(fechas, format="%d/%m/%Y")
+    return fechas.values.astype("datetime64[D]").astype(np.int32)
+
+
+def dias_a_fechas(dias):
+    return np.asarray(dias).astype("datetime64[D]").astype("datetime64[ns]")
+
+
+def desde_df(df):
+    df = df.sort_values("CONCURSO")
+
+    digitos = df[COLUMNAS_DIGITOS].to_numpy(dtype=float, na_value=np.nan)
+    digitos = np.where(np.isnan(digitos), SIN_DIGITO, digitos).astype(np.uint8)
+
+    multiplicador = df["Multiplicador"].astype(str).str.upper().isin(["SI", "SÍ"])
+    con_dato = df["Multiplicador"].notna().to_numpy()
+    concursos = df["CONCURSO"].to_numpy(dtype=np.int32)
+    if con_dato.any():
+        inicio_multiplicador = int(concursos[con_dato].min())
+    else:
+        inicio_multiplicador = int(concursos.max()) + 1 if len(concursos) else 0
+
+    return Historico(
+        concurso=concursos,
+        digitos=np.ascontiguousarray(digitos),
+        fecha=_fechas_a_dias(df["FECHA"]),
+        multiplicador=multiplicador.to_numpy(dtype=bool),
+        inicio_multiplicador=inicio_multiplicador
+    )
+
+
+def a_df(hist):
+    df = pd.DataFrame({
+        "NPRODUCTO": np.full(len(hist.concurso), 60, dtype=np.int64),
+        "CONCURSO": hist.concurso.astype(np.int64)
+    })
+
+    for i, col in enumerate(COLUMNAS_DIGITOS):
+        valores = hist.digitos[:, i]
+        faltantes = valores == SIN_DIGITO
+        if faltantes.any():
+            df[col] = np.where(faltantes, np.nan, valores)
+        else:
+            df[col] = valores.astype(np.int64)
+
+    df["FECHA"] = dias_a_fechas(hist.fecha)
+    df["Multiplicador"] = np.where(hist.multiplicador, "SI", "NO").astype(object)
+    df.loc[hist.concurso < hist.inicio_multiplicador, "Multiplicador"] = np.nan
+    df["HORARIO"] = horarios_de(hist.concurso)
+    return df
+
+
+def _filas_csv(df):
+    df = df[COLUMNAS_CSV].copy()
+    for col in COLUMNAS_DIGITOS:
+        df[col] = df[col].astype("Int64")
+    if not pd.api.types.is_datetime64_any_dtype(df["FECHA"]):
+        df["FECHA"] = pd.to_datetime(df["FECHA"], format="%d/%m/%Y")
+    df["FECHA"] = df["FECHA"].dt.strftime("%d/%m/%Y")
+    return df
+
+
+def exportar_csv(hist, ruta=CSV_LOCAL):
+    df = _filas_csv(a_df(hist)).iloc[::-1]
+
+    # Se conservan los finales de línea CRLF del archivo oficial
+    temporal = ruta + ".tmp"
+    df.to_csv(temporal, index=False, lineterminator="\r\n")
+    os.replace(temporal, ruta)
+
+
+def _ruta_meta(directorio):
+    return os.path.join(directorio, "meta.json")
+
+
+def _ruta_diario(directorio):
+    return os.path.join(directorio, "diario.csv")
+
+
+def escribir_binario(hist, directorio=DIR_BINARIO, csv=CSV_LOCAL):
+    os.makedirs(directorio, exist_ok=True)
+
+    for nombre in ["concurso", "digitos", "fecha", "multiplicador"]:
+        ruta = os.path.join(directorio, f"{nombre}.npy")
+        with open(ruta + ".tmp", "wb") as f:
+            np.save(f, getattr(hist, nombre))
+        os.replace(ruta + ".tmp", ruta)
+
+    meta = {
+        "version": VERSION_BINARIO,
+        "filas": len(hist.concurso),
+        "ultimo_concurso": int(hist.concurso[-1]) if len(hist.concurso) else 0,
+        "inicio_multiplicador": hist.inicio_multiplicador,
+        **_firma_csv(csv)
+    }
+    with open(_ruta_meta(directorio) + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(_ruta_meta(directorio) + ".tmp", _ruta_meta(directorio))
+
+
+def leer_meta(directorio=DIR_BINARIO):
+    try:
+        with open(_ruta_meta(directorio)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != VERSION_BINARIO:
+        return None
+    return meta
+
+
+def _sha1_csv(csv):
+    h = hashlib.sha1()
+    with open(csv, "rb") as f:
+        for bloque in iter(lambda: f.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def _firma_csv(csv):
+    if not os.path.exists(csv):
+        return {"csv_bytes": None, "csv_mtime_ns": None, "csv_sha1": None}
+    info = os.stat(csv)
+    return {"csv_bytes": info.st_size, "csv_mtime_ns": info.st_mtime_ns, "csv_sha1": _sha1_csv(csv)}
+
+
+# Mismo tamaño y misma fecha de modificación: vigente sin leer el CSV. Si solo
+# cambió la fecha (un checkout, un touch) se compara el sha1, así que una
+# edición que conserva el tamaño no deja servir un binario viejo.
+def _binario_vigente(meta, csv):
+    if meta is None:
+        return False
+    if not os.path.exists(csv):
+        return True
+    info = os.stat(csv)
+    if meta["csv_bytes"] != info.st_size:
+        return False
+    if meta["csv_mtime_ns"] == info.st_mtime_ns:
+        return True
+    return meta["csv_sha1"] == _sha1_csv(csv)
+
+
+# Firma barata (mtime y tamaño) de los archivos del histórico: cambia cada vez
+# que se reescriben, así que sirve como llave de caché.
+def version_historico(csv=CSV_LOCAL, directorio=DIR_BINARIO):
+    firmas = []
+    for ruta in [csv, _ruta_meta(directorio), _ruta_diario(directorio)]:
+        try:
+            info = os.stat(ruta)
+        except OSError:
+            firmas.append(None)
+            continue
+        firmas.append((info.st_mtime_ns, info.st_size))
+    return tuple(firmas)
+
+
+def cargar_binario(directorio=DIR_BINARIO):
+    meta = leer_meta(directorio)
+    columnas = {
+        nombre: np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+        for nombre in ["concurso", "digitos", "fecha", "multiplicador"]
+    }
+    return Historico(inicio_multiplicador=meta["inicio_multiplicador"], **columnas)
+
+
+def _cargar_base(csv, directorio):
+    if _binario_vigente(leer_meta(directorio), csv):
+        return cargar_binario(directorio)
+
+    # El CSV cambió por fuera (o no hay binario): se reconstruye una sola vez
+    hist = desde_df(pd.read_csv(csv, dtype={"Multiplicador": object}))
+    escribir_binario(hist, directorio, csv)
+    return cargar_binario(directorio)
+
+
+# Une dos históricos ordenados por CONCURSO; si un concurso está en ambos se
+# queda el de `base`. El inicio del multiplicador es el de `base`: un sorteo
+# viejo que llega después (por ejemplo en un archivo subido, con el
+# multiplicador vacío leído como "NO") no lo mueve hacia atrás, así que al
+# exportar los sorteos anteriores siguen sin dato.
+def _unir(base, extra):
+    inicio_multiplicador = base.inicio_multiplicador if len(base.concurso) else extra.inicio_multiplicador
+    concurso = np.concatenate([base.concurso, extra.concurso])
+    _, filas = np.unique(concurso, return_index=True)
+    return Historico(
+        concurso=concurso[filas],
+        digitos=np.concatenate([base.digitos, extra.digitos])[filas],
+        fecha=np.concatenate([base.fecha, extra.fecha])[filas],
+        multiplicador=np.concatenate([base.multiplicador, extra.multiplicador])[filas],
+        inicio_multiplicador=inicio_multiplicador
+    )
+
+
+def cargar_historico(csv=CSV_LOCAL, directorio=DIR_BINARIO):
+    hist = _cargar_base(csv, directorio)
+    diario = leer_diario(directorio)
+    if diario is None:
+        return hist
+    return _unir(hist, desde_df(diario))
+
+
+# ---------------- RANGOS ----------------
+# El histórico está ordenado por CONCURSO y las fechas no bajan, así que un
+# rango [desde, hasta] de fechas o de concursos son dos búsquedas binarias y
+# el recorte es una vista de los mismos arreglos (sin copiar ni recorrer).
+def a_dias(fecha):
+    return int(pd.Timestamp(fecha).to_datetime64().astype("datetime64[D]").astype(np.int64))
+
+
+def filas_fechas(hist, desde=None, hasta=None):
+    inicio = 0 if desde is None else int(np.searchsorted(hist.fecha, a_dias(desde), side="left"))
+    fin = len(hist.fecha) if hasta is None else int(np.searchsorted(hist.fecha, a_dias(hasta), side="right"))
+    return slice(inicio, max(inicio, fin))
+
+
+def filas_concursos(hist, desde=None, hasta=None):
+    inicio = 0 if desde is None else int(np.searchsorted(hist.concurso, int(desde), side="left"))
+    fin = len(hist.concurso) if hasta is None else int(np.searchsorted(hist.concurso, int(hasta), side="right"))
+    return slice(inicio, max(inicio, fin))
+
+
+def recortar(hist, filas):
+    return hist._replace(
+        concurso=hist.concurso[filas],
+        digitos=hist.digitos[filas],
+        fecha=hist.fecha[filas],
+        multiplicador=hist.multiplicador[filas]
+    )
+
+
+# ---------------- DIARIO DE SORTEOS NUEVOS ----------------
+# Los sorteos nuevos no reescriben el histórico: se anexan a
+# tris_bin/diario.csv (mismo formato que Tris.csv, en orden de llegada) y
+# cargar_historico los une al binario. Cuando el diario pasa de MAX_DIARIO
+# filas, compactar() lo vuelca sobre Tris.csv y tris_bin/ con renombrados
+# atómicos y lo vacía; si algo se corta a la mitad, la siguiente carga
+# descarta los concursos repetidos. El diario está en git (el cron lo sube en
+# cada corrida), así que entre corridas solo cambian unas líneas. Todas las
+# escrituras pasan por bloqueo(), así la app y el cron no se pisan.
+@contextmanager
+def bloqueo(directorio=DIR_BINARIO):
+    os.makedirs(directorio, exist_ok=True)
+    with open(os.path.join(directorio, "escritura.lock"), "a+") as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def leer_diario(directorio=DIR_BINARIO):
+    ruta = _ruta_diario(directorio)
+    if not os.path.exists(ruta) or not os.path.getsize(ruta):
+        return None
+
+    diario = pd.read_csv(ruta, on_bad_lines="skip")
+    # Una línea cortada por una escritura interrumpida no se toma en cuenta
+    diario["FECHA"] = pd.to_datetime(diario["FECHA"], format="%d/%m/%Y", errors="coerce")
+    diario = diario.dropna(subset=["CONCURSO", "R1", "R2", "R3", "R4", "FECHA"])
+    diario = diario[diario["Multiplicador"].isin(["SI", "NO"])]
+    if diario.empty:
+        return None
+    return diario
+
+
+def _compactar(csv, directorio, hist=None):
+    if leer_diario(directorio) is None:
+        return hist if hist is not None else cargar_historico(csv, directorio)
+
+    if hist is None:
+        hist = cargar_historico(csv, directorio)
+    exportar_csv(hist, csv)
+    escribir_binario(hist, directorio, csv)
+    # Se vacía en lugar de borrarse: sigue existiendo para git
+    open(_ruta_diario(directorio), "w").close()
+    return hist
+
+
+def compactar(csv=CSV_LOCAL, directorio=DIR_BINARIO):
+    with bloqueo(directorio):
+        return _compactar(csv, directorio)
+
+
+# Agrega los sorteos de `df` (columnas de Tris.csv) que todavía no están en el
+# histórico. Devuelve el histórico actualizado y cuántos sorteos se agregaron.
+# Si el que llama ya cargó el histórico lo pasa en `hist` y no se vuelve a leer;
+# si quedó viejo (otro proceso anexó antes), un concurso repetido en el diario
+# se descarta al unirlo.
+def agregar_sorteos(df, csv=CSV_LOCAL, directorio=DIR_BINARIO, hist=None):
+    with bloqueo(directorio):
+        if not os.path.exists(csv):
+            hist = desde_df(df.drop_duplicates(subset="CONCURSO"))
+            exportar_csv(hist, csv)
+            escribir_binario(hist, directorio, csv)
+            return hist, len(hist.concurso)
+
+        if hist is None:
+            hist = cargar_historico(csv, directorio)
+        nuevos = df[~df["CONCURSO"].isin(hist.concurso)]
+        nuevos = nuevos.drop_duplicates(subset="CONCURSO").sort_values("CONCURSO")
+        if nuevos.empty:
+            return hist, 0
+
+        ruta = _ruta_diario(directorio)
+        encabezado = not os.path.exists(ruta) or not os.path.getsize(ruta)
+        texto = _filas_csv(nuevos).to_csv(
+            index=False,
+            header=encabezado,
+            lineterminator="\r\n"
+        )
+        with open(ruta, "a", newline="") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+
+        hist = _unir(hist, desde_df(nuevos))
+        if len(leer_diario(directorio)) >= MAX_DIARIO:
+            return _compactar(csv, directorio, hist), len(nuevos)
+        return hist, len(nuevos)
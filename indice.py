@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from historico import dias_a_fechas
+from jugadas import SIN_JUGADA, espacio
+
+# Ventanas de "Apariciones históricas" (últimos N sorteos de la modalidad)
+VENTANAS = (100, 1000, 10000)
+
+
+def _normalizar(codigos, tamano):
+    codigos = np.array(
+        [SIN_JUGADA if c is None else c for c in codigos],
+        dtype=np.int64
+    )
+    validos = (codigos >= 0) & (codigos < tamano)
+    return codigos, validos, np.where(validos, codigos, 0)
+
+
+def ultima_posicion(codigo, tamano):
+    posicion = np.full(tamano, -1, dtype=np.int64)
+    np.maximum.at(posicion, codigo, np.arange(len(codigo)))
+    return posicion
+
+
+# ---------------- ÍNDICE POR JUGADA ----------------
+# Para cada modalidad guarda arreglos densos de tamaño 10^k indexados por el
+# código de la jugada, así que cualquier consulta es una lectura de arreglo.
+class IndiceJugadas:
+
+    def __init__(self, concursos, fechas, codigos, ventanas=VENTANAS):
+        concursos = np.asarray(concursos, dtype=np.int32)
+        fechas = np.asarray(fechas, dtype=np.int32)
+
+        self.total_sorteos = len(np.unique(concursos))
+        self.ventanas = tuple(ventanas)
+        self.modalidades = {}
+
+        for modalidad, codigo in codigos.items():
+            codigo = np.asarray(codigo)
+            validos = codigo != SIN_JUGADA
+            self.modalidades[modalidad] = self._construir(
+                codigo[validos],
+                concursos[validos],
+                fechas[validos],
+                espacio(modalidad)
+            )
+
+    # Índice armado con arreglos ya calculados (los del snapshot, abiertos con
+    # mmap), sin recorrer el histórico
+    @classmethod
+    def desde_arreglos(cls, total_sorteos, ventanas, modalidades):
+        indice = cls.__new__(cls)
+        indice.total_sorteos = total_sorteos
+        indice.ventanas = tuple(ventanas)
+        indice.modalidades = modalidades
+        return indice
+
+    def _construir(self, codigo, concursos, fechas, tamano):
+        posicion = ultima_posicion(codigo, tamano)
+        vistos = posicion >= 0
+
+        ultimo_concurso = np.zeros(tamano, dtype=np.int32)
+        ultimo_concurso[vistos] = concursos[posicion[vistos]]
+        ultima_fecha = np.zeros(tamano, dtype=np.int32)
+        ultima_fecha[vistos] = fechas[posicion[vistos]]
+
+        return {
+            "codigos": codigo.astype(np.int32),
+            "concursos": concursos.astype(np.int32),
+            "conteo": np.bincount(codigo, minlength=tamano).astype(np.int32),
+            "ultimo_concurso": ultimo_concurso,
+            "ultima_fecha": ultima_fecha,
+            "ventanas": {
+                n: np.bincount(codigo[-n:], minlength=tamano).astype(np.int32)
+                for n in self.ventanas
+            },
+            "concurso_max": int(concursos.max()) if len(concursos) else 0
+        }
+
+    # ---- Actualización incremental ----
+    # Recibe solo los sorteos nuevos (todos posteriores a los ya indexados) y
+    # toca únicamente los contadores de las jugadas que entran o salen.
+    def agregar(self, concursos, fechas, codigos):
+        concursos = np.asarray(concursos, dtype=np.int32)
+        fechas = np.asarray(fechas, dtype=np.int32)
+        self.total_sorteos += len(np.unique(concursos))
+
+        for modalidad, codigo in codigos.items():
+            codigo = np.asarray(codigo)
+            validos = codigo != SIN_JUGADA
+            nuevos = codigo[validos].astype(np.int32)
+            if not len(nuevos):
+                continue
+
+            datos = self.modalidades[modalidad]
+            previos = datos["codigos"]
+            todos = np.concatenate([previos, nuevos])
+            p, m = len(previos), len(nuevos)
+
+            np.add.at(datos["conteo"], nuevos, 1)
+
+            unicos, desde_final = np.unique(nuevos[::-1], return_index=True)
+            ultima = m - 1 - desde_final
+            datos["ultimo_concurso"][unicos] = concursos[validos][ultima]
+            datos["ultima_fecha"][unicos] = fechas[validos][ultima]
+
+            for n, conteo_ventana in datos["ventanas"].items():
+                entran = todos[max(p, p + m - n):p + m]
+                salen = todos[max(0, p - n):min(p, max(0, p + m - n))]
+                np.add.at(conteo_ventana, entran, 1)
+                np.subtract.at(conteo_ventana, salen, 1)
+
+            datos["codigos"] = todos
+            datos["concursos"] = np.concatenate([datos["concursos"], concursos[validos]])
+            datos["concurso_max"] = int(concursos[validos].max())
+            datos.pop("llaves", None)
+
+    # Columnas de consultar() como arreglos, sin armar el DataFrame (para
+    # consultas sueltas donde el costo de pandas domina)
+    def estadisticas(self, modalidad, codigos):
+        datos = self.modalidades[modalidad]
+        codigos, validos, pos = _normalizar(codigos, len(datos["conteo"]))
+
+        conteo = np.where(validos, datos["conteo"][pos], 0)
+        vistos = conteo > 0
+        ultimo = np.where(vistos, datos["ultimo_concurso"][pos], 0)
+
+        with np.errstate(divide="ignore"):
+            promedio = np.where(vistos, self.total_sorteos / conteo, np.nan)
+
+        columnas = {
+            "CODIGO": codigos,
+            "APARICIONES": conteo,
+            "ULTIMO_CONCURSO": ultimo,
+            "ULTIMA_FECHA": np.where(
+                vistos,
+                dias_a_fechas(datos["ultima_fecha"][pos]),
+                np.datetime64("NaT")
+            ),
+            "SIN_SALIR": np.where(vistos, datos["concurso_max"] - ultimo, -1),
+            "PROMEDIO": promedio
+        }
+        for n, conteo_ventana in datos["ventanas"].items():
+            columnas[f"ULT_{n}"] = np.where(validos, conteo_ventana[pos], 0)
+        return columnas
+
+    def consultar(self, modalidad, codigos):
+        return pd.DataFrame(self.estadisticas(modalidad, codigos))
+
+    # ---- Conteos en rangos arbitrarios ----
+    # Cada aparición se guarda como llave = código * n + posición, ordenada.
+    # Las apariciones de una jugada entre dos posiciones salen de dos búsquedas
+    # binarias, para cualquier ventana y sin copiar el histórico.
+    def _llaves(self, modalidad):
+        datos = self.modalidades[modalidad]
+        if "llaves" not in datos:
+            codigo = datos["codigos"].astype(np.int64)
+            datos["llaves"] = np.sort(codigo * len(codigo) + np.arange(len(codigo)))
+        return datos["llaves"]
+
+    def apariciones_rango(self, modalidad, codigos, desde, hasta):
+        # Posiciones [desde, hasta) dentro de los sorteos de la modalidad
+        datos = self.modalidades[modalidad]
+        codigos, validos, pos = _normalizar(codigos, len(datos["conteo"]))
+        llaves = self._llaves(modalidad)
+        n = len(datos["codigos"])
+
+        desde = min(max(int(desde), 0), n)
+        hasta = min(max(int(hasta), desde), n)
+        conteo = (
+            np.searchsorted(llaves, pos * n + hasta)
+            - np.searchsorted(llaves, pos * n + desde)
+        )
+        return np.where(validos, conteo, 0)
+
+    def apariciones_ultimos(self, modalidad, codigos, n):
+        total = len(self.modalidades[modalidad]["codigos"])
+        return self.apariciones_rango(modalidad, codigos, total - n, total)
+
+    def apariciones_entre(self, modalidad, codigos, concurso_a, concurso_b):
+        concursos = self.modalidades[modalidad]["concursos"]
+        return self.apariciones_rango(
+            modalidad,
+            codigos,
+            np.searchsorted(concursos, concurso_a, side="left"),
+            np.searchsorted(concursos, concurso_b, side="right")
+        )
@@ -0,0 +1,215 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from historico import COLUMNAS_CSV, COLUMNAS_DIGITOS
+
+# Filas por bloque al leer un CSV: la memoria queda acotada por el bloque y
+# por los sorteos nuevos, no por el tamaño del archivo
+BLOQUE = 20_000
+
+# Encabezados del export oficial -> columnas de Tris.csv
+ALIAS = {
+    "Sorteo": "CONCURSO",
+    "Fecha": "FECHA",
+    "Combinación Ganadora": "COMBINACION"
+}
+COLUMNAS_RECHAZO = ["FILA", "CONCURSO", "MOTIVO"]
+
+# Valor con el que se rellena una línea con campos de más, para que quede en
+# su lugar y se rechace con las demás
+_LINEA_MALA = "<campos de más>"
+_PESOS = 10 ** np.arange(4, -1, -1, dtype=np.int64)
+# El histórico guarda CONCURSO como int32
+MAX_CONCURSO = int(np.iinfo(np.int32).max)
+
+
+def _numeros(serie):
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+
+
+def _enteros(valores, minimo, maximo):
+    return np.isfinite(valores) & (valores >= minimo) & (valores <= maximo) & (valores == np.round(valores))
+
+
+def _digitos(df):
+    # Todos los dígitos de una vez: la combinación como entero y después
+    # (n // 10^i) % 10; las filas inválidas quedan marcadas en `validos`
+    if "COMBINACION" in df.columns:
+        combinacion = df["COMBINACION"]
+        if pd.api.types.is_numeric_dtype(combinacion):
+            numero = combinacion.to_numpy(dtype=float)
+            validos = _enteros(numero, 0, 99999)
+        else:
+            texto = combinacion.astype("string").str.strip()
+            validos = texto.str.fullmatch(r"\d{1,5}").fillna(False).to_numpy(dtype=bool)
+            numero = _numeros(texto.where(validos))
+        numero = np.where(validos, numero, 0).astype(np.int64)
+        return (numero[:, None] // _PESOS) % 10, validos
+
+    digitos = np.column_stack([
+        _numeros(df[c]) if c in df.columns else np.full(len(df), np.nan)
+        for c in COLUMNAS_DIGITOS
+    ])
+    enteros = _enteros(digitos, 0, 9)
+    # R5 puede faltar (sorteos antiguos de 4 números)
+    validos = enteros[:, :4].all(axis=1) & (enteros[:, 4] | np.isnan(digitos[:, 4]))
+    return digitos, validos
+
+
+def _fechas(serie):
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(serie.astype("string").str.strip(), format="%d/%m/%Y", errors="coerce")
+
+
+# Los concursos ya vistos se llevan como arreglo ordenado: buscar es una
+# búsqueda binaria y la memoria depende de cuántos son, no de su valor
+def _ordenar(concursos):
+    return np.unique(np.asarray(concursos, dtype=np.int64))
+
+
+def _contiene(ordenados, concursos):
+    posicion = np.minimum(np.searchsorted(ordenados, concursos), max(len(ordenados) - 1, 0))
+    return ordenados[posicion] == concursos if len(ordenados) else np.zeros(len(concursos), dtype=bool)
+
+
+def _sumar(ordenados, concursos):
+    # Dos tramos ya ordenados: el sort estable (timsort) solo los intercala
+    return np.sort(np.concatenate([ordenados, _ordenar(concursos)]), kind="stable")
+
+
+# ---------------- NORMALIZACIÓN ----------------
+# Un bloque del export oficial ("Sorteo", "Combinación Ganadora", "Fecha",
+# "Multiplicador"), de Tris.csv o de la página de resultados pasa a filas de
+# Tris.csv con FECHA como fecha. Devuelve (válidos, rechazos): cada fila
+# descartada aparece en los rechazos con su motivo, el primero que falla.
+# También se descartan los concursos que ya están en el histórico
+# (`existentes`) y los repetidos, de los que se queda la primera aparición.
+def normalizar_sorteos(df, existentes=(), primera_fila=1):
+    existentes = _ordenar(existentes)
+    validos, rechazos, _ = _normalizar(df, existentes, existentes[:0], primera_fila)
+    return validos, rechazos
+
+
+# `existentes` son los concursos del histórico y `vistos` los que salieron en
+# bloques anteriores del mismo archivo (ambos ordenados); `vistos` se
+# devuelve actualizado
+def _normalizar(df, existentes, vistos, primera_fila):
+    df = df.rename(columns=lambda c: ALIAS.get(str(c).strip(), str(c).strip()))
+    faltan = [c for c in ("CONCURSO", "FECHA") if c not in df.columns]
+    if "COMBINACION" not in df.columns and not set(COLUMNAS_DIGITOS[:4]) <= set(df.columns):
+        faltan.append("Combinación Ganadora (o R1-R5)")
+    if faltan:
+        raise ValueError(f"Faltan columnas: {', '.join(faltan)}")
+
+    filas = primera_fila + np.arange(len(df))
+    # Las líneas en blanco no se reportan, pero cuentan para la numeración
+    vacias = df.isna().all(axis=1).to_numpy()
+    df, filas = df[~vacias], filas[~vacias]
+
+    motivo = np.full(len(df), "", dtype=object)
+
+    def rechazar(mascara, texto):
+        motivo[(motivo == "") & mascara] = texto
+
+    if not pd.api.types.is_numeric_dtype(df["CONCURSO"]):
+        rechazar((df["CONCURSO"] == _LINEA_MALA).to_numpy(dtype=bool), "número de campos incorrecto")
+
+    concurso = _numeros(df["CONCURSO"])
+    legible = _enteros(concurso, 1, MAX_CONCURSO)
+    rechazar(~legible, "concurso inválido")
+    concurso = np.where(legible, concurso, 0).astype(np.int64)
+
+    digitos, validos = _digitos(df)
+    rechazar(~validos, "combinación inválida")
+
+    fecha = _fechas(df["FECHA"])
+    rechazar(fecha.isna().to_numpy(), "fecha inválida")
+
+    if "Multiplicador" in df.columns:
+        multiplicador = (
+            df["Multiplicador"].astype("string").str.strip().str.upper()
+            .replace({"SÍ": "SI", "": pd.NA}).fillna("NO")
+        )
+    else:
+        multiplicador = pd.Series("NO", index=df.index, dtype="string")
+    rechazar(~multiplicador.isin(["SI", "NO"]).to_numpy(dtype=bool), "multiplicador inválido")
+
+    rechazar(_contiene(existentes, concurso), "ya está en el histórico")
+    repetido = _contiene(vistos, concurso)
+    pendientes = np.flatnonzero(motivo == "")
+    _, primera = np.unique(concurso[pendientes], return_index=True)
+    repetido[np.setdiff1d(pendientes, pendientes[primera])] = True
+    rechazar(repetido, "concurso repetido en el archivo")
+
+    ok = motivo == ""
+    validos = pd.DataFrame({"NPRODUCTO": 60, "CONCURSO": concurso[ok]})
+    for i, columna in enumerate(COLUMNAS_DIGITOS):
+        validos[columna] = digitos[ok, i]
+    if not np.isnan(validos["R5"]).any():
+        validos[COLUMNAS_DIGITOS] = validos[COLUMNAS_DIGITOS].astype(np.int64)
+    validos["FECHA"] = fecha.to_numpy()[ok]
+    validos["Multiplicador"] = multiplicador.to_numpy(dtype=object)[ok]
+
+    rechazos = pd.DataFrame({
+        "FILA": filas[~ok],
+        # El número si se pudo leer y si no el texto original
+        "CONCURSO": np.where(legible, concurso, df["CONCURSO"].to_numpy(dtype=object))[~ok],
+        "MOTIVO": pd.Categorical(motivo[~ok])
+    }, columns=COLUMNAS_RECHAZO)
+    rechazos.loc[rechazos["CONCURSO"] == _LINEA_MALA, "CONCURSO"] = None
+    return validos[COLUMNAS_CSV], rechazos, _sumar(vistos, concurso[ok])
+
+
+# ---------------- LECTURA POR BLOQUES ----------------
+# `archivo` es una ruta o un archivo abierto (por ejemplo el de
+# st.file_uploader). FILA es la línea del archivo (el encabezado es la 1).
+# Se lee con el parser de C; si alguna línea trae campos de más, el archivo
+# se vuelve a leer con el de Python, que la deja en su lugar para reportarla.
+def leer_sorteos(archivo, existentes=(), bloque=BLOQUE):
+    try:
+        return _leer(archivo, existentes, bloque, "c")
+    except pd.errors.ParserError:
+        if hasattr(archivo, "seek"):
+            archivo.seek(0)
+        return _leer(archivo, existentes, bloque, "python")
+
+
+def _leer(archivo, existentes, bloque, motor):
+    opciones = {}
+    if motor == "python":
+        opciones["on_bad_lines"] = lambda linea: [_LINEA_MALA] * len(linea)
+    lector = pd.read_csv(
+        archivo,
+        dtype={"Multiplicador": str},
+        chunksize=bloque,
+        encoding="utf-8-sig",
+        skipinitialspace=True,
+        skip_blank_lines=False,
+        engine=motor,
+        **opciones
+    )
+
+    existentes = _ordenar(existentes)
+    vistos = existentes[:0]
+    partes, rechazos = [], []
+    with warnings.catch_warnings():
+        # Aviso de pandas por los campos de más de _LINEA_MALA
+        warnings.simplefilter("ignore", pd.errors.ParserWarning)
+        for trozo in lector:
+            validos, malos, vistos = _normalizar(trozo, existentes, vistos, primera_fila=trozo.index[0] + 2)
+            partes.append(validos)
+            rechazos.append(malos)
+
+    if not partes:
+        return pd.DataFrame(columns=COLUMNAS_CSV), pd.DataFrame(columns=COLUMNAS_RECHAZO)
+    return pd.concat(partes, ignore_index=True), pd.concat(rechazos, ignore_index=True)
+
+
+def resumen_rechazos(rechazos):
+    return (
+        rechazos["MOTIVO"].value_counts(sort=True).loc[lambda c: c > 0]
+        .rename_axis("MOTIVO").reset_index(name="FILAS")
+    )
@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+
+from jugadas import espacio
+
+PERCENTILES = (10, 25, 50, 75, 90)
+# Con el mínimo y el máximo, que son los cuantiles 0 y 100
+CUANTILES = (0,) + PERCENTILES + (100,)
+# Bordes del histograma en múltiplos del hueco esperado (10^k sorteos para
+# una jugada de k dígitos); el último intervalo queda abierto.
+BORDES_RELATIVOS = (0, 0.25, 0.5, 1, 2, 3, 4)
+
+
+def bordes(modalidad):
+    return np.unique(np.maximum(np.round(np.array(BORDES_RELATIVOS) * espacio(modalidad)), 1)).astype(np.int64)
+
+
+# ---------------- HUECOS ENTRE APARICIONES ----------------
+# Una sola pasada por modalidad: se ordenan las apariciones por código (y
+# dentro de cada código por concurso) y los huecos son las diferencias entre
+# concursos consecutivos del mismo código. Se guardan en formato CSR: los huecos de la jugada c, ya ordenados, son
+# huecos[inicio[c]:inicio[c + 1]]. El histograma se cuenta al construir y los
+# percentiles salen de indexar esos tramos ordenados, así que una consulta es
+# lectura de arreglos. Con "Directa 5" todo ocupa alrededor de 1.5 MB.
+class IntervalosJugadas:
+
+    def __init__(self, indice):
+        self.modalidades = {
+            modalidad: self._construir(datos["codigos"], datos["concursos"], datos["concurso_max"], modalidad)
+            for modalidad, datos in indice.modalidades.items()
+        }
+
+    def _construir(self, codigo, concursos, concurso_max, modalidad):
+        tamano = espacio(modalidad)
+        base = int(concurso_max) + 1
+
+        # Llave código * base + concurso: una sola ordenación deja cada código
+        # con sus concursos en orden
+        llaves = np.sort(codigo.astype(np.int64) * base + concursos)
+        codigo, concursos = np.divmod(llaves, base)
+
+        mismo = codigo[1:] == codigo[:-1]
+        duenos = codigo[1:][mismo]
+        huecos = (concursos[1:] - concursos[:-1])[mismo]
+
+        # Dentro de cada código, los huecos de menor a mayor
+        llaves_huecos = np.sort(duenos * base + huecos)
+        duenos, huecos = np.divmod(llaves_huecos, base)
+
+        cantidad = np.bincount(duenos, minlength=tamano)
+        inicio = np.zeros(tamano + 1, dtype=np.int64)
+        np.cumsum(cantidad, out=inicio[1:])
+
+        ultimo = np.zeros(tamano, dtype=np.int32)
+        if len(codigo):
+            fin = np.flatnonzero(np.append(codigo[1:] != codigo[:-1], True))
+            ultimo[codigo[fin]] = concursos[fin]
+
+        limites = bordes(modalidad)
+        casilla = np.searchsorted(limites, huecos, side="right") - 1
+        histograma = np.bincount(duenos * len(limites) + casilla, minlength=tamano * len(limites))
+
+        return {
+            "inicio": inicio.astype(np.int32),
+            "huecos": huecos.astype(np.int32),
+            "llaves": llaves_huecos,
+            "histograma": histograma.reshape(tamano, len(limites)).astype(
+                np.min_scalar_type(histograma.max(initial=0))
+            ),
+            "bordes": limites,
+            "ultimo_concurso": ultimo,
+            "concurso_max": int(concurso_max)
+        }
+
+    @staticmethod
+    def _cuantiles(huecos, inicio, cantidad):
+        # Interpolación lineal, como np.percentile, para todos los códigos a la vez
+        tabla = np.full((len(cantidad), len(CUANTILES)), np.nan)
+        con_huecos = np.flatnonzero(cantidad)
+        if not len(con_huecos):
+            return tabla
+        base = inicio[con_huecos]
+        ultimo = cantidad[con_huecos] - 1
+        for j, p in enumerate(CUANTILES):
+            posicion = ultimo * p / 100
+            abajo = np.floor(posicion).astype(np.int64)
+            arriba = np.ceil(posicion).astype(np.int64)
+            bajo = huecos[base + abajo]
+            tabla[con_huecos, j] = bajo + (huecos[base + arriba] - bajo) * (posicion - abajo)
+        return tabla
+
+    def consultar(self, modalidad, codigos):
+        datos = self.modalidades[modalidad]
+        tamano = len(datos["ultimo_concurso"])
+        codigos = np.asarray(codigos, dtype=np.int64)
+        validos = (codigos >= 0) & (codigos < tamano)
+        pos = np.where(validos, codigos, 0)
+
+        inicio = datos["inicio"][pos]
+        cantidad = np.where(validos, datos["inicio"][pos + 1] - inicio, 0)
+        con_huecos = cantidad > 0
+        ultimo = datos["ultimo_concurso"][pos]
+        vista = validos & (ultimo > 0)
+        actual = np.where(vista, datos["concurso_max"] - ultimo, -1)
+
+        # Fracción de los huecos históricos de la jugada que no pasan del actual
+        llave_actual = pos * (datos["concurso_max"] + 1) + np.maximum(actual, 0)
+        hasta = np.searchsorted(datos["llaves"], llave_actual, side="right")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            percentil_actual = np.where(con_huecos & vista, 100 * (hasta - inicio) / cantidad, np.nan)
+
+        columnas = {"CODIGO": codigos, "HUECOS": cantidad}
+        cuantiles = self._cuantiles(datos["huecos"], inicio, cantidad)
+        nombres = {0: "MINIMO", 50: "MEDIANA", 100: "MAXIMO"}
+        for j, p in enumerate(CUANTILES):
+            columnas[nombres.get(p, f"P{p}")] = cuantiles[:, j]
+        columnas["ACTUAL"] = actual
+        columnas["PERCENTIL_ACTUAL"] = percentil_actual
+        return columnas
+
+    def huecos(self, modalidad, codigo):
+        datos = self.modalidades[modalidad]
+        return datos["huecos"][datos["inicio"][codigo]:datos["inicio"][codigo + 1]]
+
+    def histograma(self, modalidad, codigo):
+        datos = self.modalidades[modalidad]
+        limites = datos["bordes"]
+        return pd.DataFrame({
+            "DESDE": limites,
+            "HASTA": np.append(limites[1:] - 1, -1),
+            "CONTEO": datos["histograma"][codigo]
+        })
+
+    def memoria(self):
+        return sum(
+            arreglo.nbytes
+            for datos in self.modalidades.values()
+            for arreglo in datos.values()
+            if isinstance(arreglo, np.ndarray)
+        )
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from historico import SIN_DIGITO
+
+# Modalidad -> (primer casillero, cantidad de dígitos) dentro de R1–R5
+MODALIDADES = {
+    "Directa 5": (0, 5),
+    "Directa 4": (1, 4),
+    "Directa 3": (2, 3),
+    "Par inicial": (0, 2),
+    "Par final": (3, 2),
+    "Número inicial": (0, 1),
+    "Número final": (4, 1)
+}
+
+# Código de los sorteos que no tienen todos los dígitos de la modalidad
+SIN_JUGADA = -1
+
+# Pago por peso apostado, sin y con multiplicador
+TABLA_PAGOS = {
+    "Directa 5": {"base": 50000, "multi": 200000},
+    "Directa 4": {"base": 5000, "multi": 20000},
+    "Directa 3": {"base": 500, "multi": 2000},
+    "Par inicial": {"base": 50, "multi": 200},
+    "Par final": {"base": 50, "multi": 200},
+    "Número inicial": {"base": 5, "multi": 20},
+    "Número final": {"base": 5, "multi": 20}
+}
+
+
+def largo(modalidad):
+    return MODALIDADES[modalidad][1]
+
+
+def espacio(modalidad):
+    return 10 ** largo(modalidad)
+
+
+def calcular_premio(modalidad, apuesta, multiplicador):
+    pago_base = TABLA_PAGOS[modalidad]["base"] * apuesta
+    pago_multi = TABLA_PAGOS[modalidad]["multi"] * multiplicador
+    return pago_base, pago_multi, pago_base + pago_multi
+
+
+# ---------------- CODIFICACIÓN ----------------
+# Cada jugada se guarda como entero: "007" en Directa 3 es el código 7.
+# Los textos con ceros a la izquierda solo se arman al mostrar.
+def codificar(digitos):
+    digitos = np.asarray(digitos)
+    valores = digitos.astype(np.int32)
+    faltantes = digitos == SIN_DIGITO
+
+    codigos = {}
+    for modalidad, (inicio, k) in MODALIDADES.items():
+        pesos = 10 ** np.arange(k - 1, -1, -1, dtype=np.int32)
+        bloque = valores[:, inicio:inicio + k]
+        codigo = bloque @ pesos
+        codigo[faltantes[:, inicio:inicio + k].any(axis=1)] = SIN_JUGADA
+        codigos[modalidad] = codigo.astype(np.int32)
+    return codigos
+
+
+def codificar_df(digitos):
+    return pd.DataFrame(codificar(digitos))
+
+
+def a_codigo(texto, modalidad):
+    texto = str(texto).strip()
+    if not texto.isdigit() or len(texto) != largo(modalidad):
+        return None
+    return int(texto)
+
+
+def formatear(codigo, modalidad):
+    return str(int(codigo)).zfill(largo(modalidad))
+
+
+def formatear_serie(codigos, modalidad):
+    return pd.Series(codigos).astype(str).str.zfill(largo(modalidad))
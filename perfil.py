@@ -0,0 +1,105 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+RUTA_PERFIL = "perfil.jsonl"
+VARIABLE_PERFIL = "TRIS_PERFIL"
+
+
+def perfil_activo(query_params):
+    valor = os.environ.get(VARIABLE_PERFIL) or query_params.get("perfil")
+    return str(valor).strip().lower() in ("1", "true", "si", "sí")
+
+
+# ---------------- PERFIL POR SECCIÓN ----------------
+# Cronómetro por vueltas: seccion("x") cierra la sección anterior y abre la
+# siguiente, así el script no tiene que envolver cada bloque. La memoria es el
+# pico de tracemalloc por encima de lo que ya estaba asignado al entrar; como
+# tracemalloc es global del proceso, con varias sesiones a la vez los MB se
+# mezclan. La traza solo queda prendida durante la corrida medida: si la
+# prendió este perfil, terminar() la apaga, para no dejar lento el proceso
+# (y las sesiones de todos) después de una visita con ?perfil=1. Con el perfil
+# apagado todo es un no-op.
+#
+# Las funciones marcadas con medir() (los fragmentos de la app) abren y cierran
+# su propia sección; si corren solas, después de terminar(), sus registros se
+# anexan al log en el momento.
+class Perfil:
+
+    def __init__(self, activo, ruta=RUTA_PERFIL):
+        self.activo = activo
+        self.ruta = ruta
+        self.registros = []
+        self._escritos = 0
+        self._terminado = False
+        self._actual = None
+        self._traza_propia = False
+        if activo:
+            self._trazar()
+
+    def _trazar(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._traza_propia = True
+
+    def seccion(self, nombre, filas=None):
+        if not self.activo:
+            return
+        self._cerrar()
+        # Un fragmento que vuelve a correr después de terminar() la prende otra vez
+        self._trazar()
+        tracemalloc.reset_peak()
+        memoria, _ = tracemalloc.get_traced_memory()
+        self._actual = {"seccion": nombre, "filas": filas, "inicio": time.perf_counter(), "memoria": memoria}
+
+    # Para las secciones que saben cuántas filas procesaron hasta el final
+    def filas(self, filas):
+        if self._actual is not None:
+            self._actual["filas"] = int(filas)
+
+    def _cerrar(self):
+        if self._actual is None:
+            return
+        actual, self._actual = self._actual, None
+        _, pico = tracemalloc.get_traced_memory()
+        self.registros.append({
+            "seccion": actual["seccion"],
+            "filas": actual["filas"],
+            "ms": round((time.perf_counter() - actual["inicio"]) * 1000, 2),
+            "mb": round(max(pico - actual["memoria"], 0) / 2 ** 20, 2)
+        })
+
+    def medir(self, nombre):
+        def decorador(funcion):
+            @functools.wraps(funcion)
+            def envuelta(*args, **kwargs):
+                self.seccion(nombre)
+                try:
+                    return funcion(*args, **kwargs)
+                finally:
+                    if self.activo:
+                        self._cerrar()
+                        if self._terminado:
+                            self.terminar()
+            return envuelta
+        return decorador
+
+    def terminar(self):
+        if not self.activo:
+            return []
+        self._cerrar()
+        self._terminado = True
+
+        fecha = datetime.now().isoformat(timespec="seconds")
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            for registro in self.registros[self._escritos:]:
+                f.write(json.dumps({"fecha": fecha, **registro}, ensure_ascii=False) + "\n")
+        self._escritos = len(self.registros)
+
+        if self._traza_propia:
+            tracemalloc.stop()
+            self._traza_propia = False
+        return self.registros
@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from historico import filas_fechas
+from jugadas import MODALIDADES, SIN_JUGADA, codificar, espacio, largo
+
+# La fecha como ddmmaaaa: la base de la pirámide tiene 8 dígitos
+LARGO_FECHA = 8
+COLUMNAS_ACIERTOS = ["MODALIDAD", "SORTEOS", "ACIERTOS", "TASA", "ESPERADA", "RAZON"]
+
+
+# Días desde 1970-01-01 -> dígitos de dd, mm y aaaa (n × 8)
+def digitos_fecha(dias):
+    fechas = np.asarray(dias, dtype=np.int64).astype("datetime64[D]")
+    meses = fechas.astype("datetime64[M]")
+    dia = (fechas - meses.astype("datetime64[D]")).astype(np.int64) + 1
+    mes = meses.astype(np.int64) % 12 + 1
+    anio = meses.astype(np.int64) // 12 + 1970
+    return np.column_stack([
+        dia // 10, dia % 10,
+        mes // 10, mes % 10,
+        anio // 1000, anio // 100 % 10, anio // 10 % 10, anio % 10
+    ]).astype(np.uint8)
+
+
+# ---------------- PIRÁMIDES ----------------
+# Todas las fechas a la vez: cada nivel es la suma módulo 10 de los vecinos
+# del nivel anterior, así que se arman 7 niveles con operaciones sobre
+# columnas, sin importar cuántas fechas sean. Devuelve la lista de niveles,
+# de (n × 8) hasta (n × 1).
+def piramides(dias):
+    nivel = digitos_fecha(dias)
+    niveles = [nivel]
+    while nivel.shape[1] > 1:
+        nivel = (nivel[:, :-1] + nivel[:, 1:]) % 10
+        niveles.append(nivel)
+    return niveles
+
+
+# Jugadas que "salen" de la pirámide en una modalidad: cada tramo seguido de
+# largo(modalidad) dígitos de cualquier nivel, leído de izquierda a derecha.
+# Una fila por fecha; puede haber códigos repetidos.
+def candidatos(niveles, modalidad):
+    k = largo(modalidad)
+    pesos = 10 ** np.arange(k - 1, -1, -1, dtype=np.int32)
+    return np.concatenate([
+        sliding_window_view(nivel.astype(np.int32), k, axis=1) @ pesos
+        for nivel in niveles if nivel.shape[1] >= k
+    ], axis=1)
+
+
+def _distintos(candidatos):
+    ordenados = np.sort(candidatos, axis=1)
+    return 1 + (np.diff(ordenados, axis=1) != 0).sum(axis=1)
+
+
+# ---------------- ACIERTOS EN EL HISTÓRICO ----------------
+# Por cada sorteo, si su jugada está entre los candidatos de la pirámide de
+# su fecha. Se arma una pirámide por fecha distinta (no por sorteo) y los
+# sorteos se comparan contra una columna de candidatos a la vez, así la
+# memoria no crece con el número de candidatos. `fecha` es, por sorteo, la
+# posición de su fecha en las pirámides.
+def aciertos(hist, desde=None, hasta=None):
+    filas = filas_fechas(hist, desde, hasta)
+    fechas, fecha = np.unique(np.asarray(hist.fecha[filas]), return_inverse=True)
+    niveles = piramides(fechas)
+
+    resultado = {}
+    for modalidad, codigo in codificar(hist.digitos[filas]).items():
+        opciones = candidatos(niveles, modalidad)
+        validos = codigo != SIN_JUGADA
+        acierto = np.zeros(len(codigo), dtype=bool)
+        for columna in opciones.T:
+            acierto |= columna[fecha] == codigo
+        resultado[modalidad] = {
+            "validos": validos,
+            "aciertos": acierto & validos,
+            # Probabilidad de acertar al azar con los candidatos de cada fecha
+            "esperada": _distintos(opciones) / espacio(modalidad)
+        }
+    return filas, fecha, resultado
+
+
+def tasa_aciertos(hist, desde=None, hasta=None):
+    _, fecha, resultado = aciertos(hist, desde, hasta)
+    tabla = []
+    for modalidad in MODALIDADES:
+        datos = resultado[modalidad]
+        sorteos = int(datos["validos"].sum())
+        acertados = int(datos["aciertos"].sum())
+        tasa = acertados / sorteos if sorteos else np.nan
+        esperada = datos["esperada"][fecha[datos["validos"]]].mean() if sorteos else np.nan
+        tabla.append({
+            "MODALIDAD": modalidad,
+            "SORTEOS": sorteos,
+            "ACIERTOS": acertados,
+            "TASA": tasa,
+            "ESPERADA": esperada,
+            "RAZON": tasa / esperada if sorteos else np.nan
+        })
+    return pd.DataFrame(tabla, columns=COLUMNAS_ACIERTOS)
@@ -0,0 +1,87 @@
+import argparse
+import asyncio
+import random
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+from jugadas import MODALIDADES, largo
+from servidor import PUERTO
+
+
+def _destinos(total):
+    destinos = []
+    for _ in range(total):
+        modalidad = random.choice(list(MODALIDADES))
+        numero = str(random.randrange(10 ** largo(modalidad))).zfill(largo(modalidad))
+        m = quote(modalidad)
+        destinos.append(random.choice([
+            f"/estadisticas?modalidad={m}&numero={numero}",
+            f"/estadisticas?modalidad={m}&numero={numero}&similares=1",
+            f"/huecos?modalidad={m}&numero={numero}",
+            f"/lucky?modalidad={m}",
+            f"/calientes?modalidad={m}&grupo=GLOBAL",
+            "/casilleros?grupo=GLOBAL"
+        ]))
+    return destinos
+
+
+async def _cliente(host, puerto, destinos, latencias, errores):
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        for destino in destinos:
+            inicio = time.perf_counter()
+            writer.write(f"GET {destino} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode())
+            await writer.drain()
+
+            estado = await reader.readline()
+            largo_cuerpo = 0
+            while True:
+                linea = await reader.readline()
+                if linea in (b"\r\n", b""):
+                    break
+                nombre, _, valor = linea.decode("latin-1").partition(":")
+                if nombre.lower() == "content-length":
+                    largo_cuerpo = int(valor)
+            await reader.readexactly(largo_cuerpo)
+
+            latencias.append(time.perf_counter() - inicio)
+            if b" 200 " not in estado:
+                errores.append(destino)
+    finally:
+        writer.close()
+
+
+# ---------------- PRUEBA DE CARGA ----------------
+# `concurrencia` conexiones keep-alive en paralelo, cada una con su parte de
+# las peticiones; reporta p50/p99 y peticiones por segundo.
+async def probar(host, puerto, peticiones, concurrencia):
+    destinos = _destinos(peticiones)
+    latencias, errores = [], []
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[
+        _cliente(host, puerto, destinos[i::concurrencia], latencias, errores)
+        for i in range(concurrencia)
+    ])
+    duracion = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1000
+    print(f"Peticiones:   {len(ms):,} ({len(errores)} con error)")
+    print(f"Concurrencia: {concurrencia}")
+    print(f"Duración:     {duracion:.2f} s ({len(ms) / duracion:,.0f} req/s)")
+    print(f"p50:          {np.percentile(ms, 50):.2f} ms")
+    print(f"p99:          {np.percentile(ms, 99):.2f} ms")
+    print(f"máx:          {ms.max():.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de carga de servidor.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    parser.add_argument("--peticiones", type=int, default=5000)
+    parser.add_argument("--concurrencia", type=int, default=32)
+    args = parser.parse_args()
+
+    asyncio.run(probar(args.host, args.puerto, args.peticiones, args.concurrencia))
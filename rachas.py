@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+from casilleros import POSICIONES
+from historico import SIN_DIGITO
+
+SORTEOS_RACHAS = 20
+
+
+# Largo de la racha de True que termina en cada fila, por columna
+def _largo_rachas(presente):
+    filas = np.arange(1, len(presente) + 1)[:, None]
+    ultimo_corte = np.maximum.accumulate(np.where(presente, 0, filas), axis=0)
+    return filas - ultimo_corte
+
+
+# ---------------- DETECTOR DE RACHAS ----------------
+# Todo sale de la matriz de dígitos de los últimos n sorteos (más viejo
+# primero), sin recorrer filas en Python.
+def detectar_rachas(digitos, n=SORTEOS_RACHAS):
+    ventana = np.asarray(digitos[-n:]) if n > 0 else np.zeros((0, 5), dtype=np.uint8)
+    validos = ventana != SIN_DIGITO
+
+    # Presencia de cada dígito en cada sorteo (sorteos × 10)
+    presencia = np.zeros((len(ventana), 10), dtype=bool)
+    filas, posiciones = np.nonzero(validos)
+    presencia[filas, ventana[filas, posiciones]] = True
+
+    largo = _largo_rachas(presencia)
+    por_digito = pd.DataFrame({
+        "DIGITO": np.arange(10),
+        "APARICIONES": np.bincount(ventana[validos], minlength=10),
+        "SORTEOS_CON_DIGITO": presencia.sum(axis=0),
+        "RACHA_MAXIMA": largo.max(axis=0) if len(largo) else 0,
+        "RACHA_ACTUAL": largo[-1] if len(largo) else 0
+    })
+
+    # Mismo dígito en la misma posición que el sorteo anterior
+    repite = (ventana[1:] == ventana[:-1]) & validos[1:] & validos[:-1]
+    largo_repite = _largo_rachas(repite)
+    por_posicion = pd.DataFrame({
+        "POSICION": POSICIONES,
+        "REPETICIONES": repite.sum(axis=0),
+        "RACHA_MAXIMA": largo_repite.max(axis=0) + 1 if len(repite) else 1,
+        "RACHA_ACTUAL": largo_repite[-1] + 1 if len(repite) else 1,
+        "DIGITO_ACTUAL": ventana[-1] if len(ventana) else SIN_DIGITO
+    })
+
+    return por_digito, por_posicion
+
+
+def mas_frecuentes(por_digito, n=5):
+    orden = np.lexsort((por_digito["DIGITO"], -por_digito["APARICIONES"]))
+    return por_digito.iloc[orden[:n]]
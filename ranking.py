@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+
+from historico import HORARIOS, indice_horario
+from indice import ultima_posicion
+from jugadas import SIN_JUGADA, espacio
+
+TOP_LUCKY = 3
+
+
+# ---------------- RECOMENDACIONES LUCKY ----------------
+# score = sorteos sin salir / promedio histórico, calculado a la vez para
+# todas las jugadas posibles de la modalidad (10^k), incluidas las que nunca
+# han salido. A esas se les cuenta como si hubieran salido justo antes del
+# primer sorteo: llevan todo el histórico sin salir y su promedio es el
+# total de sorteos.
+def calcular_ranking(codigos, concursos, modalidad, k=TOP_LUCKY, horario=None):
+    codigos = np.asarray(codigos)
+
+    if horario is not None:
+        del_horario = indice_horario(concursos) == HORARIOS.index(horario)
+        codigos = codigos[del_horario]
+
+    total_sorteos = len(codigos)
+    validos = codigos[codigos != SIN_JUGADA]
+    tamano = espacio(modalidad)
+
+    conteo = np.bincount(validos, minlength=tamano)
+    sin_salir = len(validos) - 1 - ultima_posicion(validos, tamano)
+    promedio = total_sorteos / np.maximum(conteo, 1)
+    score = sin_salir / promedio
+
+    # Selección parcial de los k mejores; los empates se resuelven por número
+    k = max(0, min(k, tamano))
+    if k == 0:
+        candidatos = np.zeros(0, dtype=np.int64)
+    else:
+        corte = score[np.argpartition(-score, k - 1)[:k]].min()
+        candidatos = np.flatnonzero(score >= corte)
+        candidatos = candidatos[np.lexsort((candidatos, -score[candidatos]))][:k]
+
+    return pd.DataFrame({
+        "CODIGO": candidatos,
+        "SCORE": score[candidatos],
+        "SIN_SALIR": sin_salir[candidatos],
+        "PROMEDIO": promedio[candidatos],
+        "APARICIONES": conteo[candidatos]
+    })
@@ -0,0 +1,131 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from calientes import GRUPOS
+from casilleros import POSICIONES
+from historico import HORARIOS, SIN_DIGITO, indice_horario
+
+# Los 10 pares de posiciones (i < j)
+PARES = list(combinations(range(len(POSICIONES)), 2))
+_PAR_I = np.array([i for i, _ in PARES])
+_PAR_J = np.array([j for _, j in PARES])
+# Filas por bloque al contar
+BLOQUE = 1 << 16
+
+
+def _con_global(por_horario):
+    return np.concatenate([por_horario, por_horario.sum(axis=0, keepdims=True)])
+
+
+# Llave de cada par: ((horario * n + posición o par) * 10 + a) * 10 + b, en
+# uint16; los pares con un dígito vacío van a una casilla extra que se tira.
+# Se cuenta por bloques de filas para que las llaves (y la copia a 64 bits que
+# hace bincount) no crezcan con el histórico.
+def _contar(horario, a, b, n):
+    llaves = (horario.astype(np.uint16)[:, None] * n + np.arange(n, dtype=np.uint16)) * 100
+    llaves += a.astype(np.uint16) * 10 + b
+    descarte = len(HORARIOS) * n * 100
+    llaves[(a == SIN_DIGITO) | (b == SIN_DIGITO)] = descarte
+    return np.bincount(llaves.ravel(), minlength=descarte + 1)[:descarte]
+
+
+def _tensor(conteo, n):
+    return _con_global(conteo.reshape(len(HORARIOS), n, 10, 10))
+
+
+# ---------------- COOCURRENCIA ----------------
+# Tensor grupo × par × dígito × dígito (6 × 10 × 10 × 10): cuántas veces salió
+# el dígito a en la posición i junto con el b en la j, por horario y GLOBAL.
+# Los pares con el R5 vacío de los sorteos antiguos no cuentan.
+def contar_coocurrencia(concursos, digitos):
+    concursos = np.asarray(concursos)
+    digitos = np.asarray(digitos, dtype=np.uint8)
+    conteo = np.zeros(len(HORARIOS) * len(PARES) * 100, dtype=np.int64)
+    for desde in range(0, len(concursos), BLOQUE):
+        bloque = digitos[desde:desde + BLOQUE]
+        horario = indice_horario(concursos[desde:desde + BLOQUE])
+        conteo += _contar(horario, bloque[:, _PAR_I], bloque[:, _PAR_J], len(PARES))
+    return _tensor(conteo, len(PARES))
+
+
+# ---------------- TRANSICIONES ----------------
+# Tensor grupo × posición × dígito anterior × dígito siguiente (6 × 5 × 10 × 10)
+# entre sorteos consecutivos: el grupo es el horario del sorteo de origen, así
+# que transiciones[CLASICO] dice qué salió en el sorteo que siguió a cada
+# CLASICO. Solo cuentan pares de concursos seguidos (un hueco en el histórico
+# no se toma como transición).
+def contar_transiciones(concursos, digitos):
+    concursos = np.asarray(concursos)
+    digitos = np.asarray(digitos, dtype=np.uint8)
+    conteo = np.zeros(len(HORARIOS) * len(POSICIONES) * 100, dtype=np.int64)
+    # Cada bloque lleva además la primera fila del siguiente
+    for desde in range(0, len(concursos) - 1, BLOQUE):
+        bloque = digitos[desde:desde + BLOQUE + 1]
+        concurso = concursos[desde:desde + BLOQUE + 1]
+        seguidos = np.flatnonzero(np.diff(concurso) == 1)
+        horario = indice_horario(concurso[seguidos])
+        conteo += _contar(horario, bloque[seguidos], bloque[seguidos + 1], len(POSICIONES))
+    return _tensor(conteo, len(POSICIONES))
+
+
+# ---------------- ACUMULADO INCREMENTAL ----------------
+# Se guarda el último sorteo visto para unir cada bloque nuevo con el
+# anterior: agregar sorteos cuesta lo mismo que contar solo esos sorteos.
+class Relaciones:
+
+    def __init__(self, concursos=(), digitos=()):
+        self.coocurrencia = np.zeros((len(GRUPOS), len(PARES), 10, 10), dtype=np.int64)
+        self.transiciones = np.zeros((len(GRUPOS), len(POSICIONES), 10, 10), dtype=np.int64)
+        self.ultimo_concurso = None
+        self.ultimos_digitos = None
+        self.agregar(concursos, digitos)
+
+    def agregar(self, concursos, digitos):
+        concursos = np.asarray(concursos, dtype=np.int64)
+        digitos = np.asarray(digitos, dtype=np.uint8).reshape(-1, len(POSICIONES))
+        if not len(concursos):
+            return
+
+        self.coocurrencia += contar_coocurrencia(concursos, digitos)
+        if self.ultimo_concurso is not None:
+            concursos = np.concatenate([[self.ultimo_concurso], concursos])
+            digitos = np.concatenate([self.ultimos_digitos[None], digitos])
+        self.transiciones += contar_transiciones(concursos, digitos)
+
+        self.ultimo_concurso = int(concursos[-1])
+        self.ultimos_digitos = digitos[-1].copy()
+
+
+# ---------------- VISTAS ----------------
+def nombre_par(par):
+    i, j = PARES[par]
+    return f"{POSICIONES[i]} × {POSICIONES[j]}"
+
+
+def matriz(conteo, filas="Dígito"):
+    return pd.DataFrame(
+        conteo,
+        index=pd.Index([str(d) for d in range(10)], name=filas),
+        columns=[str(d) for d in range(10)]
+    )
+
+
+# Probabilidad de cada dígito siguiente dado el anterior (filas que suman 1)
+def probabilidades(conteo):
+    conteo = np.asarray(conteo, dtype=float)
+    total = conteo.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, conteo / total, np.nan)
+
+
+# Para un sorteo de origen (sus cinco dígitos), cuántas veces salió cada
+# dígito en cada posición del sorteo siguiente: posición × dígito (5 × 10)
+def siguientes(transiciones, grupo, digitos):
+    digitos = np.asarray(digitos, dtype=np.int64)
+    tabla = np.zeros((len(POSICIONES), 10), dtype=np.int64)
+    for p, d in enumerate(digitos):
+        if d != SIN_DIGITO:
+            tabla[p] = transiciones[GRUPOS.index(grupo), p, d]
+    return tabla
@@ -0,0 +1,526 @@
+import argparse
+import asyncio
+import json
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from agregados import DIAS_RECIENTES, sincronizar_agregados
+from calendario import DESGLOSES, CalendarioJugadas
+from calientes import GRUPOS, TOP_CALIENTES, CalientesFrios, filas_ventana
+from casilleros import POSICIONES, mas_caliente, mas_frio, tensor_casilleros
+from historico import (
+    CSV_LOCAL,
+    HORARIOS,
+    a_dias,
+    bloqueo,
+    cargar_historico,
+    dias_a_fechas,
+    version_historico
+)
+from intervalos import IntervalosJugadas
+from jugadas import MODALIDADES, SIN_JUGADA, a_codigo, calcular_premio, codificar, formatear
+from piramide import tasa_aciertos
+from ranking import TOP_LUCKY, calcular_ranking
+from relaciones import PARES, contar_coocurrencia, contar_transiciones
+from similares import METRICAS, TIPOS, generar_similares_inteligentes, similares_rankeados
+
+PUERTO = 8600
+# Cada cuánto se revisa si el histórico cambió en disco
+REVISION_SEGUNDOS = 5
+MAX_CACHE = 64
+# Topes de los parámetros numéricos: ventanas (días o sorteos) y largo de
+# las listas que se devuelven
+MAX_VENTANA = 10_000_000
+MAX_FILAS = 1_000
+# Años que acepta /calendario
+ANIOS = (1900, 2100)
+
+
+class ErrorConsulta(ValueError):
+    pass
+
+
+def _a_json(valor):
+    if isinstance(valor, np.integer):
+        return int(valor)
+    if isinstance(valor, np.floating):
+        return None if np.isnan(valor) else float(valor)
+    if isinstance(valor, np.ndarray):
+        return valor.tolist()
+    if isinstance(valor, np.datetime64):
+        return None if np.isnat(valor) else str(valor.astype("datetime64[D]"))
+    if isinstance(valor, np.bool_):
+        return bool(valor)
+    raise TypeError(f"No serializable: {type(valor)}")
+
+
+def _codificar(cuerpo):
+    return json.dumps(cuerpo, default=_a_json, ensure_ascii=False).encode()
+
+
+# np.float64 hereda de float, así que json no pasa los NaN por _a_json
+def _sin_nan(fila):
+    return {k: None if isinstance(v, float) and np.isnan(v) else v for k, v in fila.items()}
+
+
+def _parametro(params, nombre, defecto=None, tipo=str):
+    if nombre not in params:
+        if defecto is None:
+            raise ErrorConsulta(f"Falta el parámetro '{nombre}'")
+        return defecto
+    try:
+        return tipo(params[nombre][0])
+    except ValueError:
+        raise ErrorConsulta(f"Parámetro '{nombre}' inválido: {params[nombre][0]}")
+
+
+def _rango(nombre, valor, minimo, maximo):
+    if not minimo <= valor <= maximo:
+        raise ErrorConsulta(f"Parámetro '{nombre}' fuera de rango ({minimo} a {maximo}): {valor}")
+    return valor
+
+
+# Entero entre `minimo` y `maximo`
+def _entero(params, nombre, defecto=None, minimo=1, maximo=MAX_VENTANA):
+    return _rango(nombre, _parametro(params, nombre, defecto, int), minimo, maximo)
+
+
+def _enteros(params, nombre, minimo=None, maximo=None):
+    try:
+        valores = [int(v) for v in params.get(nombre, [])]
+    except ValueError:
+        raise ErrorConsulta(f"Parámetro '{nombre}' inválido: {params[nombre]}")
+    if minimo is not None:
+        for valor in valores:
+            _rango(nombre, valor, minimo, maximo)
+    return valores
+
+
+def _modalidad(params):
+    modalidad = _parametro(params, "modalidad")
+    if modalidad not in MODALIDADES:
+        raise ErrorConsulta(f"Modalidad desconocida: {modalidad}")
+    return modalidad
+
+
+def _fecha(params, nombre):
+    if nombre not in params:
+        return None
+    valor = params[nombre][0]
+    try:
+        a_dias(valor)
+    except ValueError:
+        raise ErrorConsulta(f"Parámetro '{nombre}' inválido: {valor}")
+    return valor
+
+
+def _ventana(params):
+    # Sin parámetros: los últimos DIAS_RECIENTES días, como en la app
+    if "desde" in params or "hasta" in params:
+        return None, None, (_fecha(params, "desde"), _fecha(params, "hasta"))
+    if "sorteos" in params:
+        return None, _entero(params, "sorteos"), None
+    return _entero(params, "dias", DIAS_RECIENTES), None, None
+
+
+# ---------------- ESTADO EN MEMORIA ----------------
+# El histórico, las jugadas codificadas y los agregados se cargan una vez. Lo
+# que depende de parámetros (ranking, calientes) se guarda en una caché LRU
+# chica que se descarta completa cuando el histórico cambia.
+class Estado:
+
+    def __init__(self, csv=CSV_LOCAL):
+        self.csv = csv
+        # Cargar puede reescribir tris_bin/ y los agregados: bajo el mismo
+        # bloqueo que la app y el cron
+        with bloqueo():
+            self.version = version_historico(csv)
+            self.hist = cargar_historico(csv)
+            self.agregados = sincronizar_agregados(self.hist)
+        self.codigos = codificar(self.hist.digitos)
+        self.tensor = tensor_casilleros(self.hist.concurso, self.hist.digitos)
+        self.intervalos = IntervalosJugadas(self.agregados.indice)
+        self.calendario_jugadas = CalendarioJugadas(self.hist, self.codigos)
+        self._cache = OrderedDict()
+
+    def _cacheado(self, llave, calcular):
+        if llave in self._cache:
+            self._cache.move_to_end(llave)
+            return self._cache[llave]
+        valor = calcular()
+        self._cache[llave] = valor
+        if len(self._cache) > MAX_CACHE:
+            self._cache.popitem(last=False)
+        return valor
+
+    def salud(self, params):
+        return {
+            "sorteos": len(self.hist.concurso),
+            "ultimo_concurso": int(self.hist.concurso[-1]),
+            "ultima_fecha": dias_a_fechas(self.hist.fecha[-1:])[0]
+        }
+
+    def estadisticas(self, params):
+        modalidad = _modalidad(params)
+        numeros = params.get("numero")
+        if not numeros:
+            raise ErrorConsulta("Falta el parámetro 'numero'")
+        apuesta = _entero(params, "apuesta", 1)
+        multiplicador = _entero(params, "multiplicador", 0, minimo=0)
+        indice = self.agregados.indice
+
+        codigos = [a_codigo(n, modalidad) for n in numeros]
+        columnas = indice.estadisticas(modalidad, codigos)
+        for n in _enteros(params, "ventana", 1, MAX_VENTANA):
+            columnas[f"ULT_{n}"] = indice.apariciones_ultimos(modalidad, codigos, n)
+        del columnas["CODIGO"]
+
+        respuesta = []
+        for i, (numero, codigo) in enumerate(zip(numeros, codigos)):
+            fila = {"MODALIDAD": modalidad, "NUMERO": numero, "VALIDO": codigo is not None}
+            fila.update({nombre: valores[i] for nombre, valores in columnas.items()})
+            if not fila["APARICIONES"]:
+                fila.update(ULTIMO_CONCURSO=None, ULTIMA_FECHA=None, SIN_SALIR=None)
+
+            base, multi, total = calcular_premio(modalidad, apuesta, multiplicador)
+            if codigo is None:
+                base = multi = total = 0
+            fila.update(PREMIO_BASE=base, PREMIO_MULTI=multi, PREMIO_TOTAL=total)
+
+            if "similares" in params:
+                similares = generar_similares_inteligentes(numero) if codigo is not None else []
+                stats = indice.estadisticas(modalidad, [a_codigo(s, modalidad) for s in similares])
+                fila["SIMILARES"] = [
+                    {"NUMERO": s, "APARICIONES": a, "SIN_SALIR": sin}
+                    for s, a, sin in zip(similares, stats["APARICIONES"], stats["SIN_SALIR"])
+                ]
+            respuesta.append(_sin_nan(fila))
+        return respuesta
+
+    def lucky(self, params):
+        modalidad = _modalidad(params)
+        k = _entero(params, "k", TOP_LUCKY, maximo=MAX_FILAS)
+        horario = params.get("horario", [None])[0]
+        if horario not in HORARIOS + [None]:
+            raise ErrorConsulta(f"Horario desconocido: {horario}")
+
+        return self._cacheado(
+            ("lucky", modalidad, k, horario),
+            lambda: self._lucky(modalidad, k, horario)
+        )
+
+    def _lucky(self, modalidad, k, horario):
+        ranking = calcular_ranking(
+            self.codigos[modalidad],
+            self.hist.concurso,
+            modalidad,
+            k=k,
+            horario=horario
+        )
+        return ranking.assign(
+            NUMERO=[formatear(c, modalidad) for c in ranking["CODIGO"]]
+        ).to_dict("records")
+
+    def _calientes_frios(self, modalidad, dias, sorteos, fechas):
+        if dias == DIAS_RECIENTES and sorteos is None and fechas is None:
+            filas = self.agregados.recientes.filas
+            return CalientesFrios(
+                filas["concurso"],
+                filas["fecha"],
+                filas["codigos"][modalidad],
+                modalidad
+            )
+
+        filas = filas_ventana(self.hist, dias, sorteos, fechas)
+        return CalientesFrios(
+            self.hist.concurso[filas],
+            self.hist.fecha[filas],
+            self.codigos[modalidad][filas],
+            modalidad
+        )
+
+    def calientes(self, params):
+        modalidad = _modalidad(params)
+        grupo = _parametro(params, "grupo", "GLOBAL")
+        if grupo not in GRUPOS:
+            raise ErrorConsulta(f"Grupo desconocido: {grupo}")
+        n = _entero(params, "n", TOP_CALIENTES, maximo=MAX_FILAS)
+        dias, sorteos, fechas = _ventana(params)
+
+        datos = self._cacheado(
+            ("ventana", modalidad, dias, sorteos, fechas),
+            lambda: self._calientes_frios(modalidad, dias, sorteos, fechas)
+        )
+        return self._cacheado(
+            ("calientes", modalidad, dias, sorteos, fechas, grupo, n),
+            lambda: self._tabla_calientes(datos, modalidad, grupo, n)
+        )
+
+    def _tabla_calientes(self, datos, modalidad, grupo, n):
+        calientes = datos.calientes(grupo, n)
+        frios = datos.frios(grupo, n)
+        return {
+            "calientes": [
+                {
+                    "NUMERO": formatear(c.CODIGO, modalidad),
+                    "CONTEO": c.CONTEO,
+                    "FECHAS": dias_a_fechas(c.FECHAS).astype("datetime64[D]").astype(str).tolist(),
+                    "SIN_SALIR": c.SIN_SALIR
+                }
+                for c in calientes.itertuples()
+            ],
+            "frios": [
+                {"NUMERO": formatear(f.CODIGO, modalidad), "SIN_SALIR": f.SIN_SALIR}
+                for f in frios.itertuples()
+            ]
+        }
+
+    def casilleros(self, params):
+        grupo = _parametro(params, "grupo", "GLOBAL")
+        if grupo not in GRUPOS:
+            raise ErrorConsulta(f"Grupo desconocido: {grupo}")
+        g = GRUPOS.index(grupo)
+
+        if params.keys() & {"dias", "sorteos", "desde", "hasta"}:
+            filas = filas_ventana(self.hist, *_ventana(params))
+            conteo, ultimo = tensor_casilleros(
+                self.hist.concurso[filas],
+                self.hist.digitos[filas]
+            )
+        else:
+            conteo, ultimo = self.tensor
+
+        return [
+            {
+                "POSICION": posicion,
+                "CONTEO": conteo[g, p],
+                "MAS_CALIENTE": mas_caliente(conteo[g, p], ultimo[g, p]),
+                "MAS_FRIO": mas_frio(conteo[g, p], ultimo[g, p])
+            }
+            for p, posicion in enumerate(POSICIONES)
+        ]
+
+    # Sin ventana, los tensores que los agregados mantienen al día
+    def relaciones(self, params):
+        grupo = _parametro(params, "grupo", "GLOBAL")
+        if grupo not in GRUPOS:
+            raise ErrorConsulta(f"Grupo desconocido: {grupo}")
+        g = GRUPOS.index(grupo)
+
+        if params.keys() & {"dias", "sorteos", "desde", "hasta"}:
+            dias, sorteos, fechas = _ventana(params)
+            coocurrencia, transiciones = self._cacheado(
+                ("relaciones", dias, sorteos, fechas),
+                lambda: self._relaciones(filas_ventana(self.hist, dias, sorteos, fechas))
+            )
+        else:
+            coocurrencia = self.agregados.relaciones.coocurrencia
+            transiciones = self.agregados.relaciones.transiciones
+
+        return {
+            "COOCURRENCIA": [
+                {"POSICIONES": [POSICIONES[i], POSICIONES[j]], "CONTEO": coocurrencia[g, par]}
+                for par, (i, j) in enumerate(PARES)
+            ],
+            "TRANSICIONES": [
+                {"POSICION": posicion, "CONTEO": transiciones[g, p]}
+                for p, posicion in enumerate(POSICIONES)
+            ]
+        }
+
+    def _relaciones(self, filas):
+        concursos, digitos = self.hist.concurso[filas], self.hist.digitos[filas]
+        return contar_coocurrencia(concursos, digitos), contar_transiciones(concursos, digitos)
+
+    def huecos(self, params):
+        modalidad = _modalidad(params)
+        numeros = params.get("numero")
+        if not numeros:
+            raise ErrorConsulta("Falta el parámetro 'numero'")
+
+        codigos = [a_codigo(n, modalidad) for n in numeros]
+        columnas = self.intervalos.consultar(modalidad, [SIN_JUGADA if c is None else c for c in codigos])
+        del columnas["CODIGO"]
+
+        respuesta = []
+        for i, (numero, codigo) in enumerate(zip(numeros, codigos)):
+            fila = {"MODALIDAD": modalidad, "NUMERO": numero, "VALIDO": codigo is not None}
+            fila.update({nombre: valores[i] for nombre, valores in columnas.items()})
+            if codigo is not None and "histograma" in params:
+                fila["HISTOGRAMA"] = self.intervalos.histograma(modalidad, codigo).to_dict("records")
+            respuesta.append(_sin_nan(fila))
+        return respuesta
+
+    def calendario(self, params):
+        modalidad = _modalidad(params)
+        numeros = params.get("numero")
+        if not numeros:
+            raise ErrorConsulta("Falta el parámetro 'numero'")
+        por = _parametro(params, "por", "dia_semana")
+        if por not in DESGLOSES:
+            raise ErrorConsulta(f"Desglose desconocido: {por}")
+        fechas = (_fecha(params, "desde"), _fecha(params, "hasta"))
+        filtros = {
+            "dias_semana": _enteros(params, "dia", 0, 6) or None,
+            "meses": _enteros(params, "mes", 1, 12) or None,
+            "anios": _enteros(params, "anio", *ANIOS) or None
+        }
+
+        codigos = [a_codigo(n, modalidad) for n in numeros]
+        apariciones = self.calendario_jugadas.apariciones(modalidad, codigos, *fechas, **filtros)
+        sorteos = self.calendario_jugadas.sorteos(modalidad, *fechas, **filtros)
+
+        respuesta = []
+        for numero, codigo, a in zip(numeros, codigos, apariciones):
+            fila = {"MODALIDAD": modalidad, "NUMERO": numero, "VALIDO": codigo is not None}
+            if codigo is not None:
+                fila.update(APARICIONES=a, SORTEOS=sorteos)
+                fila["DESGLOSE"] = [
+                    _sin_nan(d) for d in self.calendario_jugadas.desglose(modalidad, codigo, por).to_dict("records")
+                ]
+            respuesta.append(fila)
+        return respuesta
+
+    def piramide(self, params):
+        fechas = (_fecha(params, "desde"), _fecha(params, "hasta"))
+        tabla = self._cacheado(("piramide", fechas), lambda: tasa_aciertos(self.hist, *fechas))
+        return [_sin_nan(fila) for fila in tabla.to_dict("records")]
+
+    def similares(self, params):
+        modalidad = _modalidad(params)
+        numero = _parametro(params, "numero")
+        codigo = a_codigo(numero, modalidad)
+        if codigo is None:
+            raise ErrorConsulta(f"Número inválido para {modalidad}: {numero}")
+        tipos = params.get("tipo", list(TIPOS))
+        if set(tipos) - set(TIPOS):
+            raise ErrorConsulta(f"Tipo desconocido: {sorted(set(tipos) - set(TIPOS))}")
+        metrica = _parametro(params, "orden", "cercania")
+        if metrica not in METRICAS:
+            raise ErrorConsulta(f"Orden desconocido: {metrica}")
+
+        tabla = similares_rankeados(
+            self.agregados.indice,
+            modalidad,
+            codigo,
+            tipos=tipos,
+            rango=_entero(params, "rango", 1, maximo=MAX_FILAS),
+            metrica=metrica,
+            # 0 = sin ventana de apariciones recientes
+            ventana=_entero(params, "ventana", 0, minimo=0),
+            n=_entero(params, "n", 20, maximo=MAX_FILAS)
+        )
+        columnas = {c: tabla[c].to_numpy() for c in tabla.columns if c != "CODIGO"}
+        return [_sin_nan({c: valores[i] for c, valores in columnas.items()}) for i in range(len(tabla))]
+
+
+# ---------------- SERVIDOR HTTP ----------------
+# HTTP/1.1 mínimo sobre asyncio (solo GET, con keep-alive) para no sumar
+# dependencias. Las consultas se resuelven en el mismo hilo: son lecturas de
+# arreglos en memoria y la mayoría sale de la caché.
+class Servidor:
+
+    def __init__(self, csv=CSV_LOCAL):
+        self.estado = Estado(csv)
+        self.rutas = {
+            "/salud": "salud",
+            "/estadisticas": "estadisticas",
+            "/lucky": "lucky",
+            "/calientes": "calientes",
+            "/casilleros": "casilleros",
+            "/huecos": "huecos",
+            "/relaciones": "relaciones",
+            "/similares": "similares",
+            "/calendario": "calendario",
+            "/piramide": "piramide"
+        }
+
+    # Devuelve el código y el cuerpo ya en JSON: una falla al serializar
+    # también responde 500
+    def responder(self, metodo, destino):
+        if metodo != "GET":
+            return 405, _codificar({"error": "Solo se acepta GET"})
+
+        partes = urlsplit(destino)
+        if partes.path not in self.rutas:
+            return 404, _codificar({"error": f"Ruta desconocida: {partes.path}"})
+
+        params = parse_qs(partes.query)
+        estado = self.estado
+        try:
+            return 200, _codificar(getattr(estado, self.rutas[partes.path])(params))
+        except ErrorConsulta as e:
+            return 400, _codificar({"error": str(e)})
+        except Exception as e:
+            # Cualquier otra falla responde 500 en vez de cortar la conexión
+            print(f"❌ Error en {destino}: {e!r}")
+            return 500, _codificar({"error": f"Error interno: {type(e).__name__}"})
+
+    async def atender(self, reader, writer):
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                metodo, destino, _ = linea.decode("latin-1").split(" ", 2)
+
+                encabezados = {}
+                while True:
+                    linea = await reader.readline()
+                    if linea in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+
+                codigo, datos = self.responder(metodo, destino)
+                cerrar = encabezados.get("connection", "").lower() == "close"
+
+                writer.write(
+                    f"HTTP/1.1 {codigo} {'OK' if codigo == 200 else 'Error'}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(datos)}\r\n"
+                    f"Connection: {'close' if cerrar else 'keep-alive'}\r\n"
+                    "\r\n".encode() + datos
+                )
+                await writer.drain()
+                if cerrar:
+                    break
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    # El histórico se vuelve a cargar (fuera del bucle de eventos) cuando
+    # cambia su versión; las consultas en curso siguen con el estado anterior.
+    # Si la recarga falla (un archivo a medio escribir, un CSV que no se puede
+    # leer) se sigue sirviendo el estado anterior y se reintenta en la
+    # siguiente revisión.
+    async def vigilar(self):
+        while True:
+            await asyncio.sleep(REVISION_SEGUNDOS)
+            if version_historico(self.estado.csv) == self.estado.version:
+                continue
+            try:
+                estado = await asyncio.to_thread(Estado, self.estado.csv)
+            except Exception as e:
+                print(f"❌ No se pudo recargar el histórico: {e!r}")
+                continue
+            self.estado = estado
+            print(f"🔄 Histórico recargado: concurso {self.estado.hist.concurso[-1]}")
+
+    async def iniciar(self, host, puerto):
+        servidor = await asyncio.start_server(self.atender, host, puerto)
+        print(f"🚀 Sirviendo en http://{host}:{puerto}")
+        async with servidor:
+            await asyncio.gather(servidor.serve_forever(), self.vigilar())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API JSON con las estadísticas del TRIS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO)
+    args = parser.parse_args()
+
+    asyncio.run(Servidor().iniciar(args.host, args.puerto))
@@ -0,0 +1,136 @@
+from functools import lru_cache
+from itertools import combinations, permutations
+
+import numpy as np
+import pandas as pd
+
+from jugadas import MODALIDADES
+
+TOP_SIMILARES = 5
+
+# Tipos de vecino en orden de cercanía; un candidato que cae en varios se
+# queda con el primero.
+TIPOS = ("permutacion", "cercano", "hamming1", "hamming2")
+RANGO_CERCANO = 1
+
+# Métrica -> (columnas para ordenar, ascendente). Los empates se rompen por
+# cercanía y después por el número. Los NaN de PROMEDIO quedan al final; en
+# sin_salir los que nunca salieron (SIN_SALIR = -1) van primero, como el
+# atraso más largo.
+METRICAS = {
+    "cercania": ([], []),
+    "apariciones": (["APARICIONES"], [False]),
+    "sin_salir": (["SIN_SALIR"], [False]),
+    "recientes": (["RECIENTES"], [False]),
+    "promedio": (["PROMEDIO"], [True])
+}
+
+
+def _pesos(largo):
+    return 10 ** np.arange(largo - 1, -1, -1, dtype=np.int64)
+
+
+def a_digitos(codigos, largo):
+    codigos = np.asarray(codigos, dtype=np.int64)
+    return (codigos[..., None] // _pesos(largo)) % 10
+
+
+@lru_cache(maxsize=None)
+def _ordenes(largo):
+    return np.array(list(permutations(range(largo))), dtype=np.int64).reshape(-1, largo)
+
+
+# ---------------- VECINDARIO ----------------
+# Todos los candidatos se arman como códigos enteros de la misma modalidad,
+# así que nunca salen números de otro largo. Con 5 dígitos son a lo más
+# 120 permutaciones, 45 cambios de un dígito y 810 de dos.
+def _candidatos(codigo, largo, tipo, rango):
+    digitos = a_digitos(codigo, largo)
+    pesos = _pesos(largo)
+    if tipo == "permutacion":
+        return digitos[_ordenes(largo)] @ pesos
+    if tipo == "cercano":
+        rango = min(int(rango), 10 ** largo)
+        return codigo + np.arange(-rango, rango + 1)
+    # Cambios de 1 o 2 casilleros: delta[i, v] lleva el dígito i al valor v
+    delta = (np.arange(10) - digitos[:, None]) * pesos[:, None]
+    if tipo == "hamming1":
+        return codigo + delta.ravel()
+    pares = [
+        (delta[i][:, None] + delta[j][None, :]).ravel()
+        for i, j in combinations(range(largo), 2)
+    ]
+    return codigo + np.concatenate(pares) if pares else np.empty(0, dtype=np.int64)
+
+
+def _vecinos(codigo, largo, tipos=TIPOS, rango=RANGO_CERCANO, n=None):
+    tamano = 10 ** largo
+    vistos = np.zeros(0, dtype=np.int64)
+    etiquetas = []
+
+    for t, tipo in enumerate(TIPOS):
+        if tipo not in tipos or (n is not None and len(vistos) >= n):
+            continue
+        candidatos = _candidatos(codigo, largo, tipo, rango)
+        candidatos = np.unique(candidatos[(candidatos >= 0) & (candidatos < tamano) & (candidatos != codigo)])
+        candidatos = candidatos[~np.isin(candidatos, vistos)]
+        etiquetas.append(np.full(len(candidatos), t))
+        vistos = np.concatenate([vistos, candidatos])
+
+    etiquetas = np.concatenate(etiquetas) if etiquetas else np.empty(0, dtype=np.int64)
+    return vistos, etiquetas
+
+
+def _columnas(codigo, largo, tipos, rango):
+    codigos, etiquetas = _vecinos(codigo, largo, tipos, rango)
+    return {
+        "CODIGO": codigos,
+        "TIPO": etiquetas,
+        "DIGITOS_DISTINTOS": (a_digitos(codigos, largo) != a_digitos(codigo, largo)).sum(axis=1),
+        "DIFERENCIA": np.abs(codigos - codigo)
+    }
+
+
+def _tabla(columnas, largo):
+    tabla = pd.DataFrame(columnas)
+    tabla.insert(1, "NUMERO", [str(c).zfill(largo) for c in columnas["CODIGO"]])
+    tabla["TIPO"] = np.array(TIPOS, dtype=object)[columnas["TIPO"]]
+    return tabla
+
+
+def vecindario(codigo, largo, tipos=TIPOS, rango=RANGO_CERCANO):
+    return _tabla(_columnas(int(codigo), largo, tipos, rango), largo)
+
+
+# ---------------- RANKING ----------------
+# Las estadísticas de todo el vecindario salen de una sola consulta al índice
+# (lecturas de arreglo) y el orden es un lexsort sobre esos arreglos; el
+# DataFrame se arma solo con las filas que se devuelven, así que cientos de
+# candidatos siguen siendo interactivos. "RECIENTES" son las apariciones en
+# los últimos `ventana` sorteos de la modalidad.
+def similares_rankeados(indice, modalidad, codigo, tipos=TIPOS, rango=RANGO_CERCANO,
+                        metrica="cercania", ventana=None, n=None):
+    largo = MODALIDADES[modalidad][1]
+    columnas = _columnas(int(codigo), largo, tipos, rango)
+    stats = indice.estadisticas(modalidad, columnas["CODIGO"])
+    for columna in ("APARICIONES", "ULTIMO_CONCURSO", "ULTIMA_FECHA", "SIN_SALIR", "PROMEDIO"):
+        columnas[columna] = stats[columna]
+    if ventana:
+        columnas["RECIENTES"] = indice.apariciones_ultimos(modalidad, columnas["CODIGO"], ventana)
+    else:
+        columnas["RECIENTES"] = columnas["APARICIONES"]
+
+    criterios, ascendente = METRICAS[metrica]
+    valores = dict(columnas)
+    sin_salir = columnas["SIN_SALIR"]
+    valores["SIN_SALIR"] = np.where(sin_salir < 0, np.iinfo(sin_salir.dtype).max, sin_salir)
+    claves = [valores[c] if a else -valores[c] for c, a in zip(criterios, ascendente)]
+    claves += [columnas[c] for c in ("TIPO", "DIGITOS_DISTINTOS", "DIFERENCIA", "CODIGO")]
+    orden = np.lexsort(claves[::-1])[:n]
+    return _tabla({c: valores[orden] for c, valores in columnas.items()}, largo)
+
+
+# Los `n` más cercanos: permutaciones, luego ±1 y luego cambios de un dígito
+def generar_similares_inteligentes(num, n=TOP_SIMILARES):
+    codigos, _ = _vecinos(int(num), len(num), TIPOS[:3], n=n)
+    return [str(c).zfill(len(num)) for c in codigos[:n]]
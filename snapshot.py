@@ -0,0 +1,370 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from agregados import DIAS_RECIENTES, sincronizar_agregados
+from calientes import GRUPOS, SORTEOS_RECIENTES, TOP_CALIENTES, CalientesFrios, inicio_ventana
+from casilleros import tensor_casilleros
+from historico import CSV_LOCAL, DIR_BINARIO, HORARIOS, bloqueo, cargar_historico
+from indice import VENTANAS, IndiceJugadas
+from jugadas import MODALIDADES, SIN_JUGADA, codificar
+from ranking import calcular_ranking
+from relaciones import contar_coocurrencia, contar_transiciones
+
+RUTA_SNAPSHOT = os.path.join(DIR_BINARIO, "snapshot.bin")
+# Subir cuando cambie lo que se guarda: los snapshots viejos se ignoran
+FORMATO_SNAPSHOT = 2
+MAGIA = b"TRISSNAP"
+ALINEACION = 64
+# El máximo de recomendaciones que deja pedir la app
+MAX_LUCKY = 50
+# Ventanas de calientes/fríos, casilleros y relaciones que la app usa por omisión
+VENTANAS_ESTANDAR = ((DIAS_RECIENTES, None), (None, SORTEOS_RECIENTES))
+COLUMNAS_INDICE = ("conteo", "ultimo_concurso", "ultima_fecha")
+
+
+# Depende solo del contenido del histórico (no de fechas de archivo), así que
+# sigue valiendo después de un checkout o de compactar el diario.
+def firma_historico(hist):
+    h = hashlib.sha1()
+    for arreglo in (hist.concurso, hist.digitos, hist.fecha, hist.multiplicador):
+        h.update(np.ascontiguousarray(arreglo).tobytes())
+    h.update(str(hist.inicio_multiplicador).encode())
+    return h.hexdigest()
+
+
+def _ventana(dias, sorteos):
+    return f"dias_{dias}" if sorteos is None else f"sorteos_{sorteos}"
+
+
+# ---------------- CÁLCULO EN PARALELO ----------------
+# Una tarea por modalidad (índice, rankings Lucky de cada horario y listas de
+# calientes/fríos de las ventanas estándar) y una para los casilleros. Cada
+# proceso carga el histórico una vez; el binario se abre con mmap.
+_HISTORICO = {}
+
+
+def _iniciar(csv, directorio):
+    hist = cargar_historico(csv, directorio)
+    _HISTORICO.update(hist=hist, codigos=codificar(hist.digitos))
+
+
+def _tarea_modalidad(modalidad):
+    hist = _HISTORICO["hist"]
+    codigo = _HISTORICO["codigos"][modalidad]
+    arreglos = {}
+
+    datos = IndiceJugadas(hist.concurso, hist.fecha, {modalidad: codigo}).modalidades[modalidad]
+    for columna in COLUMNAS_INDICE:
+        arreglos[f"indice/{modalidad}/{columna}"] = datos[columna]
+    for n, conteo in datos["ventanas"].items():
+        arreglos[f"indice/{modalidad}/ult_{n}"] = conteo
+
+    for horario in [None] + HORARIOS:
+        ranking = calcular_ranking(codigo, hist.concurso, modalidad, k=MAX_LUCKY, horario=horario)
+        for columna in ranking.columns:
+            arreglos[f"lucky/{modalidad}/{horario or 'TODOS'}/{columna}"] = ranking[columna].to_numpy()
+
+    for dias, sorteos in VENTANAS_ESTANDAR:
+        inicio = inicio_ventana(hist.fecha, dias=dias, sorteos=sorteos)
+        datos = CalientesFrios(hist.concurso[inicio:], hist.fecha[inicio:], codigo[inicio:], modalidad)
+        prefijo = f"calientes/{modalidad}/{_ventana(dias, sorteos)}"
+
+        calientes = [datos.calientes(grupo).assign(GRUPO=g) for g, grupo in enumerate(GRUPOS)]
+        calientes = pd.concat(calientes, ignore_index=True)
+        frios = pd.concat([datos.frios(grupo).assign(GRUPO=g) for g, grupo in enumerate(GRUPOS)], ignore_index=True)
+
+        for columna in ("GRUPO", "CODIGO", "CONTEO", "SIN_SALIR"):
+            arreglos[f"{prefijo}/calientes/{columna}"] = calientes[columna].to_numpy(dtype=np.int64)
+        # Las fechas de cada fila, planas, con el índice donde empieza cada una
+        largos = np.array([len(f) for f in calientes["FECHAS"]], dtype=np.int64)
+        arreglos[f"{prefijo}/calientes/FECHAS"] = (
+            np.concatenate(calientes["FECHAS"].tolist()).astype(np.int32)
+            if len(calientes) else np.zeros(0, dtype=np.int32)
+        )
+        arreglos[f"{prefijo}/calientes/INICIO"] = np.concatenate([[0], np.cumsum(largos)])
+        for columna in ("GRUPO", "CODIGO", "SIN_SALIR"):
+            arreglos[f"{prefijo}/frios/{columna}"] = frios[columna].to_numpy(dtype=np.int64)
+        arreglos[f"{prefijo}/vacio"] = np.array([datos.vacio(grupo) for grupo in GRUPOS])
+
+    return arreglos
+
+
+def _tarea_casilleros(_):
+    hist = _HISTORICO["hist"]
+    conteo, ultimo = tensor_casilleros(hist.concurso, hist.digitos)
+    arreglos = {"casilleros/historico/conteo": conteo, "casilleros/historico/ultimo": ultimo}
+    for dias, sorteos in VENTANAS_ESTANDAR:
+        inicio = inicio_ventana(hist.fecha, dias=dias, sorteos=sorteos)
+        conteo, _ = tensor_casilleros(hist.concurso[inicio:], hist.digitos[inicio:])
+        arreglos[f"casilleros/{_ventana(dias, sorteos)}/conteo"] = conteo
+
+    # Coocurrencia y transiciones de dígitos, del histórico y de las ventanas
+    for nombre, filas in [("historico", slice(None))] + [
+        (_ventana(dias, sorteos), slice(inicio_ventana(hist.fecha, dias=dias, sorteos=sorteos), None))
+        for dias, sorteos in VENTANAS_ESTANDAR
+    ]:
+        arreglos[f"relaciones/{nombre}/coocurrencia"] = contar_coocurrencia(hist.concurso[filas], hist.digitos[filas])
+        arreglos[f"relaciones/{nombre}/transiciones"] = contar_transiciones(hist.concurso[filas], hist.digitos[filas])
+    return arreglos
+
+
+def _tarea(nombre):
+    if nombre == "casilleros":
+        return _tarea_casilleros(nombre)
+    return _tarea_modalidad(nombre)
+
+
+# ---------------- FORMATO DEL ARCHIVO ----------------
+# Un solo archivo: MAGIA, largo de la cabecera (uint64), la cabecera en JSON
+# (metadatos y, por arreglo, dtype, forma y desplazamiento) y después los
+# datos crudos de cada arreglo, alineados a ALINEACION bytes para poder
+# abrirlos como vistas de un único mmap.
+def _alinear(n):
+    return -(-n // ALINEACION) * ALINEACION
+
+
+def escribir_snapshot(ruta, meta, arreglos):
+    arreglos = {nombre: np.ascontiguousarray(a) for nombre, a in arreglos.items()}
+    descripcion, desplazamiento = {}, 0
+    for nombre, arreglo in arreglos.items():
+        descripcion[nombre] = {
+            "dtype": arreglo.dtype.str,
+            "shape": list(arreglo.shape),
+            "offset": desplazamiento
+        }
+        desplazamiento = _alinear(desplazamiento + arreglo.nbytes)
+
+    cabecera = json.dumps({**meta, "arreglos": descripcion}, ensure_ascii=False).encode()
+    inicio = _alinear(len(MAGIA) + 8 + len(cabecera))
+
+    # Temporal con nombre único en el mismo directorio: dos escritores nunca
+    # comparten archivo y el renombrado final es atómico
+    descriptor, temporal = tempfile.mkstemp(
+        dir=os.path.dirname(ruta) or ".", prefix=os.path.basename(ruta) + ".", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(MAGIA)
+            f.write(np.uint64(len(cabecera)).tobytes())
+            f.write(cabecera)
+            for nombre, arreglo in arreglos.items():
+                f.seek(inicio + descripcion[nombre]["offset"])
+                f.write(arreglo.tobytes())
+            f.truncate(inicio + desplazamiento)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.remove(temporal)
+        raise
+
+
+# Se arma bajo bloqueo(): el histórico no cambia a la mitad y dos procesos (la
+# app y el cron) no escriben el snapshot a la vez.
+def construir_snapshot(csv=CSV_LOCAL, directorio=DIR_BINARIO, ruta=RUTA_SNAPSHOT, procesos=None):
+    with bloqueo(directorio):
+        return _construir(csv, directorio, ruta, procesos)
+
+
+def _construir(csv, directorio, ruta, procesos):
+    hist = cargar_historico(csv, directorio)
+    tareas = list(MODALIDADES) + ["casilleros"]
+
+    arreglos = {}
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_iniciar, initargs=(csv, directorio)) as pool:
+        for resultado in pool.map(_tarea, tareas):
+            arreglos.update(resultado)
+
+    meta = {
+        "formato": FORMATO_SNAPSHOT,
+        "firma": firma_historico(hist),
+        "ultimo_concurso": int(hist.concurso[-1]) if len(hist.concurso) else 0,
+        "sorteos": len(hist.concurso),
+        "total_sorteos": len(np.unique(hist.concurso)),
+        "ventanas": list(VENTANAS),
+        "concurso_max": {
+            m: int(hist.concurso[codigo != SIN_JUGADA].max(initial=0))
+            for m, codigo in codificar(hist.digitos).items()
+        }
+    }
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    escribir_snapshot(ruta, meta, arreglos)
+    return ruta
+
+
+# ---------------- LECTURA ----------------
+# Los arreglos son vistas de solo lectura sobre el mmap: abrir el snapshot no
+# copia ni recalcula nada. Lo que no está precalculado (otras ventanas, más
+# recomendaciones) devuelve None y la app lo calcula como siempre.
+class CalientesPrecalculados:
+
+    def __init__(self, arreglos, prefijo):
+        self._calientes = {
+            c: arreglos[f"{prefijo}/calientes/{c}"]
+            for c in ("GRUPO", "CODIGO", "CONTEO", "SIN_SALIR", "FECHAS", "INICIO")
+        }
+        self._frios = {c: arreglos[f"{prefijo}/frios/{c}"] for c in ("GRUPO", "CODIGO", "SIN_SALIR")}
+        self._vacio = arreglos[f"{prefijo}/vacio"]
+
+    def vacio(self, grupo):
+        return bool(self._vacio[GRUPOS.index(grupo)])
+
+    def calientes(self, grupo, n=TOP_CALIENTES):
+        datos = self._calientes
+        filas = np.flatnonzero(datos["GRUPO"] == GRUPOS.index(grupo))[:n]
+        return pd.DataFrame({
+            "CODIGO": datos["CODIGO"][filas],
+            "CONTEO": datos["CONTEO"][filas],
+            "FECHAS": [datos["FECHAS"][datos["INICIO"][i]:datos["INICIO"][i + 1]] for i in filas],
+            "SIN_SALIR": datos["SIN_SALIR"][filas]
+        })
+
+    def frios(self, grupo, n=TOP_CALIENTES):
+        datos = self._frios
+        filas = np.flatnonzero(datos["GRUPO"] == GRUPOS.index(grupo))[:n]
+        return pd.DataFrame({"CODIGO": datos["CODIGO"][filas], "SIN_SALIR": datos["SIN_SALIR"][filas]})
+
+
+class Snapshot:
+
+    def __init__(self, ruta, hist):
+        self.ruta = ruta
+        self._mapa = np.memmap(ruta, dtype=np.uint8, mode="r")
+        if bytes(self._mapa[:len(MAGIA)]) != MAGIA:
+            raise ValueError(f"{ruta} no es un snapshot")
+        largo = int(self._mapa[len(MAGIA):len(MAGIA) + 8].view(np.uint64)[0])
+        self.meta = json.loads(bytes(self._mapa[len(MAGIA) + 8:len(MAGIA) + 8 + largo]))
+        if self.meta["formato"] != FORMATO_SNAPSHOT:
+            raise ValueError(f"Formato de snapshot {self.meta['formato']}, se esperaba {FORMATO_SNAPSHOT}")
+        if self.meta["firma"] != firma_historico(hist):
+            raise ValueError("El snapshot es de otro histórico")
+
+        inicio = _alinear(len(MAGIA) + 8 + largo)
+        self.arreglos = {}
+        for nombre, d in self.meta["arreglos"].items():
+            dtype = np.dtype(d["dtype"])
+            desde = inicio + d["offset"]
+            hasta = desde + dtype.itemsize * int(np.prod(d["shape"], dtype=np.int64))
+            self.arreglos[nombre] = np.asarray(self._mapa[desde:hasta]).view(dtype).reshape(d["shape"])
+
+        self.indice = self._indice(hist)
+
+    # Las apariciones (códigos y concursos) salen del histórico ya abierto;
+    # los conteos por jugada, del snapshot
+    def _indice(self, hist):
+        modalidades = {}
+        for modalidad, codigo in codificar(hist.digitos).items():
+            validos = codigo != SIN_JUGADA
+            prefijo = f"indice/{modalidad}"
+            modalidades[modalidad] = {
+                "codigos": codigo[validos],
+                "concursos": np.asarray(hist.concurso[validos], dtype=np.int32),
+                **{c: self.arreglos[f"{prefijo}/{c}"] for c in COLUMNAS_INDICE},
+                "ventanas": {n: self.arreglos[f"{prefijo}/ult_{n}"] for n in self.meta["ventanas"]},
+                "concurso_max": self.meta["concurso_max"][modalidad]
+            }
+        return IndiceJugadas.desde_arreglos(self.meta["total_sorteos"], self.meta["ventanas"], modalidades)
+
+    def ranking(self, modalidad, k, horario):
+        if k > MAX_LUCKY:
+            return None
+        prefijo = f"lucky/{modalidad}/{horario or 'TODOS'}"
+        return pd.DataFrame({
+            c: self.arreglos[f"{prefijo}/{c}"][:k]
+            for c in ("CODIGO", "SCORE", "SIN_SALIR", "PROMEDIO", "APARICIONES")
+        })
+
+    def calientes_frios(self, modalidad, dias, sorteos):
+        prefijo = f"calientes/{modalidad}/{_ventana(dias, sorteos)}"
+        if f"{prefijo}/vacio" not in self.arreglos:
+            return None
+        return CalientesPrecalculados(self.arreglos, prefijo)
+
+    def casilleros(self, dias, sorteos):
+        return self.arreglos.get(f"casilleros/{_ventana(dias, sorteos)}/conteo")
+
+    def casilleros_historicos(self):
+        return self.arreglos["casilleros/historico/conteo"], self.arreglos["casilleros/historico/ultimo"]
+
+    # (coocurrencia, transiciones); None si la ventana no está precalculada
+    def relaciones(self, dias, sorteos):
+        prefijo = f"relaciones/{_ventana(dias, sorteos)}"
+        if f"{prefijo}/coocurrencia" not in self.arreglos:
+            return None
+        return self.arreglos[f"{prefijo}/coocurrencia"], self.arreglos[f"{prefijo}/transiciones"]
+
+    def relaciones_historicas(self):
+        return self.arreglos["relaciones/historico/coocurrencia"], self.arreglos["relaciones/historico/transiciones"]
+
+
+# Firma barata (mtime y tamaño) del snapshot, para sumarla a la llave de caché
+# de la app: cuando termina de armarse en segundo plano, la siguiente carga lo abre.
+def version_snapshot(ruta=RUTA_SNAPSHOT):
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+# El snapshot si existe y es de este histórico; si no, los agregados
+# incrementales (que solo suman los sorteos nuevos). Nunca se arma aquí.
+def abrir_snapshot(hist, ruta=RUTA_SNAPSHOT):
+    try:
+        return Snapshot(ruta, hist)
+    except (OSError, ValueError, KeyError):
+        return sincronizar_agregados(hist)
+
+
+# ---------------- CONSTRUCCIÓN EN SEGUNDO PLANO ----------------
+# La app no arma el snapshot dentro de una petición: lanza un hilo (uno a la
+# vez por proceso) y mientras tanto responde con los agregados. Si otro proceso
+# ya lo armó para este histórico, el hilo no hace nada.
+_CONSTRUYENDO = threading.Lock()
+
+
+def _construir_si_falta(csv, directorio, ruta, procesos):
+    try:
+        with bloqueo(directorio):
+            hist = cargar_historico(csv, directorio)
+            try:
+                Snapshot(ruta, hist)
+            except (OSError, ValueError, KeyError):
+                _construir(csv, directorio, ruta, procesos)
+    except (OSError, RuntimeError) as e:
+        print(f"⚠️ No se pudo armar el snapshot: {e}")
+    finally:
+        _CONSTRUYENDO.release()
+
+
+def construir_en_segundo_plano(csv=CSV_LOCAL, directorio=DIR_BINARIO, ruta=RUTA_SNAPSHOT, procesos=None):
+    if not _CONSTRUYENDO.acquire(blocking=False):
+        return False
+    threading.Thread(
+        target=_construir_si_falta,
+        args=(csv, directorio, ruta, procesos),
+        name="snapshot",
+        daemon=True
+    ).start()
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precalcula las estadísticas de la app en un snapshot")
+    parser.add_argument("--csv", default=CSV_LOCAL)
+    parser.add_argument("--salida", default=RUTA_SNAPSHOT)
+    parser.add_argument("--procesos", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    ruta = construir_snapshot(args.csv, ruta=args.salida, procesos=args.procesos)
+    print(f"📦 Snapshot en {ruta} ({os.path.getsize(ruta) / 2 ** 20:.1f} MB, {time.perf_counter() - inicio:.1f} s)")
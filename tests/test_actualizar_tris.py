@@ -0,0 +1,143 @@
+import os
+import shutil
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import actualizar_tris
+import historico
+from historico import cargar_historico, leer_diario
+
+# Páginas grabadas: la de últimos resultados (35855 y 35856, con un hueco
+# después del 35852 local), las de los sorteos 35853 y 35854, y un Tris.csv
+# chico que termina en el 35852
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+ETAG = '"resultados-1"'
+
+
+# ---------------- SITIO LOCAL ----------------
+# Sirve las páginas grabadas como el sitio real: "/" con ETag (304 si el
+# cliente ya lo tiene) y "/sorteo/{concurso}". Las rutas en `caidas`
+# responden 404. Anota cada petición con su If-None-Match.
+class Sitio:
+
+    def __init__(self):
+        self.peticiones = []
+        self.caidas = set()
+        sitio = self
+
+        class Manejador(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                sitio.peticiones.append((self.path, self.headers.get("If-None-Match")))
+                if self.path == "/":
+                    if self.headers.get("If-None-Match") == ETAG:
+                        self.send_response(304)
+                        self.end_headers()
+                        return
+                    self._pagina("resultados.html", {"ETag": ETAG})
+                elif self.path.startswith("/sorteo/") and self.path not in sitio.caidas:
+                    self._pagina(f"sorteo_{self.path.rsplit('/', 1)[1]}.html")
+                else:
+                    self._pagina(None)
+
+            def _pagina(self, nombre, encabezados=None):
+                ruta = nombre and os.path.join(PAGINAS, nombre)
+                if not ruta or not os.path.exists(ruta):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                with open(ruta, "rb") as f:
+                    cuerpo = f.read()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                for nombre, valor in (encabezados or {}).items():
+                    self.send_header(nombre, valor)
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}/"
+        self.url_sorteo = self.url + "sorteo/{concurso}"
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def cerrar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+@pytest.fixture
+def sitio():
+    sitio = Sitio()
+    yield sitio
+    sitio.cerrar()
+
+
+# Tris.csv, tris_bin/ y la caché HTTP quedan en una carpeta temporal
+@pytest.fixture(autouse=True)
+def carpeta(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), tmp_path / "Tris.csv")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1")
+
+
+def concursos():
+    return cargar_historico("Tris.csv").concurso.tolist()
+
+
+def test_hueco_se_rellena(sitio, capsys):
+    with open("Tris.csv", "rb") as f:
+        original = f.read()
+
+    actualizar_tris.actualizar_tris(sitio.url, sitio.url_sorteo)
+
+    assert concursos()[-5:] == [35852, 35853, 35854, 35855, 35856]
+    assert ("/sorteo/35853", None) in sitio.peticiones
+    assert ("/sorteo/35854", None) in sitio.peticiones
+    assert "Recuperados 2 de 2" in capsys.readouterr().out
+    # Solo se anexa al diario: Tris.csv no se reescribe
+    with open("Tris.csv", "rb") as f:
+        assert f.read() == original
+    assert len(leer_diario()) == 4
+
+
+def test_pagina_sin_cambios_no_se_descarga(sitio, capsys):
+    actualizar_tris.actualizar_tris(sitio.url, sitio.url_sorteo)
+    sitio.peticiones.clear()
+    capsys.readouterr()
+
+    actualizar_tris.actualizar_tris(sitio.url, sitio.url_sorteo)
+
+    # Solo la petición condicional, que el sitio contesta con 304
+    assert sitio.peticiones == [("/", ETAG)]
+    assert "no cambió" in capsys.readouterr().out
+    assert concursos()[-1] == 35856
+
+
+def test_pagina_caida_no_corta_la_actualizacion(sitio, capsys):
+    sitio.caidas.add("/sorteo/35854")
+
+    actualizar_tris.actualizar_tris(sitio.url, sitio.url_sorteo)
+
+    salida = capsys.readouterr().out
+    assert "No se pudo descargar el sorteo 35854" in salida
+    assert "Recuperados 1 de 2" in salida
+    assert concursos()[-4:] == [35852, 35853, 35855, 35856]
+
+
+def test_diario_se_compacta_al_llegar_al_maximo(sitio, monkeypatch):
+    monkeypatch.setattr(historico, "MAX_DIARIO", 4)
+
+    actualizar_tris.actualizar_tris(sitio.url, sitio.url_sorteo)
+
+    assert leer_diario() is None
+    assert cargar_historico("Tris.csv", "otro_bin").concurso[-1] == 35856
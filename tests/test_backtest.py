@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import CANDIDATOS, LuckyIncremental, simular
+
+
+# Ranking Lucky recalculado desde cero con el mismo entero que ordena
+# LuckyIncremental: max(conteo, 1) * sin_salir, empates por el menor número
+def ranking_directo(vistos, tamano, k):
+    conteo = np.bincount(vistos, minlength=tamano)
+    ultima = np.full(tamano, -1)
+    ultima[vistos] = np.arange(len(vistos))
+    score = np.maximum(conteo, 1) * (len(vistos) - 1 - ultima)
+    todos = np.arange(tamano)
+    return todos[np.lexsort((todos, -score))][:k]
+
+
+@pytest.mark.parametrize("k", [CANDIDATOS - 1, CANDIDATOS, CANDIDATOS + 6, 150])
+def test_lucky_incremental_con_k_hasta_y_sobre_candidatos(k):
+    tamano = 100
+    sorteos = np.random.default_rng(k).integers(0, tamano, 400)
+    estado = LuckyIncremental(tamano, k)
+    for t, codigo in enumerate(sorteos):
+        esperado = ranking_directo(sorteos[:t], tamano, k)
+        assert np.array_equal(estado.recomendar(), esperado)
+        estado.agregar(codigo)
+
+
+def test_simular_lucky_con_k_sobre_candidatos():
+    n = 300
+    codigo = np.random.default_rng(0).integers(0, 100, n)
+    resumen, _ = simular(
+        np.arange(n), np.arange(n), codigo, np.zeros(n, dtype=bool), n,
+        "Par inicial", "lucky", k=CANDIDATOS + 6
+    )
+    assert resumen["APUESTAS"] == (n - 100) * min(CANDIDATOS + 6, 100)
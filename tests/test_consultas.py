@@ -0,0 +1,31 @@
+import io
+import json
+import os
+import shutil
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregados import Agregados
+from consultas import escribir_respuesta, responder
+from historico import cargar_historico
+
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+
+
+def test_sin_salir_vacio_igual_en_similares(tmp_path):
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), tmp_path / "Tris.csv")
+    agregados = Agregados(cargar_historico(str(tmp_path / "Tris.csv"), str(tmp_path / "tris_bin")))
+    consultas = pd.DataFrame({"MODALIDAD": ["Directa 5"], "NUMERO": ["07777"]})
+
+    salida = io.StringIO()
+    escribir_respuesta(responder(agregados, consultas, similares=True), salida)
+    fila = json.loads(salida.getvalue())
+
+    # 07777 salió (concurso 35852); sus similares, en su mayoría no
+    assert fila["SIN_SALIR"] is not None
+    nunca = [s for s in fila["SIMILARES"] if s["APARICIONES"] == 0]
+    assert nunca and all(s["SIN_SALIR"] is None for s in nunca)
+    assert all(s["SIN_SALIR"] is not None for s in fila["SIMILARES"] if s["APARICIONES"] > 0)
@@ -0,0 +1,37 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from historico import cargar_historico
+
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+
+
+def test_csv_editado_con_el_mismo_tamano_reconstruye_el_binario(tmp_path):
+    csv = str(tmp_path / "Tris.csv")
+    directorio = str(tmp_path / "tris_bin")
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), csv)
+    assert cargar_historico(csv, directorio).digitos[-1].tolist() == [0, 7, 7, 7, 7]
+
+    # Mismo tamaño, otra combinación en el último sorteo
+    with open(csv, "rb") as f:
+        texto = f.read()
+    with open(csv, "wb") as f:
+        f.write(texto.replace(b"60,35852,0,7,7,7,7,", b"60,35852,9,1,2,3,4,", 1))
+
+    assert cargar_historico(csv, directorio).digitos[-1].tolist() == [9, 1, 2, 3, 4]
+
+
+def test_csv_tocado_sin_cambios_no_reconstruye(tmp_path):
+    csv = str(tmp_path / "Tris.csv")
+    directorio = str(tmp_path / "tris_bin")
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), csv)
+    cargar_historico(csv, directorio)
+    antes = os.stat(os.path.join(directorio, "concurso.npy")).st_mtime_ns
+
+    os.utime(csv, ns=(0, 0))
+    cargar_historico(csv, directorio)
+
+    assert os.stat(os.path.join(directorio, "concurso.npy")).st_mtime_ns == antes
@@ -0,0 +1,82 @@
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from historico import agregar_sorteos, cargar_historico, compactar
+from ingesta import MAX_CONCURSO, leer_sorteos
+
+# Export oficial con una fila buena por caso y una mala por cada motivo; la
+# línea 1 es el encabezado
+OFICIAL = "\n".join([
+    "Sorteo,Combinación Ganadora,Fecha,Multiplicador",
+    "100,12345,01/01/2026,SI",
+    "101,23456,01/01/2026,NO,de más",
+    "100,54321,02/01/2026,NO",
+    "35852,11111,02/01/2026,NO",
+    f"{MAX_CONCURSO + 1},22222,03/01/2026,NO",
+    "102,67890,03/01/2026,NO",
+    ""
+])
+
+
+@pytest.mark.parametrize("bloque", [2, 1000])
+def test_rechazos_con_motivo(bloque):
+    validos, rechazos = leer_sorteos(io.StringIO(OFICIAL), existentes=[35852], bloque=bloque)
+
+    assert validos["CONCURSO"].tolist() == [100, 102]
+    assert validos.loc[0, ["R1", "R2", "R3", "R4", "R5"]].tolist() == [1, 2, 3, 4, 5]
+    assert rechazos["FILA"].tolist() == [3, 4, 5, 6]
+    assert rechazos["MOTIVO"].tolist() == [
+        "número de campos incorrecto",
+        "concurso repetido en el archivo",
+        "ya está en el histórico",
+        "concurso inválido"
+    ]
+    assert rechazos["CONCURSO"].tolist()[1:3] == [100, 35852]
+
+
+def test_sorteo_de_cuatro_numeros(tmp_path):
+    ruta = tmp_path / "Tris.csv"
+    ruta.write_text(
+        "NPRODUCTO,CONCURSO,R1,R2,R3,R4,R5,FECHA,Multiplicador\n"
+        "60,11032,1,2,3,4,,01/01/2000,\n"
+        "60,11033,5,6,7,8,9,02/01/2000,\n"
+    )
+
+    validos, rechazos = leer_sorteos(str(ruta))
+
+    assert rechazos.empty
+    assert validos["CONCURSO"].tolist() == [11032, 11033]
+    assert validos.loc[0, ["R1", "R2", "R3", "R4"]].tolist() == [1, 2, 3, 4]
+    assert np.isnan(validos.loc[0, "R5"])
+    assert validos["Multiplicador"].tolist() == ["NO", "NO"]
+
+
+# Un sorteo viejo subido con el multiplicador vacío no debe mover el inicio
+# del multiplicador: al compactar, los anteriores siguen sin dato
+def test_sorteo_viejo_no_cambia_el_inicio_del_multiplicador(tmp_path):
+    csv = str(tmp_path / "Tris.csv")
+    directorio = str(tmp_path / "tris_bin")
+    with open(csv, "w") as f:
+        f.write(
+            "NPRODUCTO,CONCURSO,R1,R2,R3,R4,R5,FECHA,Multiplicador\n"
+            "60,203,1,2,3,4,5,04/01/2000,SI\n"
+            "60,202,1,2,3,4,5,03/01/2000,NO\n"
+            "60,201,1,2,3,4,,02/01/2000,\n"
+            "60,200,1,2,3,4,,01/01/2000,\n"
+        )
+    subido = io.StringIO("Sorteo,Combinación Ganadora,Fecha,Multiplicador\n150,12345,01/06/1999,\n")
+
+    validos, _ = leer_sorteos(subido, existentes=cargar_historico(csv, directorio).concurso)
+    agregar_sorteos(validos, csv, directorio)
+    hist = compactar(csv, directorio)
+
+    assert hist.inicio_multiplicador == 202
+    multiplicador = pd.read_csv(csv, dtype={"Multiplicador": object}).set_index("CONCURSO")["Multiplicador"]
+    assert multiplicador.isna().to_dict() == {203: False, 202: False, 201: True, 200: True, 150: True}
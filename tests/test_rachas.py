@@ -0,0 +1,66 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from historico import SIN_DIGITO
+from rachas import detectar_rachas, mas_frecuentes
+
+# Más viejo primero; el cuarto sorteo es de 4 números (R5 vacío)
+DIGITOS = np.array([
+    [1, 2, 3, 4, 5],
+    [1, 2, 3, 4, 6],
+    [1, 7, 3, 8, 6],
+    [9, 7, 0, 8, SIN_DIGITO],
+    [1, 7, 0, 8, 6]
+], dtype=np.uint8)
+
+
+def test_rachas_por_digito():
+    por_digito, _ = detectar_rachas(DIGITOS, n=len(DIGITOS))
+    por_digito = por_digito.set_index("DIGITO")
+
+    # El 1 sale en los tres primeros, falta en el cuarto y vuelve en el último
+    columnas = ["APARICIONES", "SORTEOS_CON_DIGITO", "RACHA_MAXIMA", "RACHA_ACTUAL"]
+    assert por_digito.loc[1, columnas].tolist() == [4, 4, 3, 1]
+    assert por_digito.loc[8, ["RACHA_MAXIMA", "RACHA_ACTUAL"]].tolist() == [3, 3]
+    # El R5 vacío del cuarto sorteo corta la racha del 6
+    assert por_digito.loc[6, ["RACHA_MAXIMA", "RACHA_ACTUAL"]].tolist() == [2, 1]
+    assert por_digito.loc[5, ["RACHA_MAXIMA", "RACHA_ACTUAL"]].tolist() == [1, 0]
+    # Repetido dentro del mismo sorteo cuenta dos apariciones pero un sorteo
+    assert por_digito.loc[7, ["APARICIONES", "SORTEOS_CON_DIGITO"]].tolist() == [3, 3]
+    assert por_digito["APARICIONES"].sum() == 24
+
+
+def test_rachas_por_posicion():
+    _, por_posicion = detectar_rachas(DIGITOS, n=len(DIGITOS))
+
+    assert por_posicion["REPETICIONES"].tolist() == [2, 3, 3, 3, 1]
+    assert por_posicion["RACHA_MAXIMA"].tolist() == [3, 3, 3, 3, 2]
+    assert por_posicion["RACHA_ACTUAL"].tolist() == [1, 3, 2, 3, 1]
+    assert por_posicion["DIGITO_ACTUAL"].tolist() == [1, 7, 0, 8, 6]
+
+
+def test_solo_cuenta_los_ultimos_n():
+    por_digito, por_posicion = detectar_rachas(DIGITOS, n=3)
+    por_digito = por_digito.set_index("DIGITO")
+
+    assert por_digito.loc[1, ["APARICIONES", "RACHA_MAXIMA"]].tolist() == [2, 1]
+    assert por_digito.loc[2, "APARICIONES"] == 0
+    assert por_posicion["RACHA_MAXIMA"].tolist() == [1, 3, 2, 3, 1]
+
+
+def test_sin_sorteos():
+    por_digito, por_posicion = detectar_rachas(DIGITOS, n=0)
+
+    assert (por_digito[["APARICIONES", "RACHA_MAXIMA", "RACHA_ACTUAL"]] == 0).all().all()
+    assert (por_posicion["RACHA_ACTUAL"] == 1).all()
+
+
+def test_mas_frecuentes_desempata_por_digito():
+    por_digito, _ = detectar_rachas(DIGITOS, n=len(DIGITOS))
+
+    # El 1 sale 4 veces; 3, 6, 7 y 8 empatan con 3 y van por dígito
+    assert mas_frecuentes(por_digito, n=3)["DIGITO"].tolist() == [1, 3, 6]
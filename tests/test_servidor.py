@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import servidor
+
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), tmp_path / "Tris.csv")
+    monkeypatch.chdir(tmp_path)
+    return servidor.Servidor("Tris.csv")
+
+
+def test_error_al_serializar_responde_500(api, monkeypatch):
+    monkeypatch.setattr(servidor.Estado, "salud", lambda self, params: {"valor": object()})
+
+    codigo, datos = api.responder("GET", "/salud")
+
+    assert codigo == 500
+    assert json.loads(datos) == {"error": "Error interno: TypeError"}
+
+
+def test_recarga_fallida_conserva_el_estado(api, monkeypatch):
+    anterior = api.estado
+    monkeypatch.setattr(servidor, "REVISION_SEGUNDOS", 0)
+    monkeypatch.setattr(servidor, "version_historico", lambda csv: "otra")
+
+    def falla(csv):
+        raise ValueError("CSV a medio escribir")
+
+    monkeypatch.setattr(servidor, "Estado", falla)
+
+    async def vigilar_un_rato():
+        tarea = asyncio.create_task(api.vigilar())
+        await asyncio.sleep(0.05)
+        assert not tarea.done()
+        tarea.cancel()
+
+    asyncio.run(vigilar_un_rato())
+    assert api.estado is anterior
+    assert api.responder("GET", "/salud")[0] == 200
+
+
+@pytest.mark.parametrize("filtro", ["dia=7", "dia=-1", "mes=0", "mes=13", "anio=1800", "anio=3000"])
+def test_calendario_rechaza_filtros_fuera_de_rango(api, filtro):
+    codigo, datos = api.responder("GET", f"/calendario?modalidad=Par%20final&numero=07&{filtro}")
+
+    assert codigo == 400
+    assert "fuera de rango" in json.loads(datos)["error"]
+
+
+def test_calendario_acepta_filtros_en_rango(api):
+    codigo, _ = api.responder("GET", "/calendario?modalidad=Par%20final&numero=07&dia=0&dia=6&mes=12&anio=2026")
+
+    assert codigo == 200
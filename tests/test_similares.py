@@ -0,0 +1,27 @@
+import os
+import shutil
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agregados import Agregados
+from historico import cargar_historico
+from similares import similares_rankeados
+
+PAGINAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "paginas")
+
+
+def test_sin_salir_pone_primero_los_que_nunca_salieron(tmp_path):
+    shutil.copy(os.path.join(PAGINAS, "Tris.csv"), tmp_path / "Tris.csv")
+    hist = cargar_historico(str(tmp_path / "Tris.csv"), str(tmp_path / "tris_bin"))
+    indice = Agregados(hist).indice
+
+    # Par final: 100 números, así que el vecindario mezcla salidos y no salidos
+    tabla = similares_rankeados(indice, "Par final", 7, tipos=("cercano",), rango=50, metrica="sin_salir")
+
+    nunca = (tabla["APARICIONES"] == 0).to_numpy()
+    assert nunca.any() and not nunca.all()
+    primeros = int(nunca.sum())
+    assert nunca[:primeros].all()
+    salidos = tabla["SIN_SALIR"].to_numpy()[primeros:]
+    assert (salidos[:-1] >= salidos[1:]).all()